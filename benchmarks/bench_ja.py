@@ -0,0 +1,79 @@
+"""Benchmark the normalization of Japanese highlights.
+
+Usage: python benchmarks/bench_ja.py [-n HIGHLIGHTS] [-r REPEAT]
+
+A synthetic corpus of Japanese highlights, with words separated by half- or
+full-width spaces or not at all and some ASCII words, is normalized one highlight at
+a time with the original regex, and all at once with ``normalize_ja_batch``; the
+outputs are checked to be the same.
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import Callable, List
+
+from orgutils import utils
+
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよ"
+KANJI = "日本語文章研究漢字読書記録"
+ASCII_WORDS = ("PDF", "Python", "2024", "(1)")
+
+
+def make_corpus(n: int, seed: int = 0) -> List[str]:
+    """Make ``n`` highlights of 5-30 words."""
+    rng = random.Random(seed)
+    chars = KANA + KANJI
+    texts = []
+    for _ in range(n):
+        words = [
+            rng.choice(ASCII_WORDS)
+            if rng.random() < 0.1
+            else "".join(rng.choice(chars) for _ in range(rng.randint(1, 6)))
+            for _ in range(rng.randint(5, 30))
+        ]
+        texts.append(rng.choice((" ", "", "　")).join(words))
+    return texts
+
+
+def _original(s: str) -> str:
+    return re.sub(r"(?<=[^\x01-\x7E])([^\S\n\r]+)(?=[^\x01-\x7E])", "", s)
+
+
+def best_time(run: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("-n", type=int, default=50_000, help="Number of highlights")
+    p.add_argument("-r", type=int, default=5, help="Repetitions (best is reported)")
+    args = p.parse_args()
+
+    texts = make_corpus(args.n)
+    size = sum(map(len, texts))
+    if [_original(s) for s in texts] != utils.normalize_ja_batch(texts):
+        raise RuntimeError("Different outputs")
+
+    runs = {
+        "original, per item": lambda: [_original(s) for s in texts],
+        "precompiled, per item": lambda: [utils.normalize_ja(s) for s in texts],
+        "batch": lambda: utils.normalize_ja_batch(texts),
+        "batch, NFKC": lambda: utils.normalize_ja_batch(texts, nfkc=True),
+        "batch, joining lines": lambda: utils.normalize_ja_batch(
+            texts, join_lines=True
+        ),
+    }
+    print(f"{ args.n } highlights, { size } characters")
+    for name, run in runs.items():
+        print(f"{ name }: { best_time(run, args.r) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Benchmark how the converters of every source scale with the size of the input.
+
+Usage: python benchmarks/bench_scaling.py [-n SIZE ...] [-r REPEAT] [-k NAME ...]
+    [-o OUTPUT] [--compare BASELINE] [--threshold RATIO]
+
+Each benchmark converts a synthetic corpus (see ``corpora.py``) of each size, in
+items: highlights, pages, annotations, snips, or nodes. The best times are written
+as JSON to OUTPUT. With ``--compare``, they are compared with the results of an
+earlier run, and the exit status is 1 if any is slower by more than the threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from bench_structs import make_nodes
+from corpora import (
+    make_snipd_export,
+    make_zotero_library,
+    write_bookcision_json,
+    write_epub,
+    write_kindle_html,
+)
+
+from orgutils.epub.parsers import parse_ebook_structure
+from orgutils.kindle import converters as kindle
+from orgutils.org import structs
+from orgutils.snipd import converter as snipd
+from orgutils.zotero import db as zotero_db
+from orgutils.zotero import exporters as zotero
+
+# A setup takes the size and a scratch directory, and returns the run to time:
+Setup = Callable[[int, Path], Callable[[], object]]
+
+
+def kindle_json(n: int, tmp: Path) -> Callable[[], object]:
+    dump = str(write_bookcision_json(tmp / "dump.json", n))
+    return lambda: kindle.export_to_org(dump, "en", fp=io.StringIO())
+
+
+def kindle_html(n: int, tmp: Path) -> Callable[[], object]:
+    dump = str(write_kindle_html(tmp / "notebook.html", n))
+    return lambda: kindle.convert_html_to_org(dump, "en", fp=io.StringIO())
+
+
+def epub_nav(n: int, tmp: Path) -> Callable[[], object]:
+    epub = write_epub(tmp / "book.epub", n)
+    return lambda: parse_ebook_structure(epub)
+
+
+def epub_scan(n: int, tmp: Path) -> Callable[[], object]:
+    epub = write_epub(tmp / "book.epub", n)
+    return lambda: parse_ebook_structure(epub, jobs=1, use_nav=False)
+
+
+@contextlib.contextmanager
+def _environ(**env: str) -> Iterator[None]:
+    """Set environment variables, and restore them on exit."""
+    saved = {name: os.environ.get(name) for name in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def zotero_export(n: int, tmp: Path) -> Callable[[], object]:
+    id = make_zotero_library(tmp / "Zotero", n)
+
+    def run() -> None:
+        # The library is looked up at ~/Zotero, and the snapshot of it is cached:
+        with (
+            _environ(HOME=str(tmp), XDG_CACHE_HOME=str(tmp / "cache")),
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            zotero_db._find_zotero_data_dir.cache_clear()
+            try:
+                zotero.export_to_org(id, "en")
+            finally:
+                zotero_db._find_zotero_data_dir.cache_clear()
+
+    return run
+
+
+def snipd_convert(n: int, tmp: Path) -> Callable[[], object]:
+    parts = snipd.split_parts(make_snipd_export(n))
+    return lambda: [snipd.convert(part, "org") for part in parts]
+
+
+def structs_dumps(n: int, tmp: Path) -> Callable[[], object]:
+    nodes = make_nodes(n)
+    return lambda: structs.dumps(nodes)
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "kindle.export_to_org": kindle_json,
+    "kindle.convert_html_to_org": kindle_html,
+    "epub.parse_ebook_structure": epub_nav,
+    "epub.parse_ebook_structure (scan)": epub_scan,
+    "zotero.export_to_org": zotero_export,
+    "snipd.convert": snipd_convert,
+    "structs.dumps": structs_dumps,
+}
+
+
+def best_time(run: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(names: List[str], sizes: List[int], repeat: int) -> List[dict]:
+    results = []
+    for name in names:
+        for n in sizes:
+            with tempfile.TemporaryDirectory() as tmp:
+                run = BENCHMARKS[name](n, Path(tmp))
+                seconds = best_time(run, repeat)
+            results.append({"name": name, "size": n, "seconds": seconds})
+            print(
+                f"{ name } n={ n }: { seconds * 1000:.1f} ms "
+                f"({ seconds / n * 1e6:.1f} us/item)",
+                file=sys.stderr,
+            )
+    return results
+
+
+def compare(results: List[dict], baseline: List[dict], threshold: float) -> int:
+    """Print the ratios of times to the baseline; count those over the threshold."""
+    before = {(r["name"], r["size"]): r["seconds"] for r in baseline}
+    regressions = 0
+    for r in results:
+        old = before.get((r["name"], r["size"]))
+        if old is None:
+            continue
+        ratio = r["seconds"] / old
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = " REGRESSION"
+        print(f"{ r['name'] } n={ r['size'] }: { ratio:.2f}x{ flag }")
+    return regressions
+
+
+def main() -> int | None:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument(
+        "-n",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="Sizes in items (default: 100 1000 10000)",
+    )
+    p.add_argument("-r", type=int, default=3, help="Repetitions (best is reported)")
+    p.add_argument(
+        "-k",
+        nargs="+",
+        choices=BENCHMARKS,
+        default=list(BENCHMARKS),
+        metavar="NAME",
+        help="Benchmarks to run (default: all)",
+    )
+    p.add_argument(
+        "-o",
+        "--output",
+        default="bench_scaling.json",
+        help="JSON file for the results (default: bench_scaling.json)",
+    )
+    p.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Time ratio to the baseline counted as a regression (default: 1.2)",
+    )
+    args = p.parse_args()
+
+    # Read the baseline first, in case it is also the output:
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = run_benchmarks(args.k, args.n, args.r)
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.r,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    if baseline is not None and compare(results, baseline, args.threshold):
+        return 1
+    return None
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
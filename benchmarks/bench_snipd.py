@@ -0,0 +1,67 @@
+"""Benchmark the Snipd filters: six separate walks vs. the fused single walk.
+
+Usage: python benchmarks/bench_snipd.py [-k COPIES] [-r REPEAT]
+
+The bundled test dumps are parsed to a pandoc JSON AST once; the blocks of each are
+repeated ``COPIES`` times to get a document of a realistic size.
+"""
+
+import argparse
+import io
+import json
+import time
+from pathlib import Path
+from typing import Callable
+
+import panflute
+
+from orgutils.snipd import converter
+
+DATA_DIR = Path(__file__).parent.parent / "tests" / "orgutils" / "snipd" / "data"
+
+FIXTURES = ("dump-2024-08.md", "dump-2024-10.md")
+
+
+def load_ast(name: str, copies: int) -> str:
+    md = (DATA_DIR / name).read_text()
+    buf = io.StringIO()
+    panflute.dump(converter._md_to_ast(md), buf)
+    ast = json.loads(buf.getvalue())
+    ast["blocks"] *= copies
+    return json.dumps(ast)
+
+
+def best_time(ast: str, run: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        doc = panflute.load(io.StringIO(ast))
+        start = time.perf_counter()
+        run(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("-k", type=int, default=100, help="Copies of each document")
+    p.add_argument("-r", type=int, default=5, help="Repetitions (best is reported)")
+    args = p.parse_args()
+
+    for name in FIXTURES:
+        ast = load_ast(name, args.k)
+        separate = best_time(
+            ast, lambda doc: panflute.run_filters(converter.FILTERS, doc=doc), args.r
+        )
+        fused = best_time(
+            ast,
+            lambda doc: panflute.run_filter(converter.snipd_filter, doc=doc),
+            args.r,
+        )
+        print(
+            f"{ name } x{ args.k }: separate { separate * 1000:.1f} ms, "
+            f"fused { fused * 1000:.1f} ms ({ separate / fused:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark the per-episode latency of Snipd to Org: pandoc vs. the fast path.
+
+Usage: python benchmarks/bench_snipd_fastpath.py [-r REPEAT]
+
+Each bundled test dump is converted as one episode, with the pandoc pipeline and
+without pandoc; the outputs are checked to be the same.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Callable
+
+from orgutils.snipd import converter, fastpath
+
+DATA_DIR = Path(__file__).parent.parent / "tests" / "orgutils" / "snipd" / "data"
+
+FIXTURES = ("dump-2024-08.md", "dump-2024-10.md")
+
+
+def best_time(md: str, run: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(md)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("-r", type=int, default=20, help="Repetitions (best is reported)")
+    args = p.parse_args()
+
+    for name in FIXTURES:
+        md = (DATA_DIR / name).read_text()
+        if fastpath.to_org(md) != converter.convert(md, "org", fast=False):
+            raise RuntimeError(f"Different outputs for { name }")
+        pandoc = best_time(
+            md, lambda md: converter.convert(md, "org", fast=False), args.r
+        )
+        fast = best_time(md, fastpath.to_org, args.r)
+        print(
+            f"{ name }: pandoc { pandoc * 1000:.2f} ms, "
+            f"fast path { fast * 1000:.2f} ms ({ pandoc / fast:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
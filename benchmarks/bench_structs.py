@@ -0,0 +1,81 @@
+"""Benchmark memory and rendering of Org structs.
+
+Usage: python benchmarks/bench_structs.py [-n NODES]
+"""
+
+import argparse
+import gc
+import io
+import time
+import tracemalloc
+
+from orgutils.org import structs
+
+
+def make_nodes(n: int) -> list:
+    """Make nodes as in a typical export: headings, quotes, and notes."""
+    nodes = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            nodes.append(structs.Heading(f"Heading { i }", 2, {"kindle_loc": i}))
+        elif kind == 1:
+            nodes.append(structs.Heading(f"Heading { i }", 3, {}))
+        elif kind == 2:
+            nodes.append(structs.QuoteBlock(f"Highlight { i } (loc. { i })"))
+        else:
+            nodes.append(structs.Paragraph(f"Note { i }"))
+    return nodes
+
+
+def bytes_per_node(n: int) -> float:
+    # Make the strings beforehand, so that only the nodes are measured:
+    texts = [f"Text { i }" for i in range(n)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [
+        structs.Heading(text, 2, {"kindle_loc": i} if i % 2 else {})
+        if i % 4 < 2
+        else structs.QuoteBlock(text)
+        for i, text in enumerate(texts)
+    ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodes
+    return (after - before) / n
+
+
+def build_throughput(n: int, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        make_nodes(n)
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def render_throughput(n: int, repeat: int = 5) -> float:
+    nodes = make_nodes(n)
+    best = float("inf")
+    for _ in range(repeat):
+        fp = io.StringIO()
+        start = time.perf_counter()
+        structs.dump(nodes, fp)
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("-n", type=int, default=200_000, help="Number of nodes")
+    args = p.parse_args()
+
+    print(f"nodes: { args.n }")
+    print(f"bytes/node: { bytes_per_node(args.n):.1f}")
+    print(f"build: { build_throughput(args.n):,.0f} nodes/s")
+    print(f"render: { render_throughput(args.n):,.0f} nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Synthetic corpora of a given size for every source, for benchmarks.
+
+Each generator writes (or returns) an export with ``n`` items: highlights for
+Kindle, pages for EPUB, annotations for Zotero, and snips for Snipd. The corpora
+are deterministic for a given ``n`` and ``seed``.
+
+The EPUB and Zotero library builders are those of the tests, in ``tests.helpers``.
+"""
+
+import html
+import json
+import random
+import sys
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tests.helpers.epub import make_epub, pagebreak  # noqa: E402
+from tests.helpers.zotero import ZoteroLibrary  # noqa: E402
+
+WORDS = (
+    "the of and to in is that it was for on are as with his they at be this from "
+    "have or by one had not but what all were when we there can an your which their "
+    "said if do will each about how up out them then she many some so these would "
+    "other into has more her two like him see time could no make than first been"
+).split()
+
+
+def sentence(rng: random.Random, lo: int = 5, hi: int = 30) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(lo, hi))]
+    return " ".join(words).capitalize() + "."
+
+
+def write_bookcision_json(path: Path, n: int, seed: int = 0) -> Path:
+    """Write a Bookcision JSON export of ``n`` highlights.
+
+    One in ten highlights marks up a heading, and one in twenty is a vocab note.
+    """
+    rng = random.Random(seed)
+    highlights = []
+    for i in range(n):
+        note = None
+        if i % 10 == 0:
+            note = f"h{ 1 + i // 10 % 3 }"
+        elif i % 20 == 5:
+            note = f"vocab { rng.choice(WORDS) }"
+        elif rng.random() < 0.2:
+            note = sentence(rng, 3, 10)
+        # Headings are short:
+        text = sentence(rng, 2, 6) if i % 10 == 0 else sentence(rng)
+        location = {"value": 10 * i + rng.randint(0, 5)}
+        highlights.append({"text": text, "location": location, "note": note})
+    jd = {"title": "Synthetic Book", "authors": "Doe, Jane", "asin": "B000000000"}
+    path.write_text(json.dumps({**jd, "highlights": highlights}))
+    return path
+
+
+def write_kindle_html(path: Path, n: int, seed: int = 0) -> Path:
+    """Write a Kindle notebook HTML export of ``n`` highlights.
+
+    There is a section heading every 50 highlights, and a note on one in five.
+    """
+    rng = random.Random(seed)
+    divs = [
+        '<div class="bookTitle">Synthetic Book</div>',
+        '<div class="authors">Doe, Jane</div>',
+        '<div class="citation">Doe, J. (2020). Synthetic Book.</div>',
+    ]
+    for i in range(n):
+        if i % 50 == 0:
+            divs.append(f'<div class="sectionHeading">Chapter { i // 50 + 1 }</div>')
+        loc = f"Page { i // 4 + 1 } · Location { 10 * i + 1 }"
+        divs.append(
+            '<div class="noteHeading">Highlight(<span class="highlight_yellow">'
+            f"yellow</span>) - { loc }</div>"
+        )
+        divs.append(f'<div class="noteText">{ html.escape(sentence(rng)) }</div>')
+        if rng.random() < 0.2:
+            divs.append(f'<div class="noteHeading">Note - { loc }</div>')
+            divs.append(f'<div class="noteText">{ sentence(rng, 3, 10) }</div>')
+    path.write_text(
+        '<?xml version="1.0" encoding="UTF-8" ?><html><head><title></title></head>\n'
+        '<body>\n<div class="bodyContainer">\n'
+        + "\n".join(divs)
+        + "\n</div>\n</body>\n</html>\n"
+    )
+    return path
+
+
+def write_epub(path: Path, n: int, seed: int = 0) -> Path:
+    """Write an EPUB of ``n`` pages, with a table of contents and a page list.
+
+    The pages are in chapters of 20, with a section heading every 5 pages.
+    """
+    rng = random.Random(seed)
+    chapters = []
+    for c in range(0, n, 20):
+        body = [f'<h1 id="c{ c }">Chapter { c // 20 + 1 }</h1>']
+        for page in range(c + 1, min(c + 20, n) + 1):
+            body.append(pagebreak(page))
+            if page % 5 == 0:
+                body.append(f'<h2 id="s{ page }">Section { page }</h2>')
+            body.extend(f"<p>{ sentence(rng) }</p>" for _ in range(3))
+        chapters.append((f"ch{ c // 20 + 1 }", "\n".join(body)))
+    return make_epub(path, chapters)
+
+
+def make_zotero_library(data_dir: Path, n: int, seed: int = 0) -> str:
+    """Make a Zotero library with a doc of ``n`` annotations; return its ID."""
+    rng = random.Random(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    library = ZoteroLibrary(data_dir)
+    attach_id = library.add_doc("Synthetic Paper", filename="paper.pdf")
+    for i in range(n):
+        library.add_annotation(
+            attach_id,
+            i // 10 + 1,
+            text=sentence(rng),
+            comment=sentence(rng, 3, 10) if rng.random() < 0.2 else None,
+            y=700.0 - 60 * (i % 10),
+        )
+    library.commit()
+    library.conn.close()
+    return str(attach_id)
+
+
+SNIPD_HEADER = """# {title}
+
+
+<img src="https://foo.bar/foo.jpg">
+
+
+## Episode metadata
+- Episode title: {title}
+- Show: A Synthetic Podcast
+- Owner / Host: Jane Doe
+- Episode link: [open in Snipd](https://share.snipd.com/episode/{episode})
+- Episode publish date: 2024-10-15
+- Export date: 2024-10-15T21:43
+
+
+## Snip
+"""
+
+SNIPD_SNIP = """
+### [{time}] 💡  {title}
+
+
+[🎧 Play snip - 1min ({time} - {time})](https://share.snipd.com/snip/{snip})
+
+
+- {first}
+- {second}
+
+
+#### 📚 Transcript
+<details>
+<summary>Click to expand</summary>
+<blockquote><b>John Doe</b><br/><br/>{transcript}</blockquote>
+</details>
+
+
+
+---
+
+"""
+
+SNIPD_FOOTER = (
+    "Created with [Snipd](https://www.snipd.com) | Highlight & Take Notes from "
+    "Podcasts\n"
+)
+
+
+def _snipd_episode(rng: random.Random, episode: int, snips: int) -> str:
+    parts = [SNIPD_HEADER.format(title=f"Episode { episode }", episode=episode)]
+    for i in range(snips):
+        parts.append(
+            SNIPD_SNIP.format(
+                time=f"{ i // 60:02d}:{ i % 60:02d}",
+                title=sentence(rng, 2, 5).rstrip("."),
+                snip=f"{ episode }-{ i }",
+                first=sentence(rng),
+                second=sentence(rng),
+                transcript=sentence(rng, 20, 60),
+            )
+        )
+    parts.append(SNIPD_FOOTER)
+    return "".join(parts)
+
+
+def make_snipd_export(n: int, seed: int = 0, snips_per_episode: int = 10) -> str:
+    """Make a Snipd Markdown export of ``n`` snips, in episodes of 10 snips."""
+    rng = random.Random(seed)
+    episodes: List[str] = []
+    for e, start in enumerate(range(0, n, snips_per_episode)):
+        episodes.append(_snipd_episode(rng, e + 1, min(snips_per_episode, n - start)))
+    return "\n".join(episodes)
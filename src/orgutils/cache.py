@@ -0,0 +1,106 @@
+"""On-disk caches."""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def cache_dir(*parts: str) -> Path:
+    """Get the cache directory, creating it if missing.
+
+    The directory lives under ``$XDG_CACHE_HOME/orgutils`` (``~/.cache/orgutils`` by
+    default).
+    """
+    root = Path(os.environ.get("XDG_CACHE_HOME") or Path("~") / ".cache")
+    path = root.expanduser().joinpath("orgutils", *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def file_key(path: str | Path, *extra: object) -> str:
+    """Make a cache key for a file from its path, mtime, and size."""
+    path = Path(path).resolve()
+    st = path.stat()
+    s = "\0".join(map(str, (path, st.st_mtime_ns, st.st_size, *extra)))
+    return hashlib.sha1(s.encode()).hexdigest()
+
+
+def file_digest(path: str | Path) -> str:
+    """Make a cache key for a file from its content."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class DiskCache:
+    """Key-value cache storing each value in a file.
+
+    Writes are atomic, so the cache can be shared by concurrent processes. If
+    ``max_size`` (in bytes) is given, the least recently used values are evicted when
+    the cache grows larger. The cache directory is scanned for that only on the first
+    ``put`` and when the size estimated since exceeds ``max_size``. The ``hits`` and
+    ``misses`` of ``get`` are counted.
+    """
+
+    def __init__(
+        self, name: str, suffix: str = "", max_size: Optional[int] = None
+    ) -> None:
+        self.path = cache_dir(name)
+        self.suffix = suffix
+        self.max_size = max_size
+        self._size: Optional[int] = None  # estimated, as of the last eviction
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.path / f"{ key }{ self.suffix }"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            value = path.read_bytes()
+            if self.max_size is not None:
+                # The mtime records the last use:
+                os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        with tempfile.NamedTemporaryFile(
+            dir=self.path, suffix=".tmp", delete=False
+        ) as f:
+            f.write(value)
+        os.replace(f.name, self._path(key))
+        if self.max_size is None:
+            return
+        if self._size is not None:
+            self._size += len(value)
+        if self._size is None or self._size > self.max_size:
+            self.evict(self.max_size)
+
+    def evict(self, max_size: int) -> None:
+        """Remove the least recently used values until the cache fits in ``max_size``."""
+        entries = []
+        for path in self.path.glob(f"*{ self.suffix }"):
+            if path.name.endswith(".tmp"):
+                # Being written by ``put``, maybe in another process:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, path))
+        entries.sort(reverse=True)
+
+        total = kept = 0
+        for _, size, path in entries:
+            total += size
+            if total > max_size:
+                path.unlink(missing_ok=True)
+            else:
+                kept = total
+        self._size = kept
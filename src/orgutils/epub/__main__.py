@@ -1,12 +1,20 @@
 """CLI for .epub exporter."""
 
 from argparse import ArgumentParser
+from typing import Optional
 
-from .parsers import parse_ebook_structure
+from .parsers import get_ebook_structure
 
 
-def parse_book_structure(epub_path):
-    book_items = parse_ebook_structure(epub_path)
+def parse_book_structure(
+    epub_path: str,
+    use_cache: bool = True,
+    jobs: Optional[int] = None,
+    use_nav: bool = True,
+) -> None:
+    book_items = get_ebook_structure(
+        epub_path, use_cache=use_cache, jobs=jobs, use_nav=use_nav
+    )
     for page, book_item in book_items.items():
         print(page, book_item)
 
@@ -15,10 +23,30 @@ def cli() -> None:
     """CLI entry point."""
     p = ArgumentParser(description=__doc__)
     p.add_argument("epub", help=".epub file")
+    p.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Parse the .epub file even if its structure is cached",
+    )
+    p.add_argument(
+        "--scan",
+        dest="use_nav",
+        action="store_false",
+        help="Scan the documents for headings and pagebreaks instead of reading the "
+        "table of contents and page list",
+    )
+    p.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=None,
+        help="Number of parallel processes (default: number of CPUs)",
+    )
 
     args = p.parse_args()
 
-    parse_book_structure(args.epub)
+    parse_book_structure(args.epub, args.use_cache, args.jobs, args.use_nav)
 
 
 if __name__ == "__main__":
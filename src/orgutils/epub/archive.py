@@ -0,0 +1,99 @@
+"""Lazy reading of EPUB archives.
+
+Only the container and package (OPF) files are read up front; content documents are
+read from the zip archive one at a time, on demand.
+"""
+
+import functools
+import posixpath
+import zipfile
+from collections import namedtuple
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+
+from lxml import etree
+
+CONTAINER_PATH = "META-INF/container.xml"
+
+NAMESPACES = {
+    "container": "urn:oasis:names:tc:opendocument:xmlns:container",
+    "opf": "http://www.idpf.org/2007/opf",
+}
+
+XHTML_MEDIA_TYPES = ("application/xhtml+xml", "text/html")
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolve(base: str, path: str) -> str:
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), unquote(path)))
+
+
+# ``name`` is the path of the item in the archive:
+ManifestItem = namedtuple("ManifestItem", ("id", "name", "media_type", "properties"))
+
+
+class EpubArchive:
+    """EPUB archive with its manifest and spine."""
+
+    def __init__(self, path: str) -> None:
+        self.zip = zipfile.ZipFile(path)
+        try:
+            self._read_package()
+        except BaseException:
+            self.zip.close()
+            raise
+
+    def __enter__(self) -> "EpubArchive":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.zip.close()
+
+    def _read_package(self) -> None:
+        container = etree.fromstring(self.zip.read(CONTAINER_PATH))
+        rootfile = container.find(".//container:rootfile", NAMESPACES)
+        package_path = None if rootfile is None else rootfile.get("full-path")
+        if package_path is None:
+            raise ValueError(f"No rootfile in { CONTAINER_PATH }")
+        self.package_path: str = package_path
+        package = etree.fromstring(self.zip.read(package_path))
+
+        self.manifest: Dict[str, ManifestItem] = {}
+        for item in package.iterfind("opf:manifest/opf:item", NAMESPACES):
+            id, href = item.get("id"), item.get("href")
+            if id is None or href is None:
+                continue
+            self.manifest[id] = ManifestItem(
+                id,
+                self.resolve(package_path, href),
+                item.get("media-type", ""),
+                item.get("properties", ""),
+            )
+
+        spine = package.find("opf:spine", NAMESPACES)
+        self.toc_id: Optional[str] = None if spine is None else spine.get("toc")
+        self.spine: List[ManifestItem] = [
+            self.manifest[idref]
+            for itemref in package.iterfind("opf:spine/opf:itemref", NAMESPACES)
+            if (idref := itemref.get("idref", "")) in self.manifest
+        ]
+
+    @staticmethod
+    def resolve(base: str, href: str) -> str:
+        """Get the archive path of ``href`` (without fragment) relative to ``base``."""
+        return _resolve(base, href.split("#", 1)[0])
+
+    def spine_documents(self) -> List[str]:
+        """Get the archive paths of the (X)HTML documents in the spine."""
+        return [
+            item.name
+            for item in self.spine
+            if item.media_type in XHTML_MEDIA_TYPES
+            or item.name.endswith((".html", ".xhtml"))
+        ]
+
+    def read(self, name: str) -> bytes:
+        return self.zip.read(name)
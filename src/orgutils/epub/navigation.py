@@ -0,0 +1,118 @@
+"""Table of contents and page list from EPUB navigation files.
+
+EPUB 3 books have a navigation document with ``toc`` and ``page-list`` navs, and
+EPUB 2 books an NCX file with a ``navMap`` and a ``pageList``.
+"""
+
+from collections import namedtuple
+from typing import List, Optional
+from urllib.parse import unquote
+
+from lxml import etree
+
+from .archive import EpubArchive
+
+NAMESPACES = {
+    "xhtml": "http://www.w3.org/1999/xhtml",
+    "epub": "http://www.idpf.org/2007/ops",
+    "ncx": "http://www.daisy.org/z3986/2005/ncx/",
+}
+
+NCX_MEDIA_TYPE = "application/x-dtbncx+xml"
+
+# Link to ``fragment`` (or the start, if None) of the document ``name`` in the
+# archive. ``level`` is the nesting depth in the table of contents, starting at 1.
+NavTarget = namedtuple("NavTarget", ("label", "level", "name", "fragment"))
+
+Navigation = namedtuple("Navigation", ("toc", "pages"))
+
+_OL_TAG = f"{{{ NAMESPACES['xhtml'] }}}ol"
+_A_TAG = f"{{{ NAMESPACES['xhtml'] }}}a"
+
+
+def _target(label: str, level: int, base: str, href: str) -> NavTarget:
+    _, _, fragment = href.partition("#")
+    return NavTarget(
+        " ".join(label.split()),
+        level,
+        EpubArchive.resolve(base, href),
+        unquote(fragment) or None,
+    )
+
+
+def _nav_elements(nav: etree._Element, base: str) -> List[NavTarget]:
+    targets = []
+    level = 0
+    for event, elem in etree.iterwalk(
+        nav, events=("start", "end"), tag=(_OL_TAG, _A_TAG)
+    ):
+        if elem.tag == _OL_TAG:
+            level += 1 if event == "start" else -1
+        elif event == "start" and (href := elem.get("href")):
+            targets.append(_target("".join(elem.itertext()), level, base, href))
+    return targets
+
+
+def _read_nav_document(archive: EpubArchive, name: str) -> Navigation:
+    root = etree.fromstring(archive.read(name))
+    navigation = Navigation([], [])
+    for nav in root.iterfind(".//xhtml:nav", NAMESPACES):
+        types = nav.get(f"{{{ NAMESPACES['epub'] }}}type", "").split()
+        if "toc" in types:
+            navigation.toc.extend(_nav_elements(nav, name))
+        elif "page-list" in types:
+            navigation.pages.extend(_nav_elements(nav, name))
+    return navigation
+
+
+def _content_src(elem: etree._Element) -> Optional[str]:
+    content = elem.find("ncx:content", NAMESPACES)
+    return None if content is None else content.get("src")
+
+
+def _nav_points(parent: etree._Element, base: str, level: int = 0) -> List[NavTarget]:
+    targets = []
+    for point in parent.iterfind("ncx:navPoint", NAMESPACES):
+        if src := _content_src(point):
+            label = point.findtext("ncx:navLabel/ncx:text", "", NAMESPACES)
+            targets.append(_target(label, level + 1, base, src))
+        targets.extend(_nav_points(point, base, level + 1))
+    return targets
+
+
+def _read_ncx(archive: EpubArchive, name: str) -> Navigation:
+    root = etree.fromstring(archive.read(name))
+    toc = []
+    nav_map = root.find("ncx:navMap", NAMESPACES)
+    if nav_map is not None:
+        toc = _nav_points(nav_map, name)
+    pages = [
+        _target(target.findtext("ncx:navLabel/ncx:text", "", NAMESPACES), 1, name, src)
+        for target in root.iterfind("ncx:pageList/ncx:pageTarget", NAMESPACES)
+        if (src := _content_src(target))
+    ]
+    return Navigation(toc, pages)
+
+
+def read_navigation(archive: EpubArchive) -> Optional[Navigation]:
+    """Read the table of contents and page list of the book.
+
+    Return None if the book has no navigation file with both.
+    """
+    navigation = None
+    for item in archive.manifest.values():
+        if "nav" in item.properties.split():
+            navigation = _read_nav_document(archive, item.name)
+            break
+
+    if navigation is None or not (navigation.toc and navigation.pages):
+        ncx = archive.manifest.get(archive.toc_id or "") or next(
+            (i for i in archive.manifest.values() if i.media_type == NCX_MEDIA_TYPE),
+            None,
+        )
+        if ncx is not None:
+            navigation = _read_ncx(archive, ncx.name)
+
+    if navigation is None or not (navigation.toc and navigation.pages):
+        return None
+    return navigation
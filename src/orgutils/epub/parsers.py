@@ -1,53 +1,236 @@
+import json
+import multiprocessing
+import os
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from ebooklib import epub
 from lxml import etree
 
+from ..cache import DiskCache, file_digest
+from .archive import EpubArchive
+from .navigation import Navigation, NavTarget, read_navigation
+
+XHTML_NS = "http://www.w3.org/1999/xhtml"
+EPUB_TYPE = "{http://www.idpf.org/2007/ops}type"
+
 # NOTE: Page information is embedded in the element like this:
 #
 # <span id="p144" aria-label=" page 144. " epub:type="pagebreak" role="doc-pagebreak"/>
 
+# The headings (tag, title) on each page; those before the first page are on None:
+Structure = Dict[Optional[str], List[Tuple[str, str]]]
+
+_HEADING_TAGS = frozenset(f"{{{ XHTML_NS }}}h{ i }" for i in (1, 2, 3))
+_SPAN_TAG = f"{{{ XHTML_NS }}}span"
+
+
+def _page(elem: etree._Element) -> Optional[str]:
+    """Get the page of a pagebreak from its id, e.g., "p144", or None if not one."""
+    if elem.tag != _SPAN_TAG or elem.get(EPUB_TYPE) != "pagebreak":
+        return None
+    id = elem.get("id")
+    return None if id is None else id[1:]
+
+
+def _scan_document(content: bytes) -> List[Tuple]:
+    """Get the pagebreaks and headings of an XHTML document in document order.
+
+    Pagebreaks are ``("page", page)`` and headings ``(tag, title, page)`` entries,
+    where ``page`` is the first pagebreak in the heading, if any.
+    """
+    root = etree.fromstring(content)
+
+    events: List[Tuple] = []
+    for elem in root.iter(_SPAN_TAG, *_HEADING_TAGS):
+        if elem.tag == _SPAN_TAG:
+            if (page := _page(elem)) is not None:
+                events.append(("page", page))
+        else:
+            page = next(
+                (p for e in elem.iter(_SPAN_TAG) if (p := _page(e)) is not None),
+                None,
+            )
+            title = "".join(elem.itertext()).strip()
+            events.append((etree.QName(elem).localname, title, page))
+    return events
+
+
+# Archive opened by each worker process of parse_ebook_structure:
+_worker_archive: Optional[EpubArchive] = None
+
+
+def _open_worker_archive(epub_path: str) -> None:
+    global _worker_archive
+    _worker_archive = EpubArchive(epub_path)
+
+
+def _scan_worker_document(name: str) -> List[Tuple]:
+    assert _worker_archive is not None, "worker archive not opened"
+    return _scan_document(_worker_archive.read(name))
+
+
+_ATTRIBUTE_SEPARATORS = frozenset(b" \t\r\n")
+
+
+def _find_attribute(content: bytes, needle: bytes, start: int, end: int) -> int:
+    """Find an attribute, e.g., ``id="x"``, but not one ending in it (``data-id``)."""
+    offset = content.find(needle, start, end)
+    while offset > 0 and content[offset - 1] not in _ATTRIBUTE_SEPARATORS:
+        offset = content.find(needle, offset + 1, end)
+    return offset
+
+
+def _id_offsets(content: bytes, ids: Iterable[str]) -> Dict[str, int]:
+    """Get the offsets of element ids in an XHTML document, without parsing it.
+
+    The ids are searched for from the previous match on, so that ids in document
+    order are found in a single pass.
+    """
+    offsets = {}
+    start = 0
+    for id in ids:
+        for quote in ('"', "'"):
+            needle = f"id={ quote }{ id }{ quote }".encode()
+            offset = _find_attribute(content, needle, start, len(content))
+            if offset < 0:
+                offset = _find_attribute(content, needle, 0, start + len(needle))
+            if offset >= 0:
+                offsets[id] = start = offset
+                break
+    return offsets
+
+
+def _structure_from_navigation(
+    archive: EpubArchive, navigation: Navigation
+) -> Structure:
+    """Get the headings on each page from the table of contents and page list.
+
+    Targets are ordered by spine position; only the documents linked from both the
+    table of contents and the page list are read, to order their targets by offset.
+    """
+    spine = {name: i for i, name in enumerate(archive.spine_documents())}
+    toc_fragments: Dict[str, List[str]] = defaultdict(list)
+    for target in navigation.toc:
+        if target.fragment:
+            toc_fragments[target.name].append(target.fragment)
+    page_fragments: Dict[str, List[str]] = defaultdict(list)
+    for target in navigation.pages:
+        if target.fragment:
+            page_fragments[target.name].append(target.fragment)
+
+    offsets = {}
+    for name in toc_fragments.keys() & page_fragments.keys():
+        try:
+            content = archive.read(name)
+        except KeyError:
+            continue
+        offsets[name] = _id_offsets(content, toc_fragments[name])
+        offsets[name].update(_id_offsets(content, page_fragments[name]))
+
+    def sort_key(target: NavTarget, is_page: bool) -> Tuple:
+        if target.fragment is None:
+            offset = 0
+        else:
+            # Targets in unread documents keep their order in the navigation file:
+            offset = offsets.get(target.name, {}).get(target.fragment, 1)
+        # Pages come first at the same offset, e.g. at the start of a document:
+        return spine.get(target.name, len(spine)), offset, not is_page
+
+    entries = [(sort_key(t, True), ("page", t.label)) for t in navigation.pages] + [
+        (sort_key(t, False), (f"h{ t.level }", t.label, None))
+        for t in navigation.toc
+        if t.level <= 3
+    ]
+    entries.sort(key=lambda entry: entry[0])
+    return _merge_documents([[event for _, event in entries]])
+
+
+def parse_ebook_structure(
+    epub_path: str, jobs: Optional[int] = None, use_nav: bool = True
+) -> Structure:
+    """Get the headings on each page of an EPUB.
+
+    If ``use_nav`` is true and the EPUB has a table of contents and a page list, only
+    these are read. Otherwise, the spine documents are read from the archive one at a
+    time, scanned in parallel by ``jobs`` processes (default: number of CPUs, or 1 in
+    a worker process, so as not to nest pools), and merged in spine order. All of
+    them are scanned: without a page list, any of them may have pagebreaks, and
+    without a table of contents, any may have headings.
+    """
+    with EpubArchive(epub_path) as archive:
+        navigation = read_navigation(archive) if use_nav else None
+        if navigation is not None:
+            return _structure_from_navigation(archive, navigation)
+
+        names = archive.spine_documents()
+        if jobs is None:
+            jobs = 1 if multiprocessing.parent_process() else os.cpu_count() or 1
+        jobs = min(jobs, len(names))
+        if jobs <= 1:
+            return _merge_documents(
+                _scan_document(archive.read(name)) for name in names
+            )
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_open_worker_archive,
+        initargs=(str(epub_path),),
+    ) as executor:
+        chunksize = max(1, len(names) // (4 * jobs))
+        return _merge_documents(
+            executor.map(_scan_worker_document, names, chunksize=chunksize)
+        )
+
+
+def _merge_documents(documents: Iterable[List[Tuple]]) -> Structure:
+    current_page: Optional[str] = None
+    book_items: Structure = defaultdict(list)
+    for events in documents:
+        for event in events:
+            if event[0] == "page":
+                current_page = event[1]
+                _ = book_items[current_page]
+            else:
+                tag, title, page = event
+                if page is not None:
+                    current_page = page
+                book_items[current_page].append((tag, title))
+    return book_items
+
+
+_STRUCTURE_CACHE_VERSION = 2
+
+# Max. total size of cached EPUB structures:
+STRUCTURE_CACHE_SIZE = 64 * 1024 * 1024
+
+
+def get_ebook_structure(
+    epub_path: str,
+    use_cache: bool = True,
+    jobs: Optional[int] = None,
+    use_nav: bool = True,
+) -> Structure:
+    """Get the headings on each page, like ``parse_ebook_structure``.
+
+    The structure of each EPUB is cached, keyed by its content hash, so that the
+    EPUB is parsed only once.
+    """
+    if not use_cache:
+        return parse_ebook_structure(epub_path, jobs, use_nav)
+
+    cache = DiskCache("epub", ".json", max_size=STRUCTURE_CACHE_SIZE)
+    mode = "nav" if use_nav else "scan"
+    key = f"{ file_digest(epub_path) }-{ _STRUCTURE_CACHE_VERSION }-{ mode }"
 
-def parse_ebook_structure(epub_path):
-    book = epub.read_epub(epub_path)
-    namespaces = {
-        "xhtml": "http://www.w3.org/1999/xhtml",
-        "epub": "http://www.idpf.org/2007/ops",
-    }
-
-    current_page: str = None
-    book_items = defaultdict(list)
-
-    for item in book.get_items():
-        if item.get_name().endswith((".html", ".xhtml")):
-            content = item.get_content()
-            try:
-                root = etree.fromstring(content)
-
-                for elem in root.xpath(
-                    '//xhtml:h1 | //xhtml:h2 | //xhtml:h3 | //xhtml:span[@epub:type="pagebreak"] ',
-                    namespaces=namespaces,
-                ):
-                    if etree.QName(elem).localname == "span":
-                        current_page = elem.attrib.get("id")[1:]
-                        _ = book_items[current_page]
-                    else:
-                        title = (
-                            elem.xpath("string()").strip()
-                            if elem.xpath("string()").strip()
-                            else ""
-                        )
-                        tag = elem.tag.split("}")[-1]
-
-                        subelems = elem.xpath(
-                            './/xhtml:span[@epub:type="pagebreak"]',
-                            namespaces=namespaces,
-                        )
-                        if subelems and etree.QName(subelems[0]).localname == "span":
-                            current_page = subelems[0].attrib.get("id")[1:]
-
-                        book_items[current_page].append((tag, title))
-            except etree.XMLSyntaxError:
-                raise
+    cached = cache.get(key)
+    if cached is not None:
+        # Pages are kept as a list of pairs, as the first page may be None:
+        return {
+            page: [(tag, title) for tag, title in items]
+            for page, items in json.loads(cached)
+        }
 
+    book_items = parse_ebook_structure(epub_path, jobs, use_nav)
+    cache.put(key, json.dumps(list(book_items.items())).encode())
     return book_items
@@ -1,33 +1,89 @@
 """CLI for Org Kindle exporter."""
 
 from argparse import ArgumentParser
+from pathlib import Path
 
-from .converters import convert_html_to_org, export_to_org
+from .converters import batch_convert, convert_to_org
 
 
-def cli() -> None:
+def cli() -> int | None:
     """CLI entry point."""
     p = ArgumentParser(description=__doc__)
     p.add_argument(
-        "dump", help="JSON (via Bookcision) or HTML (via Kindle) export file"
+        "dump",
+        nargs="+",
+        help="JSON (via Bookcision) or HTML (via Kindle) export file(s); "
+        "directories and glob patterns are expanded with --output-dir",
     )
     p.add_argument(
         "--format",
         "-f",
         choices=("json", "html"),
-        default="json",
-        help="Export file format (default: json)",
+        default=None,
+        help="Export file format (default: from file extension, else json)",
     )
     p.add_argument("--lang", "-l", choices=("en", "ja"), default="en", help="Language")
+    p.add_argument(
+        "--nfkc",
+        action="store_true",
+        help="Fold the width of characters (NFKC) in Japanese text (with --lang ja)",
+    )
     p.add_argument("--epub", "-e", type=str, help=".epub file")
+    p.add_argument(
+        "--heading-window",
+        type=int,
+        default=1,
+        help="Max. location distance of the highlight giving its text to a heading "
+        "note without text (JSON only; default: 1)",
+    )
+    p.add_argument(
+        "--output-dir",
+        "-o",
+        help="Write one Org file per export to the directory, converting in parallel "
+        "(an HTML export uses the .epub file of the same name, if any)",
+    )
+    p.add_argument(
+        "--jobs", "-j", type=int, help="Number of worker processes for --output-dir"
+    )
+    p.add_argument(
+        "--merge",
+        "-m",
+        action="store_true",
+        help="Merge new highlights into existing Org files in --output-dir, keeping "
+        "everything else in them",
+    )
 
     args = p.parse_args()
 
-    {
-        "json": export_to_org,
-        "html": convert_html_to_org,
-    }[args.format](**vars(args))
+    if args.output_dir is None:
+        if len(args.dump) != 1 or Path(args.dump[0]).is_dir():
+            p.error("give --output-dir to convert multiple exports")
+        if args.merge:
+            p.error("--merge requires --output-dir")
+        convert_to_org(
+            args.dump[0],
+            args.lang,
+            args.format,
+            args.epub,
+            heading_window=args.heading_window,
+            nfkc=args.nfkc,
+        )
+        return None
+
+    if args.epub:
+        p.error("--epub cannot be used with --output-dir")
+    failures = batch_convert(
+        args.dump,
+        args.output_dir,
+        args.lang,
+        args.format,
+        args.jobs,
+        heading_window=args.heading_window,
+        merge=args.merge,
+        nfkc=args.nfkc,
+    )
+    return 1 if failures else None
 
 
 if __name__ == "__main__":
-    raise SystemExit(cli())  # type: ignore
+    raise SystemExit(cli())
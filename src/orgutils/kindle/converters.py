@@ -4,51 +4,118 @@ Use Bookcision to JSON export Kindle highlights and notes in Amazon
 Cloud Reader.
 """
 
+import bisect
+import glob
+import heapq
+import io
+import itertools
 import json
+import os
 import re
-from collections import defaultdict, namedtuple
+import sys
+import time
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Optional, TextIO, Tuple
 
-from lxml import etree, html
+from lxml import etree
 
 from .. import utils
-from ..epub.parsers import parse_ebook_structure
+from ..epub.parsers import get_ebook_structure
+from ..org import merge as org_merge
 from ..org import structs
 
 KindleHighlight = namedtuple("KindleHighlight", ("location", "data"))
 
 
-def export_to_org(dump: str, lang: str, **kwargs) -> None:
-    """Take Bookcision JSON dump and export as Org."""
+_VOCAB_NOTE_RE = re.compile(r"^(?:[vV](?:ocab)?|語彙|表現)\s*(|.*)$")
+
+_HEADING_NOTE_RE = re.compile(r"^[hH](\d+)(|\s+(.*))$")
+
+
+def _classify_note(note: str) -> Tuple[str, Optional[re.Match[str]]]:
+    """Classify a highlight by its note as "vocab", "heading", or "quote".
+
+    The match of the note is returned for vocab and heading, None for quote.
+    """
+    if m := _VOCAB_NOTE_RE.match(note):
+        return "vocab", m
+    if m := _HEADING_NOTE_RE.match(note):
+        return "heading", m
+    return "quote", None
+
+
+class _LocationIndex:
+    """Sorted index of highlights with text, to look up by location."""
+
+    def __init__(self, items: Iterable[KindleHighlight]) -> None:
+        self._items = sorted(
+            (item for item in items if item.data.get("text")),
+            key=lambda item: item.location,
+        )
+        self._locations = [item.location for item in self._items]
+
+    def nearest(self, location: int, window: int) -> Optional[KindleHighlight]:
+        """Find the nearest highlight within the window, preferring shorter text."""
+        lo = bisect.bisect_left(self._locations, location - window)
+        hi = bisect.bisect_right(self._locations, location + window)
+        if lo == hi:
+            return None
+        return min(
+            self._items[lo:hi],
+            key=lambda item: (abs(item.location - location), len(item.data["text"])),
+        )
+
+
+def export_to_org(
+    dump: str,
+    lang: str,
+    fp: Optional[TextIO] = None,
+    heading_window: int = 1,
+    nfkc: bool = False,
+    **kwargs,
+) -> None:
+    """Take Bookcision JSON dump and export as Org.
+
+    A heading note without text takes the text of the nearest highlight within
+    ``heading_window`` locations. The title, texts, and notes are normalized for
+    ``lang`` all at once (see ``utils.text_normalizer``).
+    """
     with open(dump) as f:
         jd = json.load(f)
 
-    preprocess = (
-        utils.remove_whitespaces_between_zenkaku if lang == "ja" else lambda s: s
-    )
-
-    title = preprocess(jd["title"])
     authors = jd["authors"]
     asin = jd["asin"]
     highlights = jd["highlights"]
 
-    # Sort items by location
-    sorted_items = [KindleHighlight(x["location"]["value"], x) for x in highlights]
+    normalize = utils.text_normalizer(lang, nfkc=nfkc)
+    title, *texts = normalize(
+        [jd["title"]]
+        + [x.get("text") or "" for x in highlights]
+        + [x.get("note") or "" for x in highlights]
+    )
+    texts, notes = texts[: len(highlights)], texts[len(highlights) :]
+
+    # Classify items by note, and sort them by location. The original note is kept
+    # in the data, as a note to a quote is not normalized.
+    items = [
+        (
+            KindleHighlight(x["location"]["value"], {**x, "text": text}),
+            *_classify_note(note),
+        )
+        for x, text, note in zip(highlights, texts, notes)
+    ]
 
     base_heading_depth = 1
-    sorted_items = sorted(
-        sorted_items,
+    items.sort(
         key=lambda item: (
-            item.location,
-            (
-                # Make header lines come earliest if they are on the
-                # same location:
-                -1
-                if (item.data.get("note") or "").startswith("h")
-                or (item.data.get("note") or "").startswith("H")
-                else 0
-            ),
+            item[0].location,
+            # Make header lines come earliest if they are on the same location:
+            -1 if item[1] == "heading" else 0,
         ),
     )
+    index = _LocationIndex(item for item, kind, _ in items if kind != "vocab")
 
     # Org tree for vocab
     org_vocab: list[structs.OrgObject] = []
@@ -68,33 +135,22 @@ def export_to_org(dump: str, lang: str, **kwargs) -> None:
     )
 
     # Parse items in the order of location
-    idx = 0
-    while idx < len(sorted_items):
-        item = sorted_items[idx]
-
-        # Vocab
-        m = re.match(
-            r"^(?:[vV](ocab)?|語彙|表現)\s*(|.*)$", item.data.get("note") or ""
-        )
-        if m:
+    for item, kind, m in items:
+        if kind == "vocab":
+            assert m is not None
             org_vocab.append(
                 structs.Heading(
-                    preprocess(m.group(1) or item.data["text"]),
+                    m.group(1) or item.data["text"],
                     1 + base_heading_depth,
                     {"kindle_loc": item.location},
                 )
             )
             org_vocab.append(
-                structs.QuoteBlock(
-                    f"{ preprocess(item.data['text']) } (loc. { item.location })"
-                )
+                structs.QuoteBlock(f"{ item.data['text'] } (loc. { item.location })")
             )
-            idx += 1
-            continue
 
-        # Header
-        m = re.match(r"^[hH](\d+)(|\s+(.*))$", item.data.get("note") or "")
-        if m:
+        elif kind == "heading":
+            assert m is not None
             heading_depth = int(m.group(1))
 
             text = m.group(3) or item.data["text"]
@@ -103,171 +159,466 @@ def export_to_org(dump: str, lang: str, **kwargs) -> None:
                 # and highlight locations do not match, or a separate
                 # note item exists at the same location. Look for the
                 # closest highlight text that looks like a heading.
-                items = sorted(
-                    [
-                        (
-                            abs(sorted_items[idx + 1].location - item.location),
-                            len(sorted_items[idx + 1].data["text"]),
-                            sorted_items[idx + 1],
-                        ),
-                        (
-                            abs(sorted_items[idx - 1].location - item.location),
-                            len(sorted_items[idx - 1].data["text"]),
-                            sorted_items[idx - 1],
-                        ),
-                    ]
-                )
-                if items[0][0] <= 1:
-                    text = items[0][2].data["text"]
-                else:
-                    text = "--MISSING--"
+                nearest = index.nearest(item.location, heading_window)
+                text = nearest.data["text"] if nearest else "--MISSING--"
 
             org.append(
                 structs.Heading(
-                    preprocess(text),
+                    text,
                     heading_depth + base_heading_depth,
                     {"kindle_loc": item.location},
                 )
             )
-            idx += 1
-            continue
 
-        # Quote
-        org.append(
-            structs.QuoteBlock(
-                f"{ preprocess(item.data['text']) } (loc. { item.location })"
+        else:
+            org.append(
+                structs.QuoteBlock(f"{ item.data['text'] } (loc. { item.location })")
             )
-        )
-        if item.data.get("note"):
-            org.append(structs.Paragraph(item.data["note"]))
-        idx += 1
+            if item.data.get("note"):
+                org.append(structs.Paragraph(item.data["note"]))
 
     # render org doc
-    print(structs.dumps(org))
-    print(structs.dumps(org_vocab))
+    structs.dump(org, fp)
+    structs.dump(org_vocab, fp)
+
+
+# The div classes in Kindle notebook HTML exports:
+_NOTEBOOK_CLASSES = frozenset(
+    ["authors", "bookTitle", "citation", "noteHeading", "noteText", "sectionHeading"]
+)
+
+
+if TYPE_CHECKING:
+    # The parser target protocol exists in the lxml stubs only:
+    _ParserTarget = etree.ParserTarget[None]
+else:
+    _ParserTarget = object
+
+
+class _NotebookTarget(_ParserTarget):
+    """Parser target collecting the text of notebook divs in document order.
+
+    Kindle leaves ``noteText`` divs unclosed, so the parser nests the rest of the
+    document inside them. As notebook divs do not nest otherwise, one still open
+    when the next starts is closed then, and each div is emitted once closed.
+    """
+
+    def __init__(self) -> None:
+        self.divs: deque[tuple[str, str]] = deque()
+        self._collector: Optional[tuple[str, list[str]]] = None  # the open div
+        self._open: list[Optional[tuple[str, list[str]]]] = []  # collected or None
+
+    def start(self, tag: str, attrib: dict[str, str]) -> None:
+        if tag != "div":
+            return
+        cls = attrib.get("class")
+        if cls in _NOTEBOOK_CLASSES:
+            self._emit()
+            self._collector = (cls, [])
+            self._open.append(self._collector)
+        else:
+            self._open.append(None)
+
+    def end(self, tag: str) -> None:
+        if tag != "div" or not self._open:
+            return
+        if self._open.pop() is self._collector:
+            self._emit()
+
+    def data(self, data: str) -> None:
+        if self._collector is not None:
+            self._collector[1].append(data)
+
+    def close(self) -> None:
+        self._emit()
+
+    def _emit(self) -> None:
+        if self._collector is not None:
+            cls, parts = self._collector
+            self.divs.append((cls, "".join(parts).strip()))
+            self._collector = None
+
+
+def _iter_notebook_divs(
+    f: TextIO, chunk_size: int = 1 << 16
+) -> Iterator[tuple[str, str]]:
+    """Stream (class, text) of notebook divs from Kindle HTML export."""
+    target = _NotebookTarget()
+    parser = etree.HTMLParser(target=target)
+    while chunk := f.read(chunk_size):
+        parser.feed(chunk)
+        while target.divs:
+            yield target.divs.popleft()
+    parser.close()
+    while target.divs:
+        yield target.divs.popleft()
+
+
+class _Lookahead:
+    """Iterator wrapper allowing to peek at a few upcoming items."""
+
+    def __init__(self, it: Iterator) -> None:
+        self._it = it
+        self._buf: deque = deque()
+
+    def peek(self, n: int) -> list:
+        while len(self._buf) < n:
+            try:
+                self._buf.append(next(self._it))
+            except StopIteration:
+                break
+        return list(itertools.islice(self._buf, n))
+
+    def pop(self) -> Any:
+        if self._buf:
+            return self._buf.popleft()
+        return next(self._it, None)
+
+
+def _is_heading_markup(divs: list[tuple[str, str]]) -> bool:
+    """See if the divs are a note with heading markup, e.g., "h2"."""
+    return (
+        divs[0][0] == "noteHeading"
+        and divs[0][1].startswith("Note")
+        and divs[1][0] == "noteText"
+        and _HEADING_NOTE_RE.match(divs[1][1]) is not None
+    )
+
+
+_PAGE_RE = re.compile(r"\bPage\s+(\S+)")
+_LOCATION_RE = re.compile(r"\bLocation\s+(\d+)")
 
 
-def convert_html_to_org(dump: str, lang: str, epub: str = None, **kwargs) -> None:
-    """Take HTML export file and convert to Org."""
+def _page_from_loc(loc: str) -> str | None:
+    """Get the page from a location like "Page 12 · Location 100"."""
+    m = _PAGE_RE.search(loc)
+    return m.group(1) if m else None
+
+
+def _location_from_loc(loc: str) -> int | None:
+    m = _LOCATION_RE.search(loc)
+    return int(m.group(1)) if m else None
+
+
+class _PageIndex:
+    """Pages in reading order, to make sort keys for any page.
+
+    A page not in the index sorts right after the indexed page preceding it in
+    numeric order.
+    """
+
+    def __init__(self, pages: Iterable[str | None]) -> None:
+        self._positions: dict[str | None, int] = {}
+        for page in pages:
+            self._positions.setdefault(page, len(self._positions))
+        entries = sorted(
+            (utils.page_sort_key(p), i) for p, i in self._positions.items()
+        )
+        self._keys = [key for key, _ in entries]
+        self._ordered = [i for _, i in entries]
+
+    def key(self, page: str | None) -> tuple:
+        if page in self._positions:
+            return (self._positions[page], 0)
+        sort_key = utils.page_sort_key(page)
+        i = bisect.bisect_right(self._keys, sort_key)
+        return (self._ordered[i - 1] if i else -1, 1, sort_key)
+
+
+# Highlight or heading of an HTML export:
+# A heading if ``level`` is set, else a quote of a highlight at ``loc``:
+_Annotation = namedtuple("_Annotation", ("page", "location", "text", "level", "loc"))
+
+
+def _annotation_object(a: _Annotation, text: str) -> structs.OrgObject:
+    if a.level is not None:
+        return structs.Heading(text, a.level)
+    return structs.QuoteBlock(f"{ text } ({ a.loc })")
+
+
+def _infer_pages(annotations: List[_Annotation]) -> List[_Annotation]:
+    """Give annotations without page the page of the closest preceding location."""
+    paged = sorted(
+        (a.location, a.page)
+        for a in annotations
+        if a.page is not None and a.location is not None
+    )
+    locations = [location for location, _ in paged]
+    result = []
+    for a in annotations:
+        if a.page is None and a.location is not None:
+            i = bisect.bisect_right(locations, a.location)
+            if i:
+                a = a._replace(page=paged[i - 1][1])
+        result.append(a)
+    return result
+
+
+def convert_html_to_org(
+    dump: str,
+    lang: str,
+    epub: Optional[str] = None,
+    fp: Optional[TextIO] = None,
+    nfkc: bool = False,
+    **kwargs,
+) -> None:
+    """Take HTML export file and convert to Org.
+
+    The export is streamed in a single pass, looking at most four divs ahead. The
+    highlights, sorted by page and location, are merged with the headings of the
+    EPUB, which come first on each page. The book title and highlights are
+    normalized for ``lang`` all at once (see ``utils.text_normalizer``).
+    """
     base_heading_depth = 1
+    heading_depth: Optional[int]
 
-    book_parts = defaultdict(list)
-    for page, items in (parse_ebook_structure(epub) if epub else {}).items():
-        _ = book_parts[page]
+    structure = get_ebook_structure(epub) if epub else {}
+    index = _PageIndex(structure)
+    epub_headings: List[Tuple[tuple, structs.Heading]] = []
+    for page, items in structure.items():
         for tag, text in items:
             if tag.startswith(("h", "H")):
                 heading_depth = int(tag[1:]) + base_heading_depth
-                book_parts[page].append(
-                    structs.Heading(text, heading_depth, {"page": page})
+                epub_headings.append(
+                    (
+                        (index.key(page), 0, len(epub_headings)),
+                        structs.Heading(text, heading_depth, {"page": page}),
+                    )
                 )
 
-    with open(dump) as f:
-        tree = html.parse(f)
-
-    def extract_text(el: etree.Element) -> str:
-        return ("".join(el.itertext())).strip()
-
-    divs: list[etree.Element] = tree.xpath(
-        "//div["
-        + " or ".join(
-            [
-                f"@class='{s}'"
-                for s in [
-                    "authors",
-                    "bookTitle",
-                    "citation",
-                    "noteHeading",
-                    "noteText",
-                    "sectionHeading",
-                ]
-            ]
-        )
-        + "]"
-    )
-
     book_title = ""
     book_authors = ""
     citation = ""
+    annotations: List[_Annotation] = []
 
-    while divs:
-        div = divs.pop(0)
-
-        if div.attrib.get("class") == "bookTitle":
-            book_title = extract_text(div)
-        elif div.attrib.get("class") == "authors":
-            book_authors = extract_text(div)
-        elif div.attrib.get("class") == "citation":
-            citation = extract_text(div)
-
-        elif div.attrib.get("class") == "sectionHeading":
-            section = extract_text(div)
-            if (
-                len(divs) > 3
-                and divs[0].attrib.get("class") == "noteHeading"
-                and extract_text(divs[0]).startswith("Note")
-                and divs[1].attrib.get("class") == "noteText"
-                and re.match(r"^[hH](\d+)(|\s+(.*))$", extract_text(divs[1]))
-                and divs[2].attrib.get("class") == "noteHeading"
-                and extract_text(divs[2]).startswith("Highlight")
-                and divs[3].attrib.get("class") == "noteText"
-                # and re.match(r"^[hH](\d+)(|\s+(.*))$", extract_text(divs[1]))
-            ):
-                divs.pop(0)
-                div = divs.pop(0)
-                code = extract_text(div)
-
-                divs.pop(0)
-                div = divs.pop(0)
-                section_heading = extract_text(div)
-
-                m = re.match(r"^[hH](\d+)(|\s+(.*))$", code)
-                if m:
+    with open(dump) as f:
+        divs = _Lookahead(_iter_notebook_divs(f))
+        while div := divs.pop():
+            cls, text = div
+
+            if cls == "bookTitle":
+                book_title = text
+            elif cls == "authors":
+                book_authors = text
+            elif cls == "citation":
+                citation = text
+
+            elif cls == "sectionHeading":
+                ahead = divs.peek(4)
+                if (
+                    len(ahead) == 4
+                    and _is_heading_markup(ahead)
+                    and ahead[2][0] == "noteHeading"
+                    and ahead[2][1].startswith("Highlight")
+                    and ahead[3][0] == "noteText"
+                ):
+                    # The section heading is marked up by a note, and its text is
+                    # highlighted right after.
+                    divs.pop()
+                    code = divs.pop()[1]
+                    heading = divs.pop()[1]
+                    section_heading = divs.pop()[1]
+                    m = _HEADING_NOTE_RE.match(code)
+                    if not m:
+                        raise ValueError("Error: section heading parsing")
                     heading_depth = int(m.group(1)) + base_heading_depth
-                    org.append(structs.Heading(section_heading, heading_depth))
-                else:
-                    # org.append(structs.QuoteBlock(f"{ text } ({ loc })"))
-                    raise ValueError("Error: section heading parsing")
-            # else:
-            #     org.append(structs.Heading(section, 1, {}))
-
-        elif div.attrib.get("class") == "noteHeading":
-            heading = extract_text(div)
-            if heading.startswith("Highlight"):
-                heading, loc = heading.split(" - ")
+                    _, _, loc = heading.partition(" - ")
+                    annotations.append(
+                        _Annotation(
+                            _page_from_loc(loc),
+                            _location_from_loc(loc),
+                            section_heading,
+                            heading_depth,
+                            loc,
+                        )
+                    )
+
+            elif cls == "noteHeading" and text.startswith("Highlight"):
+                heading, loc = text.split(" - ")
                 heading, loc = heading.strip(), loc.strip()
-                page = loc.split()[-1] if loc.startswith("Page ") else None
+                page = _page_from_loc(loc)
+                location = _location_from_loc(loc)
 
-                div = divs.pop(0)
-                if div.attrib.get("class") == "noteText":
-                    text = extract_text(div)
+                div = divs.pop()
+                if div and div[0] == "noteText":
+                    text = div[1]
 
                     # See if the next heading-text pair is markup
-                    if (
-                        len(divs) > 1
-                        and divs[0].attrib.get("class") == "noteHeading"
-                        and extract_text(divs[0]).startswith("Note")
-                        and divs[1].attrib.get("class") == "noteText"
-                        and re.match(r"^[hH](\d+)(|\s+(.*))$", extract_text(divs[1]))
-                    ):
-                        divs.pop(0)
-                        div = divs.pop(0)
-                        t = extract_text(div)
-                        m = re.match(r"^[hH](\d+)(|\s+(.*))$", t)
-                        if m:
-                            heading_depth = int(m.group(1)) + base_heading_depth
-                            org.append(structs.Heading(text, heading_depth, {}))
-                        else:
-                            org.append(structs.QuoteBlock(f"{ text } ({ loc })"))
+                    ahead = divs.peek(2)
+                    if len(ahead) == 2 and _is_heading_markup(ahead):
+                        divs.pop()
+                        m = _HEADING_NOTE_RE.match(divs.pop()[1])
+                        assert m is not None  # by _is_heading_markup
+                        heading_depth = int(m.group(1)) + base_heading_depth
                     else:
-                        book_parts[page].append(
-                            structs.QuoteBlock(f"{ text } ({ loc })")
-                        )
+                        heading_depth = None
+                    annotations.append(
+                        _Annotation(page, location, text, heading_depth, loc)
+                    )
+
+    normalize = utils.text_normalizer(lang, nfkc=nfkc)
+    book_title, *texts = normalize([book_title] + [a.text for a in annotations])
+    highlights = sorted(
+        (
+            (index.key(a.page), 1, -1 if a.location is None else a.location, i),
+            _annotation_object(a, text),
+        )
+        for i, (a, text) in enumerate(zip(_infer_pages(annotations), texts))
+    )
+    org: Iterable[structs.OrgObject] = itertools.chain(
+        [structs.Heading(book_title, 1, {"AUTHORS": book_authors})],
+        (obj for _, obj in heapq.merge(epub_headings, highlights, key=lambda e: e[0])),
+    )
+    if citation:
+        org = itertools.chain(
+            org, [structs.Heading("Citation", 1), structs.Paragraph(citation)]
+        )
 
-    org: list[structs.OrgObject] = [v for _, vs in book_parts.items() for v in vs]
+    structs.dump(org, fp)
 
-    org = [structs.Heading(book_title, 1, {"AUTHORS": book_authors})] + org
-    if citation:
-        org.append(structs.Heading("Citation", 1))
-        org.append(structs.Paragraph(citation))
 
-    print(structs.dumps(org))
+FORMATS = {".json": "json", ".html": "html", ".htm": "html"}
+
+
+def convert_to_org(
+    dump: str,
+    lang: str,
+    format: Optional[str] = None,
+    epub: Optional[str] = None,
+    fp: Optional[TextIO] = None,
+    heading_window: int = 1,
+    nfkc: bool = False,
+) -> None:
+    """Convert JSON or HTML export to Org.
+
+    If ``format`` is not given, detect it from the file extension (default: json).
+    """
+    format = format or FORMATS.get(Path(dump).suffix.lower(), "json")
+    if format == "json":
+        export_to_org(dump, lang, fp=fp, heading_window=heading_window, nfkc=nfkc)
+    else:
+        convert_html_to_org(dump, lang, epub=epub, fp=fp, nfkc=nfkc)
+
+
+def _find_exports(paths: Iterable[str]) -> List[Path]:
+    """Expand directories and glob patterns to export files."""
+    found: List[Path] = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(
+                sorted(p for p in Path(path).iterdir() if p.suffix.lower() in FORMATS)
+            )
+        elif os.path.exists(path):
+            found.append(Path(path))
+        else:
+            found.extend(Path(p) for p in sorted(glob.glob(path)))
+    return found
+
+
+def _output_filenames(dumps: List[Path]) -> List[str]:
+    """Name outputs after the exports, keeping the extension for stem clashes, and
+    adding the export number for exports of the same name in different directories.
+    """
+    stems = Counter(dump.stem for dump in dumps)
+    names = [
+        f"{ dump.stem }-{ dump.suffix[1:] }" if stems[dump.stem] > 1 else dump.stem
+        for dump in dumps
+    ]
+    counts = Counter(names)
+    return [
+        f"{ name }-{ i }.org" if counts[name] > 1 else f"{ name }.org"
+        for i, name in enumerate(names)
+    ]
+
+
+def _convert_file(
+    dump: Path,
+    output: Path,
+    lang: str,
+    format: Optional[str],
+    heading_window: int,
+    merge: bool = False,
+    nfkc: bool = False,
+) -> float:
+    start = time.perf_counter()
+    epub = dump.with_suffix(".epub")
+    args = (str(dump), lang, format, str(epub) if epub.exists() else None)
+    if merge and output.exists():
+        buf = io.StringIO()
+        convert_to_org(*args, fp=buf, heading_window=heading_window, nfkc=nfkc)
+        org_merge.merge_file(output, buf.getvalue())
+        return time.perf_counter() - start
+
+    tmp = output.with_name(output.name + ".tmp")
+    try:
+        with open(tmp, "w") as f:
+            convert_to_org(*args, fp=f, heading_window=heading_window, nfkc=nfkc)
+        os.replace(tmp, output)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return time.perf_counter() - start
+
+
+def batch_convert(
+    paths: Iterable[str],
+    output_dir: str | Path,
+    lang: str,
+    format: Optional[str] = None,
+    jobs: Optional[int] = None,
+    heading_window: int = 1,
+    merge: bool = False,
+    nfkc: bool = False,
+) -> List[Tuple[Path, BaseException]]:
+    """Convert exports to Org files in a directory, using a pool of processes.
+
+    The ``paths`` may be files, directories, or glob patterns. An HTML export uses
+    the .epub file of the same name next to it, if any. If ``merge``, new highlights
+    are merged into existing Org files instead of overwriting them. A failed
+    conversion does not stop the others; the failures are returned and summarized on
+    stderr.
+    """
+    dumps = _find_exports(paths)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = [output_dir / name for name in _output_filenames(dumps)]
+
+    start = time.perf_counter()
+    timings: List[Tuple[float, Path]] = []
+    failures: List[Tuple[Path, BaseException]] = []
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(
+                _convert_file,
+                dump,
+                output,
+                lang,
+                format,
+                heading_window,
+                merge,
+                nfkc,
+            )
+            for dump, output in zip(dumps, outputs)
+        ]
+        for dump, future in zip(dumps, futures):
+            try:
+                timings.append((future.result(), dump))
+            except Exception as e:
+                failures.append((dump, e))
+    elapsed = time.perf_counter() - start
+
+    for dump, error in failures:
+        print(f"{ dump }: { type(error).__name__ }: { error }", file=sys.stderr)
+    print(
+        f"Converted { len(timings) } of { len(dumps) } files to { output_dir } "
+        f"in { elapsed:.2f}s ({ len(failures) } failed)",
+        file=sys.stderr,
+    )
+    if timings:
+        slowest, slowest_dump = max(timings)
+        print(
+            f"Per file: mean { sum(t for t, _ in timings) / len(timings):.3f}s, "
+            f"max { slowest:.3f}s ({ slowest_dump })",
+            file=sys.stderr,
+        )
+
+    return failures
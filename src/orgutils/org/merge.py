@@ -0,0 +1,222 @@
+"""Merge new exports into existing Org files.
+
+Both documents are split into units: headings, quote blocks, and paragraphs ending
+with a location like "(loc. 12)" or "(p. 3)". Lines without a unit of their own,
+e.g., notes written by hand, belong to the unit before them. Each unit of the new
+document that is not in the existing one is inserted after the existing unit with the
+closest preceding location, within the same top-level section. Everything else in the
+existing document is left untouched.
+
+Units are ordered by location, and then page. If some unit has a page but no
+location, as headings from an EPUB in a Kindle notebook, they are ordered by page
+first, and a unit without page is on the page of the unit before it.
+"""
+
+import bisect
+import os
+import re
+from collections import defaultdict, namedtuple
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import orgparse
+
+from ..utils import page_sort_key
+
+# A unit spans the lines [start, end) in the ``section`` (the top-level heading). Its
+# ``key`` is its (page, location, rank) place until made a sort key.
+Unit = namedtuple("Unit", ("section", "identity", "key", "start", "end"))
+
+_LOCATION_SUFFIX_RE = re.compile(
+    r"\((?:loc\. (?P<loc>\d+)|p\. (?P<p>[^()\s]+)"
+    r"|(?:Page (?P<page>\S+) · )?Location (?P<location>\d+))\)$"
+)
+
+
+def _key(page: Optional[str], location: Optional[int], rank: int) -> Tuple:
+    """Make a place; headings (rank 0) come before the rest at the same place."""
+    return (page, location, rank)
+
+
+def _by_page(units: List[Unit]) -> bool:
+    """Tell if the units are ordered by page first: some have no location."""
+    return any(
+        u.key is not None and u.key[0] is not None and u.key[1] is None for u in units
+    )
+
+
+def _with_sort_keys(units: List[Unit], by_page: bool) -> List[Unit]:
+    """Make the places of the units sort keys."""
+    keyed = []
+    last_page = None
+    for u in units:
+        if u.identity is None:
+            last_page = None
+        elif u.key is not None:
+            page, location, rank = u.key
+            location = -1 if location is None else location
+            if by_page:
+                page = last_page = last_page if page is None else page
+                u = u._replace(key=(page_sort_key(page), location, rank))
+            else:
+                u = u._replace(key=(location, page_sort_key(page), rank))
+        keyed.append(u)
+    return keyed
+
+
+def _suffix_key(line: str) -> Optional[Tuple]:
+    m = _LOCATION_SUFFIX_RE.search(line.rstrip())
+    if not m:
+        return None
+    if m["loc"]:
+        return _key(None, int(m["loc"]), 1)
+    if m["p"]:
+        return _key(m["p"], None, 1)
+    return _key(m["page"], int(m["location"]), 1)
+
+
+def _heading_key(properties: Mapping[str, Any]) -> Optional[Tuple]:
+    if "KINDLE_LOC" in properties:
+        return _key(None, int(properties["KINDLE_LOC"]), 0)
+    if "PAGE" in properties:
+        return _key(str(properties["PAGE"]), None, 0)
+    return None
+
+
+def _split_units(lines: List[str]) -> List[Unit]:
+    """Split the lines into units, indexed by their location keys."""
+    root = orgparse.loads("\n".join(lines))
+    headings = {node.linenumber - 1: node for node in root[1:]}
+
+    units = []
+    section = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if i in headings:
+            node = headings[i]
+            start = i
+            i += 1
+            if i < len(lines) and lines[i].strip() == ":PROPERTIES:":
+                while i < len(lines) and lines[i].strip() != ":END:":
+                    i += 1
+                i += 1
+            if node.level == 1:
+                section = node.heading
+                units.append(Unit(section, None, None, start, i))
+            else:
+                identity = ("heading", node.level, node.heading)
+                key = _heading_key(node.properties)
+                units.append(Unit(section, identity, key, start, i))
+        elif line.strip().upper() == "#+BEGIN_QUOTE":
+            start = i
+            while i < len(lines) and lines[i].strip().upper() != "#+END_QUOTE":
+                i += 1
+            content = tuple(lines[start + 1 : i])
+            key = _suffix_key(content[-1]) if content else None
+            units.append(Unit(section, ("quote", content), key, start, i + 1))
+            i += 1
+        elif line.strip() and (key := _suffix_key(line)) is not None:
+            units.append(Unit(section, ("paragraph", line), key, i, i + 1))
+            i += 1
+        else:
+            i += 1
+
+    # Extend each unit to the start of the next:
+    ends = [u.start for u in units[1:]] + [len(lines)]
+    return [u._replace(end=end) for u, end in zip(units, ends)]
+
+
+def merge(existing: str, new: str) -> Tuple[str, int]:
+    """Merge the new Org document into the existing one.
+
+    Return the merged document and the number of inserted units.
+    """
+    lines = existing.splitlines()
+    new_lines = new.splitlines()
+    units = _split_units(lines)
+    new_units = _split_units(new_lines)
+    by_page = _by_page(units + new_units)
+    units = _with_sort_keys(units, by_page)
+    new_units = _with_sort_keys(new_units, by_page)
+
+    known = {(u.section, u.identity) for u in units if u.identity is not None}
+    sections = {u.section for u in units}
+
+    # Keyed units of each section, sorted by key:
+    anchors: Dict[Optional[str], List[Tuple[Tuple, int]]] = defaultdict(list)
+    section_ends: Dict[Optional[str], int] = {}
+    for n, u in enumerate(units):
+        section_ends[u.section] = u.end
+        if u.key is not None and u.identity is not None:
+            anchors[u.section].append((u.key, n))
+    for section_anchors in anchors.values():
+        section_anchors.sort()
+
+    insertions: Dict[int, List[List[str]]] = defaultdict(list)
+    appended: List[str] = []
+    count = 0
+    last_key: Tuple = ()
+    for u in new_units:
+        chunk = new_lines[u.start : u.end]
+        if u.identity is None:
+            # A new top-level section is appended as a whole:
+            last_key = ()
+            if u.section not in sections:
+                appended.extend(chunk)
+            continue
+        last_key = u.key if u.key is not None else last_key
+        if (u.section, u.identity) in known:
+            continue
+        count += 1
+        if u.section not in sections:
+            appended.extend(chunk)
+            continue
+
+        section_anchors = anchors[u.section]
+        i = bisect.bisect_right(section_anchors, (last_key, len(units)))
+        if i:
+            pos = units[section_anchors[i - 1][1]].end
+        elif section_anchors:
+            pos = units[section_anchors[0][1]].start
+        else:
+            pos = section_ends[u.section]
+        insertions[pos].append(chunk)
+
+    out: List[str] = []
+    for i in range(len(lines) + 1):
+        for chunk in insertions.get(i, ()):
+            if out and out[-1].strip() and not chunk[0].startswith("*"):
+                out.append("")
+            out.extend(chunk)
+            if i < len(lines) and chunk[-1].strip() and lines[i].strip():
+                if not lines[i].startswith("*"):
+                    out.append("")
+        if i < len(lines):
+            out.append(lines[i])
+    if appended:
+        if out and out[-1].strip():
+            out.append("")
+        out.extend(appended)
+
+    return "\n".join(out) + "\n", count
+
+
+def merge_file(path: str | Path, new: str) -> int:
+    """Merge the new Org document into the file, creating it if missing.
+
+    Return the number of inserted units.
+    """
+    path = Path(path)
+    if path.exists():
+        merged, count = merge(path.read_text(), new)
+    else:
+        merged = new
+        count = sum(u.identity is not None for u in _split_units(new.splitlines()))
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        tmp.write_text(merged)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return count
@@ -1,83 +1,118 @@
 """Org structures."""
 
+import sys
 from dataclasses import dataclass
-from typing import Iterable, List
+from types import MappingProxyType
+from typing import Any, Iterable, Iterator, List, Mapping, Optional, TextIO
 
+# Properties shared by all nodes without any:
+EMPTY_PROPERTIES: Mapping[str, Any] = MappingProxyType({})
 
-@dataclass
+
+def _properties(properties: Optional[Mapping[str, Any]]) -> Mapping[str, Any]:
+    """Use the shared empty properties or a copy with interned keys."""
+    if not properties:
+        return EMPTY_PROPERTIES
+    return {sys.intern(k): v for k, v in properties.items()}
+
+
+# Nodes are slotted and immutable, as exports may hold hundreds of thousands.
+@dataclass(slots=True, frozen=True)
 class OrgObject:
-    def render(self) -> List[str]:
+    def render(self) -> Iterator[str]:
         raise NotImplementedError
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OrgFile(OrgObject):
     title: str
-    properties: dict
+    properties: Optional[Mapping[str, Any]] = None
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "properties", _properties(self.properties))
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Heading(OrgObject):
     title: str
     level: int
-    properties: dict = None
+    properties: Optional[Mapping[str, Any]] = None
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "properties", _properties(self.properties))
 
-    def render(self) -> List[str]:
-        lines = []
-        lines.append("*" * self.level + " " + self.title)
+    def render(self) -> Iterator[str]:
+        yield "*" * self.level + " " + self.title
         if self.properties:
-            lines.append(":PROPERTIES:")
+            yield ":PROPERTIES:"
             for k, v in self.properties.items():
-                lines.append(f":{ k.upper() }: { v }")
-            lines.append(":END:")
-        return lines
+                yield f":{ k.upper() }: { v }"
+            yield ":END:"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Paragraph(OrgObject):
     content: str
 
-    def render(self) -> List[str]:
-        return [self.content]
+    def render(self) -> Iterator[str]:
+        yield self.content
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Block(OrgObject):
     content: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class QuoteBlock(Block):
-    def render(self) -> List[str]:
-        lines = []
-        lines.append("#+BEGIN_QUOTE")
-        lines.append(self.content)
-        lines.append("#+END_QUOTE")
-        return lines
+    def render(self) -> Iterator[str]:
+        yield "#+BEGIN_QUOTE"
+        yield self.content
+        yield "#+END_QUOTE"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Group(OrgObject):
     objects: List[OrgObject]
 
-    def render(self) -> List[str]:
-        lines = []
+    def render(self) -> Iterator[str]:
         for obj in self.objects:
-            lines.extend(obj.render())
-        return lines
+            yield from obj.render()
 
 
-def dumps(org_objects: Iterable[OrgObject]) -> str:
+def iter_lines(org_objects: Iterable[OrgObject]) -> Iterator[str]:
+    """Render Org objects line by line.
+
+    Paragraphs and blocks are padded with a blank line on both sides.
+    """
     padded_structs = (Paragraph, Block)
 
-    lines: list[str] = []
+    last_line = None
     for org_object in org_objects:
         if isinstance(org_object, padded_structs):
-            if lines and lines[-1] != "":
-                lines.append("")
-            lines.extend(org_object.render())
-            lines.append("")
+            if last_line is not None and last_line != "":
+                yield ""
+            yield from org_object.render()
+            last_line = ""
+            yield last_line
         else:
-            lines.extend(org_object.render())
+            for last_line in org_object.render():
+                yield last_line
+
+
+def dumps(org_objects: Iterable[OrgObject]) -> str:
+    return "\n".join(iter_lines(org_objects))
+
+
+def dump(org_objects: Iterable[OrgObject], fp: Optional[TextIO] = None) -> None:
+    """Write Org objects to a file as they are rendered.
 
-    return "\n".join(lines)
+    The output is the same as ``print(dumps(org_objects), file=fp)``.
+    """
+    fp = fp or sys.stdout
+    lines = iter_lines(org_objects)
+    fp.write(next(lines, ""))
+    for line in lines:
+        fp.write("\n")
+        fp.write(line)
+    fp.write("\n")
@@ -1,37 +1,66 @@
 """CLI for Snipd."""
 
-import re
 from argparse import ArgumentParser
 
-from . import converter
+from . import converter, parts
 
 
-def cli() -> None:
+def cli() -> int | None:
     p = ArgumentParser()
     p.add_argument("snipd_export")
     p.add_argument("part_no", nargs="?", type=int, default=None)
     p.add_argument("--output-format", "-f", choices=("org", "html"), default="org")
+    p.add_argument(
+        "--all",
+        "-a",
+        action="store_true",
+        help="Convert all parts in parallel, writing one file per part (episode) "
+        "named after its title",
+    )
+    p.add_argument(
+        "--output-dir", "-o", help="Output directory for --all (default: current)"
+    )
+    p.add_argument(
+        "--jobs", "-j", type=int, help="Number of worker processes for --all"
+    )
+    p.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Convert every part, without reading or updating the conversion cache",
+    )
     args = p.parse_args()
 
-    with open(args.snipd_export) as f:
-        md = f.read()
+    if args.all and args.part_no is not None:
+        p.error("--all cannot be used with a part number")
+    if args.output_dir is not None and not args.all:
+        p.error("--output-dir requires --all")
+
+    if args.all:
+        with open(args.snipd_export) as f:
+            md = f.read()
+        failures = converter.convert_all(
+            md, args.output_dir or ".", args.output_format, args.jobs, args.use_cache
+        )
+        return 1 if failures else None
 
     # See if the markdown doc contains multiple top-level sections:
-    parts = re.split(r"\n# ", md)
-    if len(parts) != 1 and args.part_no is None:
+    index = parts.part_index(args.snipd_export)
+    if len(index.titles) != 1 and args.part_no is None:
         # If multiple sections exist and no part number is given, list all:
-        for i in range(len(parts)):
-            header, _ = re.split(r"\n", parts[i], 1)
-            print(f"{i}: {header}")
-        return
-    elif len(parts) == 1:
+        for i, title in enumerate(index.titles):
+            print(f"{ i }: { title }")
+        return None
+    elif len(index.titles) == 1:
         args.part_no = 0
 
-    part = parts[args.part_no]
-    part = part if part.startswith("# ") else "# " + part
-
-    output = converter.convert(part, args.output_format)
+    part = parts.read_part(args.snipd_export, index, args.part_no)
+    if args.use_cache:
+        output = converter.convert_cached(part, args.output_format)
+    else:
+        output = converter.convert(part, args.output_format)
     print(output)
+    return None
 
 
 if __name__ == "__main__":
@@ -1,7 +1,26 @@
-"""Converter via Pandoc filter."""
+"""Converter via Pandoc filter.
 
+The Markdown export is parsed to a Pandoc JSON AST (reading it back through HTML, so
+that the raw HTML in it is parsed too), filtered in-process with panflute in a
+single walk, and written to the output format: two pandoc runs per conversion.
+Org output is made without pandoc by ``fastpath`` where the Markdown allows it.
+"""
+
+import functools
+import hashlib
+import io
+import os
 import re
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from importlib import resources
+from pathlib import Path
 
+import panflute
 import pypandoc
 from panflute import (
     Doc,
@@ -16,9 +35,13 @@ from panflute import (
     Span,
     Str,
     Strong,
-    run_filters,
+    run_filter,
 )
 
+from ..cache import DiskCache
+from . import fastpath
+from .text import postprocess_org, strip_emoji
+
 _STACK: list[str] = []
 
 
@@ -66,28 +89,6 @@ def remove_paragraph_with_some_text(elem: Element, doc: Doc) -> list[Element] |
             return []
 
 
-def _remove_emoji(s: str) -> str:
-    t = re.sub(
-        "["
-        "\U0001f1e0-\U0001f1ff"  # flags (iOS)
-        "\U0001f300-\U0001f5ff"  # symbols & pictographs
-        "\U0001f600-\U0001f64f"  # emoticons
-        "\U0001f680-\U0001f6ff"  # transport & map symbols
-        "\U0001f700-\U0001f77f"  # alchemical symbols
-        "\U0001f780-\U0001f7ff"  # Geometric Shapes Extended
-        "\U0001f800-\U0001f8ff"  # Supplemental Arrows-C
-        "\U0001f900-\U0001f9ff"  # Supplemental Symbols and Pictographs
-        "\U0001fa00-\U0001fa6f"  # Chess Symbols
-        "\U0001fa70-\U0001faff"  # Symbols and Pictographs Extended-A
-        "\U00002702-\U000027b0"  # Dingbats
-        "\U000024c2-\U0001f251"
-        "]+",
-        "",
-        s,
-    )
-    return t
-
-
 def remove_emoji(elem: Element, doc: Doc) -> list[Element] | None:
     """Remove emoji characters from texts."""
     if isinstance(elem, Para) or isinstance(elem, Header):
@@ -95,7 +96,7 @@ def remove_emoji(elem: Element, doc: Doc) -> list[Element] | None:
         removed_emoji_only_node = False
         for e in elem.content:
             if isinstance(e, Str):
-                text = _remove_emoji(e.text)
+                text = strip_emoji(e.text)
                 if not text:
                     removed_emoji_only_node = True
                 else:
@@ -114,7 +115,7 @@ def remove_emoji(elem: Element, doc: Doc) -> list[Element] | None:
 
 def demote_summary_heading_in_old_dump(elem: Element, doc: Doc) -> list[Element] | None:
     if isinstance(elem, Header):
-        first_elem = elem.content[0]
+        first_elem = elem.content[0] if elem.content else None
         if isinstance(first_elem, Str):
             if first_elem.text == "Summary":
                 elem.level += 1
@@ -125,18 +126,105 @@ def remove_horizontal_line(elem: Element, doc: Doc) -> list[Element] | None:
         return []
 
 
+FILTERS = [
+    remove_property_drawer,
+    replace_linebreak_with_newline,
+    remove_paragraph_with_some_text,
+    remove_emoji,
+    remove_horizontal_line,
+    demote_summary_heading_in_old_dump,
+]
+
+# Element types that each filter acts on:
+FILTER_TYPES: dict[Callable, tuple[type[Element], ...]] = {
+    remove_property_drawer: (Header,),
+    replace_linebreak_with_newline: (LineBreak,),
+    remove_paragraph_with_some_text: (Para,),
+    remove_emoji: (Para, Header),
+    remove_horizontal_line: (HorizontalRule,),
+    demote_summary_heading_in_old_dump: (Header,),
+}
+
+
+def fuse_filters(
+    filters: list[Callable], types: dict[Callable, tuple[type[Element], ...]]
+) -> Callable:
+    """Fuse filters into one that needs a single walk of the document.
+
+    Each element is dispatched by type to the filters acting on it, in order. Since
+    panflute walks children first, a filter still sees the children of an element as
+    changed by all the filters. An element replaced by a filter is not passed to the
+    later ones.
+    """
+    dispatch: dict[type[Element], list[Callable]] = defaultdict(list)
+    for f in filters:
+        for t in types[f]:
+            dispatch[t].append(f)
+
+    def fused(elem: Element, doc: Doc) -> list[Element] | None:
+        for f in dispatch.get(type(elem), ()):
+            replacement = f(elem, doc)
+            if replacement is not None:
+                return replacement
+        return None
+
+    return fused
+
+
+snipd_filter = fuse_filters(FILTERS, FILTER_TYPES)
+
+
 def cli(doc: Doc | None = None) -> None | Doc:
     """The CLI entry point."""
-    return run_filters(
-        [
-            remove_property_drawer,
-            replace_linebreak_with_newline,
-            remove_paragraph_with_some_text,
-            remove_emoji,
-            remove_horizontal_line,
-            demote_summary_heading_in_old_dump,
-        ],
-        doc=doc,
+    return run_filter(snipd_filter, doc=doc)
+
+
+# Lua filter run by pandoc on the Markdown AST to parse its raw HTML:
+_HTML_ROUNDTRIP_FILTER = "html_roundtrip.lua"
+
+# For pandoc.read and pandoc.write in Lua filters:
+_MIN_PANDOC_VERSION = (2, 17)
+
+
+@functools.cache
+def pandoc_path() -> str:
+    """Get the path of the pandoc binary, looked up once."""
+    return pypandoc.get_pandoc_path()
+
+
+@functools.cache
+def pandoc_version() -> tuple[int, ...]:
+    """Get the version of pandoc, looked up once."""
+    version = pypandoc.get_pandoc_version()
+    return tuple(int(n) for n in re.findall(r"\d+", version))
+
+
+def _run_pandoc(source: str, *args: str) -> str:
+    proc = subprocess.run(
+        [pandoc_path(), *args], input=source, capture_output=True, encoding="utf-8"
+    )
+    if proc.returncode:
+        raise RuntimeError(
+            f"Pandoc died with exitcode { proc.returncode }: { proc.stderr }"
+        )
+    return proc.stdout
+
+
+def _md_to_ast(md: str) -> Doc:
+    if pandoc_version() < _MIN_PANDOC_VERSION:
+        required = ".".join(map(str, _MIN_PANDOC_VERSION))
+        raise RuntimeError(f"Pandoc { required } or later is required")
+    lua = resources.files(__package__) / _HTML_ROUNDTRIP_FILTER
+    with resources.as_file(lua) as path:
+        ast = _run_pandoc(md, "--from=gfm", "--to=json", f"--lua-filter={ path }")
+    return panflute.load(io.StringIO(ast))
+
+
+def _ast_to(doc: Doc, output_format: str) -> str:
+    buf = io.StringIO()
+    panflute.dump(doc, buf)
+    return _run_pandoc(
+        buf.getvalue(), "--from=json", f"--to={ output_format }", "--wrap=none"
     )
 
 
@@ -160,23 +248,231 @@ def _preprocess_md(md: str) -> str:
     return md
 
 
-def _postprocess_org(org: str) -> str:
-    org = re.sub(r"^>( ?(.*))\n", r"\2\n\n", org, flags=re.M)
-    org = re.sub(r"^ +(.+)\n", r"\1\n", org, flags=re.M)
-    return org
-
+def convert(md: str, output_format: str, fast: bool = True) -> str:
+    """Convert Markdown content to a str doc of given format.
 
-def convert(md: str, output_format: str) -> str:
-    """Convert Markdown content to a str doc of given format."""
+    Org output is made without pandoc if ``fast``, the Markdown allows it, and pandoc
+    is the release that ``fastpath`` emulates.
+    """
+    if (
+        fast
+        and output_format == "org"
+        and pandoc_version()[:2] == fastpath.PANDOC_VERSION
+    ):
+        try:
+            return fastpath.to_org(md)
+        except fastpath.Unsupported:
+            pass
     # md = _preprocess_md(md)
-    html = pypandoc.convert_text(md, "html", format="gfm")
-    output = pypandoc.convert_text(
-        html,
-        output_format,
-        format="html",
-        extra_args=["--wrap=none"],
-        filters=["snipdfilter"],
-    )
+    doc = run_filter(snipd_filter, doc=_md_to_ast(md))
+    output = _ast_to(doc, output_format)
     if output_format == "org":
-        output = _postprocess_org(output)
+        output = postprocess_org(output)
     return output
+
+
+# Bump when the filters or the postprocessing change, to invalidate cached outputs:
+_FILTER_VERSION = 1
+
+CONVERSION_CACHE_SIZE = 256 * 1024 * 1024
+
+
+def conversion_cache(max_size: int | None = CONVERSION_CACHE_SIZE) -> DiskCache:
+    """Get the cache of converted parts, keyed by ``conversion_key``.
+
+    Without ``max_size``, values are put without evicting others.
+    """
+    return DiskCache("snipd", max_size=max_size)
+
+
+def conversion_key(md: str, output_format: str) -> str:
+    """Make a cache key from the content, format, and conversion versions.
+
+    These are the versions of the filters, of ``fastpath``, and of pandoc.
+    """
+    version = ".".join(map(str, pandoc_version()))
+    digest = hashlib.sha256(md.encode()).hexdigest()
+    filters = f"{ _FILTER_VERSION }.{ fastpath.VERSION }"
+    return f"{ digest }-{ output_format }-{ filters }-{ version }"
+
+
+def convert_cached(md: str, output_format: str, cache: DiskCache | None = None) -> str:
+    """Convert like ``convert``, caching the output by content."""
+    if cache is None:
+        cache = conversion_cache()
+    key = conversion_key(md, output_format)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached.decode()
+    output = convert(md, output_format)
+    cache.put(key, output.encode())
+    return output
+
+
+def split_parts(md: str) -> list[str]:
+    """Split an export into its top-level sections (episodes), each with its header."""
+    return [
+        part if part.startswith("# ") else "# " + part for part in re.split(r"\n# ", md)
+    ]
+
+
+def part_title(part: str) -> str:
+    """Get the title in the header of a part."""
+    return part.split("\n", 1)[0].removeprefix("# ").strip()
+
+
+_UNSAFE_FILENAME_RE = re.compile(r'[\x00-\x1f/\\:*?"<>|]+')
+
+_MAX_STEM_LENGTH = 100
+
+
+def _output_filenames(parts: list[str], suffix: str) -> list[str]:
+    """Name outputs after the part titles, adding the part number for clashes."""
+    stems = [
+        _UNSAFE_FILENAME_RE.sub("_", part_title(part))[:_MAX_STEM_LENGTH].strip(" .")
+        or "part"
+        for part in parts
+    ]
+    # Compare case-insensitively, for case-insensitive file systems:
+    counts = Counter(stem.casefold() for stem in stems)
+    return [
+        (
+            f"{ stem }-{ i }{ suffix }"
+            if counts[stem.casefold()] > 1
+            else f"{ stem }{ suffix }"
+        )
+        for i, stem in enumerate(stems)
+    ]
+
+
+def _write_output(output: Path, text: str) -> None:
+    tmp = output.with_name(output.name + ".tmp")
+    try:
+        tmp.write_text(text)
+        os.replace(tmp, output)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _convert_part(
+    part: str, output: Path, output_format: str, cache_key: str | None
+) -> float:
+    start = time.perf_counter()
+    text = convert(part, output_format)
+    if cache_key is not None:
+        # The parent process evicts once all parts are converted:
+        conversion_cache(max_size=None).put(cache_key, text.encode())
+    _write_output(output, text)
+    return time.perf_counter() - start
+
+
+def _run_all(
+    parts: list[str],
+    outputs: list[Path],
+    output_format: str,
+    cache_keys: list[str | None],
+    jobs: int,
+) -> Iterator[float | Exception]:
+    """Convert the parts, yielding the time taken or the error of each, in order."""
+    if jobs <= 1:
+        for part, output, key in zip(parts, outputs, cache_keys):
+            try:
+                yield _convert_part(part, output, output_format, key)
+            except Exception as e:
+                yield e
+        return
+
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(_convert_part, part, output, output_format, key)
+            for part, output, key in zip(parts, outputs, cache_keys)
+        ]
+        for future in futures:
+            try:
+                yield future.result()
+            except Exception as e:
+                yield e
+
+
+def convert_all(
+    md: str,
+    output_dir: str | Path,
+    output_format: str = "org",
+    jobs: int | None = None,
+    use_cache: bool = True,
+) -> list[tuple[str, Exception]]:
+    """Convert every part of an export to a file in a directory, in parallel.
+
+    Each file is named after the title of its part. Unless ``use_cache`` is false,
+    the parts converted before are read from the cache, and only the others are
+    converted, by ``jobs`` processes (default: number of CPUs). A failed conversion
+    does not stop the others; the failures are returned in part order and summarized
+    on stderr.
+    """
+    parts = split_parts(md)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = [
+        output_dir / name for name in _output_filenames(parts, f".{ output_format }")
+    ]
+
+    start = time.perf_counter()
+    results: list[float | Exception] = [0.0] * len(parts)
+    cache = conversion_cache() if use_cache else None
+    todo: list[tuple[int, str | None]] = []
+    for i, (part, output) in enumerate(zip(parts, outputs)):
+        if cache is None:
+            todo.append((i, None))
+            continue
+        part_start = time.perf_counter()
+        key = conversion_key(part, output_format)
+        cached = cache.get(key)
+        if cached is None:
+            todo.append((i, key))
+            continue
+        try:
+            _write_output(output, cached.decode())
+            results[i] = time.perf_counter() - part_start
+        except Exception as e:
+            results[i] = e
+
+    jobs = min(jobs or os.cpu_count() or 1, len(todo))
+    converted = _run_all(
+        [parts[i] for i, _ in todo],
+        [outputs[i] for i, _ in todo],
+        output_format,
+        [key for _, key in todo],
+        jobs,
+    )
+    for (i, _), result in zip(todo, converted):
+        results[i] = result
+    if cache is not None and todo:
+        cache.evict(CONVERSION_CACHE_SIZE)
+    elapsed = time.perf_counter() - start
+
+    timings: list[tuple[float, Path]] = []
+    failures: list[tuple[str, Exception]] = []
+    for part, output, result in zip(parts, outputs, results):
+        if isinstance(result, Exception):
+            failures.append((part_title(part), result))
+        else:
+            timings.append((result, output))
+
+    for title, error in failures:
+        print(f"{ title }: { type(error).__name__ }: { error }", file=sys.stderr)
+    print(
+        f"Converted { len(timings) } of { len(parts) } parts to { output_dir } "
+        f"in { elapsed:.2f}s ({ len(failures) } failed)",
+        file=sys.stderr,
+    )
+    if cache is not None:
+        print(f"Cache: { cache.hits } hits, { cache.misses } misses", file=sys.stderr)
+    if timings:
+        slowest, slowest_output = max(timings)
+        print(
+            f"Per part: mean { sum(t for t, _ in timings) / len(timings):.3f}s, "
+            f"max { slowest:.3f}s ({ slowest_output.name })",
+            file=sys.stderr,
+        )
+
+    return failures
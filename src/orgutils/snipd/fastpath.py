@@ -0,0 +1,703 @@
+"""Pandoc-free conversion of Snipd Markdown to Org.
+
+Snipd exports use a narrow subset of Markdown: ATX headings, tight lists, links, bold
+text, a cover image, horizontal rules, and ``<details>`` blocks with show notes and
+transcripts. ``to_org`` converts this subset directly, giving the same output as the
+pandoc conversion in ``converter.convert`` with the filters, and raises
+``Unsupported`` on anything else, for the caller to fall back to pandoc.
+
+The pandoc conversion reads the Markdown back from HTML, whose writer wraps lines at
+72 columns: some spaces come back as soft breaks, which the filters tell apart from
+spaces. Where this matters (removing emoji, finding the footer paragraph), the line
+wrapping is replayed, and the conversion is left to pandoc if it cannot be told
+exactly.
+
+As this emulates the HTML and Org writers of pandoc, ``converter.convert`` uses it
+only with the pandoc release it was checked against, ``PANDOC_VERSION``. Whoever
+changes this module, or upgrades pandoc, keeps them in sync: run
+``tests/orgutils/snipd/test_fastpath.py``, which compares the output with pandoc's,
+under the new pandoc, then update ``PANDOC_VERSION``, and bump ``VERSION`` on any
+change of the output, to invalidate the cached conversions.
+"""
+
+import html
+import re
+import unicodedata
+from typing import Generator, Iterator, List, NamedTuple, Optional, Set, Union
+
+from .text import postprocess_org, strip_emoji
+
+# The pandoc release (major, minor) whose output is emulated:
+PANDOC_VERSION = (3, 9)
+
+# Bump when the output changes, to invalidate cached outputs:
+VERSION = 1
+
+
+class Unsupported(ValueError):
+    """The Markdown is outside the subset converted without pandoc."""
+
+
+# Inlines:
+class Str(NamedTuple):
+    text: str
+
+
+class Space(NamedTuple):
+    pass
+
+
+class SoftBreak(NamedTuple):
+    pass
+
+
+class Link(NamedTuple):
+    content: List["Inline"]
+    url: str
+
+
+class Strong(NamedTuple):
+    content: List["Inline"]
+
+
+class Image(NamedTuple):
+    url: str
+
+
+Inline = Union[Str, Space, SoftBreak, Link, Strong, Image]
+
+SPACE = Space()
+SOFT_BREAK = SoftBreak()
+NEWLINE = Str("\n")  # A <br/> after replace_linebreak_with_newline
+
+
+# Blocks; ``wraps`` is true for Markdown paragraphs, rewrapped by the HTML writer, and
+# ``number`` counts the headings before, for their identifiers:
+class Header(NamedTuple):
+    level: int
+    content: List[Inline]
+    number: int
+
+
+class Para(NamedTuple):
+    content: List[Inline]
+    wraps: bool
+
+
+class Plain(NamedTuple):
+    content: List[Inline]
+
+
+class BulletList(NamedTuple):
+    items: List[List[Inline]]
+
+
+class OrderedList(NamedTuple):
+    items: List[List[Inline]]
+
+
+class BlockQuote(NamedTuple):
+    blocks: List["Block"]
+
+
+Block = Union[Header, Para, Plain, BulletList, OrderedList, BlockQuote]
+
+# Line width of the HTML writer:
+_COLUMNS = 72
+
+_HEADING_RE = re.compile(r"(#{1,6}) +(.*[^#\s])$")
+_BULLET_RE = re.compile(r"- +(\S.*)$")
+_ORDERED_RE = re.compile(r"(\d{1,9})\. +(\S.*)$")
+_HR_RE = re.compile(r"-{3,}$")
+_IMAGE_RE = re.compile(r'<img src="(https?://[^"\s<>&]+)">$')
+_SUMMARY_RE = re.compile(r"<summary>(.*)</summary>$")
+_BLOCKQUOTE_RE = re.compile(r"<blockquote>(.*)</blockquote>$", re.S)
+
+# Line starts of other blocks, or of lines which may continue a block:
+_OTHER_BLOCK_RE = re.compile(r"[\s#>`~<+_=|-]|\*(?!\*[^\s*])|\d+[.)](\s|$)")
+# Link reference definitions and table delimiter rows:
+_DEFINITION_RE = re.compile(r"^\[[^\]]+\]:|^(?=.*-)(?=.*\|)[ |:-]+$", re.M)
+
+# Links with absolute URLs, and bold text:
+_MD_INLINE_RE = re.compile(
+    r"\[([^\[\]]*)\]\((https?://[^()\s<>\"]+)\)|\*\*([^*\s](?:[^*]*[^*\s])?)\*\*"
+)
+# Brackets not starting a link or footnote:
+_MD_BRACKETS_RE = re.compile(r"\[(?!\^)[^\[\]()]*\](?![(\[:])")
+# Dollar signs which may close TeX math:
+_MD_MATH_RE = re.compile(r"\S\$")
+_MD_UNSUPPORTED_RE = re.compile(
+    r"[`*_\\<~\[\]]|&#?\w+;|https?:|ftp:|www\.|@|:(?!\d\d:)[\w+-]+:"
+)
+_WHITESPACE_RE = re.compile(r"[ \t\n\r\f]+")
+
+_HTML_TAG_RE = re.compile(r"<br\s*/?>|<b>(.*?)</b>|<[^>]*>?", re.S)
+
+# Org writer replacements of special characters:
+_ORG_ESCAPES = str.maketrans({"–": "--", "—": "---", "’": "'", "…": "..."})
+
+# Strings after which the Org writer does not wrap lines:
+_ORG_MARKER_RE = re.compile(r"-$|\d*[.)]$")
+
+# Names of emoji in the heading identifiers of the Markdown reader:
+_EMOJI_NAMES = {
+    "\u2728": "sparkles",
+    "\u2753": "question",
+    "\u26a1": "zap",
+    "\u2b50": "star",
+    "\U0001f31f": "star2",
+    "\U0001f331": "seedling",
+    "\U0001f389": "tada",
+    "\U0001f393": "mortar_board",
+    "\U0001f3a7": "headphones",
+    "\U0001f3af": "dart",
+    "\U0001f3c6": "trophy",
+    "\U0001f44d": "thumbsup",
+    "\U0001f449": "point_right",
+    "\U0001f4a1": "bulb",
+    "\U0001f4aa": "muscle",
+    "\U0001f4ac": "speech_balloon",
+    "\U0001f4ad": "thought_balloon",
+    "\U0001f4b0": "moneybag",
+    "\U0001f4bc": "briefcase",
+    "\U0001f4c8": "chart_with_upwards_trend",
+    "\U0001f4ca": "bar_chart",
+    "\U0001f4cc": "pushpin",
+    "\U0001f4d6": "open_book",
+    "\U0001f4da": "books",
+    "\U0001f4dd": "pencil",
+    "\U0001f4e3": "mega",
+    "\U0001f50d": "mag",
+    "\U0001f511": "key",
+    "\U0001f525": "fire",
+    "\U0001f52c": "microscope",
+    "\U0001f52e": "crystal_ball",
+    "\U0001f680": "rocket",
+    "\U0001f914": "thinking",
+    "\U0001f91d": "handshake",
+    "\U0001f92f": "exploding_head",
+    "\U0001f9e0": "brain",
+    "\U0001f9e9": "jigsaw",
+    "\U0001f9ed": "compass",
+}
+# Longest name of other symbols, which may or may not have one:
+_MAX_EMOJI_NAME = 40
+
+# Space inside an HTML tag, where the HTML writer may also wrap lines:
+_TAG_SPACE = -1
+
+
+def _md_text(text: str) -> List[Inline]:
+    """Split plain Markdown text into strings and spaces."""
+    if _MD_UNSUPPORTED_RE.search(_MD_BRACKETS_RE.sub("", text)):
+        raise Unsupported(text)
+    return _split_words(text)
+
+
+def _split_words(text: str) -> List[Inline]:
+    inlines: List[Inline] = []
+    for i, part in enumerate(_WHITESPACE_RE.split(text)):
+        if i:
+            inlines.append(SPACE)
+        if part:
+            if any(
+                c != "\xa0" and unicodedata.category(c) in ("Zs", "Zl", "Zp")
+                for c in part
+            ):
+                raise Unsupported(part)
+            inlines.append(Str(part))
+    return inlines
+
+
+def _md_inlines(text: str) -> List[Inline]:
+    if _MD_MATH_RE.search(text):
+        raise Unsupported(text)
+    inlines: List[Inline] = []
+    pos = 0
+    for m in _MD_INLINE_RE.finditer(text):
+        before = text[pos : m.start()]
+        inline: Inline
+        if m[3] is not None:
+            # Bold text only between spaces or punctuation:
+            if (before and not before[-1].isspace()) or (
+                m.end() < len(text) and text[m.end()] not in " .,;:!?)"
+            ):
+                raise Unsupported(text)
+            inline = Strong(_md_text(m[3]))
+        else:
+            # Images, and links without text:
+            if before.endswith("!") or not m[1].strip():
+                raise Unsupported(text)
+            inline = Link(_trim(_md_text(m[1])), m[2])
+        inlines.extend(_md_text(before))
+        inlines.append(inline)
+        pos = m.end()
+    inlines.extend(_md_text(text[pos:]))
+    return _trim(inlines)
+
+
+def _html_inlines(text: str) -> List[Inline]:
+    """Parse text with <br/> and <b> tags as the HTML reader does."""
+    # An end tag without start tag is dropped:
+    text = text.replace("</br>", "")
+    inlines: List[Inline] = []
+    pos = 0
+    for m in _HTML_TAG_RE.finditer(text):
+        inlines.extend(_html_text(text[pos : m.start()]))
+        if m[0].startswith("<br"):
+            # Spaces around line breaks are dropped:
+            while inlines and isinstance(inlines[-1], (Space, SoftBreak)):
+                inlines.pop()
+            inlines.append(NEWLINE)
+            pos = m.end()
+            while pos < len(text) and text[pos] in " \t\n\r\f":
+                pos += 1
+            continue
+        if m[1] is None or m[1] != m[1].strip() or "<" in m[1] or not m[1]:
+            raise Unsupported(m[0])
+        inlines.append(Strong(_html_text(m[1])))
+        pos = m.end()
+    inlines.extend(_html_text(text[pos:]))
+    return _trim(inlines)
+
+
+def _html_text(text: str) -> List[Inline]:
+    if "<" in text:
+        raise Unsupported(text)
+    text = html.unescape(text)
+    if re.search(r"&#?\w+;", text):
+        raise Unsupported(text)
+    inlines: List[Inline] = []
+    for part in re.split(r"([ \t\n\r\f]+)", text):
+        if not part:
+            continue
+        if part.isspace():
+            inlines.append(SOFT_BREAK if "\n" in part else SPACE)
+        else:
+            inlines.extend(_split_words(part))
+    return inlines
+
+
+def _trim(inlines: List[Inline]) -> List[Inline]:
+    start = 0
+    end = len(inlines)
+    while start < end and isinstance(inlines[start], (Space, SoftBreak)):
+        start += 1
+    while end > start and isinstance(inlines[end - 1], (Space, SoftBreak)):
+        end -= 1
+    return inlines[start:end]
+
+
+def _stringify(inlines: List[Inline]) -> str:
+    return "".join(
+        (
+            " "
+            if isinstance(inline, (Space, SoftBreak))
+            else inline.text
+            if isinstance(inline, Str)
+            else _stringify(inline.content)
+            if isinstance(inline, (Link, Strong))
+            else ""
+        )
+        for inline in inlines
+    )
+
+
+def _identifier(inlines: List[Inline]) -> tuple[str, int]:
+    """Make the GitHub-style identifier of a heading, without number suffix.
+
+    Return it with the number of symbols whose names are unknown.
+    """
+    chars = []
+    unknown = 0
+    for c in _stringify(inlines).lower():
+        if c in _EMOJI_NAMES:
+            chars.append(_EMOJI_NAMES[c])
+        elif c.isspace():
+            chars.append("-")
+        elif c.isalnum() or c in "_-":
+            chars.append(c)
+        elif unicodedata.category(c) == "So":
+            unknown += 1
+    return "".join(chars) or "section", unknown
+
+
+def _split_blocks(lines: List[str]) -> Iterator:
+    """Parse the lines into blocks as read back from HTML."""
+    headers = 0
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            i += 1
+            continue
+        if line != line.rstrip():
+            raise Unsupported(line)
+
+        if m := _HEADING_RE.match(line):
+            yield Header(len(m[1]), _md_inlines(m[2]), headers)
+            headers += 1
+            i += 1
+        elif m := _IMAGE_RE.match(line):
+            # A raw HTML block, which does not interrupt paragraphs:
+            if i + 1 < len(lines) and lines[i + 1].strip():
+                raise Unsupported(line)
+            yield Para([Image(m[1])], False)
+            i += 1
+        elif _HR_RE.match(line):
+            # Removed by remove_horizontal_line:
+            i += 1
+        elif line == "<details>":
+            end = i
+            while end < len(lines) and lines[end].strip():
+                end += 1
+            yield from _details(lines[i:end])
+            i = end
+        elif _BULLET_RE.match(line) or _ORDERED_RE.match(line):
+            i = yield from _list(lines, i)
+        elif _OTHER_BLOCK_RE.match(line):
+            raise Unsupported(line)
+        else:
+            end = i + 1
+            while end < len(lines) and lines[end].strip():
+                if _HEADING_RE.match(lines[end]) or lines[end] == "<details>":
+                    break
+                if _BULLET_RE.match(lines[end]):
+                    break
+                if _OTHER_BLOCK_RE.match(lines[end]):
+                    raise Unsupported(lines[end])
+                end += 1
+            content: List[Inline] = []
+            for n, text in enumerate(lines[i:end]):
+                if text != text.rstrip():
+                    raise Unsupported(text)
+                if n:
+                    content.append(SPACE)
+                content.extend(_md_inlines(text))
+            yield Para(content, True)
+            i = end
+
+
+def _list(lines: List[str], i: int) -> Generator[tuple, None, int]:
+    """Parse the tight list at line ``i``; return the index of the line after it."""
+    pattern = _BULLET_RE if _BULLET_RE.match(lines[i]) else _ORDERED_RE
+    items = []
+    numbers = []
+    while i < len(lines) and (m := pattern.match(lines[i])):
+        text = m[pattern.groups]
+        # Task lists, nested blocks:
+        if _OTHER_BLOCK_RE.match(text) or text.startswith("["):
+            raise Unsupported(text)
+        if pattern is _ORDERED_RE:
+            numbers.append(int(m[1]))
+        items.append(_md_inlines(text))
+        i += 1
+    if i < len(lines):
+        line = lines[i]
+        if line.strip():
+            # Only headings and HTML blocks interrupt the item paragraph:
+            if not (_HEADING_RE.match(line) or line == "<details>"):
+                raise Unsupported(line)
+        else:
+            # A blank line followed by another item makes a loose list:
+            j = i
+            while j < len(lines) and not lines[j].strip():
+                j += 1
+            if j < len(lines) and (
+                _BULLET_RE.match(lines[j]) or _ORDERED_RE.match(lines[j])
+            ):
+                raise Unsupported(lines[j])
+    if pattern is _ORDERED_RE:
+        if numbers != list(range(1, len(numbers) + 1)):
+            raise Unsupported("list numbers")
+        yield OrderedList(items)
+    else:
+        yield BulletList(items)
+    return i
+
+
+def _details(lines: List[str]) -> Iterator:
+    """Parse a <details> HTML block (ending at a blank line)."""
+    if len(lines) < 3 or lines[-1] != "</details>":
+        raise Unsupported(lines[0])
+    m = _SUMMARY_RE.match(lines[1])
+    if not m:
+        raise Unsupported(lines[1])
+    body = "\n".join(lines[2:-1]).strip()
+    if not body or "details>" in body:
+        raise Unsupported(body)
+
+    yield Para(_html_inlines(m[1]), False)
+    if m := _BLOCKQUOTE_RE.match(body):
+        yield BlockQuote([Plain(_html_inlines(m[1]))])
+    else:
+        yield Para(_html_inlines(body), False)
+
+
+def _char_width(c: str) -> int:
+    if unicodedata.category(c) in ("Mn", "Me", "Cf", "Co", "Cn"):
+        # Zero width, or unknown to the HTML writer's layout:
+        raise Unsupported(c)
+    return 2 if unicodedata.east_asian_width(c) in "WF" else 1
+
+
+def _width(s: str) -> int:
+    return sum(1 if c < "\x7f" else _char_width(c) for c in s)
+
+
+def _html_words(inlines: List[Inline], words: List[List], top: bool = True) -> None:
+    """Render the inlines as HTML text, split at spaces.
+
+    Each word is ``[index of the space before it, text]``, with the index in the
+    top-level inlines, None for spaces in links or bold text, or ``_TAG_SPACE``.
+    """
+    for index, inline in enumerate(inlines):
+        if isinstance(inline, (Space, SoftBreak)):
+            words.append([index if top else None, ""])
+        elif isinstance(inline, Str):
+            text = inline.text.replace("&", "&amp;")
+            words[-1][1] += text.replace("<", "&lt;").replace(">", "&gt;")
+        elif isinstance(inline, Link):
+            words[-1][1] += "<a"
+            words.append([_TAG_SPACE, f'href="{ html.escape(inline.url) }">'])
+            _html_words(inline.content, words, False)
+            words[-1][1] += "</a>"
+        elif isinstance(inline, Strong):
+            words[-1][1] += "<strong>"
+            _html_words(inline.content, words, False)
+            words[-1][1] += "</strong>"
+        else:
+            raise Unsupported(repr(inline))
+
+
+def _wrapped_spaces(inlines: List[Inline], start: str, end: str) -> Set[Optional[int]]:
+    """Get the indices of the spaces that the HTML writer wraps lines at."""
+    first, *attributes = start.split(" ")
+    words: List[List] = [[None, first], *([_TAG_SPACE, a] for a in attributes)]
+    _html_words(inlines, words)
+    words[-1][1] += end
+
+    breaks = set()
+    column = _width(words[0][1])
+    for index, text in words[1:]:
+        width = _width(text)
+        if column + 1 + width > _COLUMNS:
+            breaks.add(index)
+            column = width
+        else:
+            column += 1 + width
+    return breaks
+
+
+def _with_soft_breaks(
+    inlines: List[Inline], breaks: Set[Optional[int]]
+) -> List[Inline]:
+    return [SOFT_BREAK if i in breaks else inline for i, inline in enumerate(inlines)]
+
+
+def _is_emoji(inline: Inline) -> bool:
+    return isinstance(inline, Str) and not strip_emoji(inline.text)
+
+
+def _remove_emoji(inlines: List[Inline]) -> List[Inline]:
+    """Remove strings of emoji like remove_emoji, with the next spaces."""
+    content: List[Inline] = []
+    removed = False
+    for inline in inlines:
+        if isinstance(inline, Str):
+            removed = _is_emoji(inline)
+            if not removed:
+                content.append(inline)
+        elif inline is SPACE and removed:
+            removed = False
+        else:
+            content.append(inline)
+    return content
+
+
+def _visible_text(inlines: List[Inline]) -> str:
+    """Render the inlines like converter._make_visible_text."""
+    strs = []
+    for inline in inlines:
+        if isinstance(inline, Space):
+            strs.append(" ")
+        elif isinstance(inline, SoftBreak):
+            strs.append("\n")
+        elif isinstance(inline, Str):
+            strs.append(inline.text)
+        elif isinstance(inline, (Link, Image)):
+            # The (empty) title:
+            strs.append("")
+        else:
+            strs.append(_visible_text(inline.content))
+    return "".join(strs)
+
+
+def _is_removed(text: str) -> bool:
+    """Tell if remove_paragraph_with_some_text removes the paragraph."""
+    return text == "Click to expand" or (
+        "Created with" in text and "Take Notes from Podcasts" in text
+    )
+
+
+def _filter(blocks: Iterator) -> Iterator:
+    """Apply the Snipd filters."""
+    used: Set[str] = set()
+    exact = True
+    for block in blocks:
+        if isinstance(block, Header):
+            identifier, unknown = _identifier(block.content)
+            exact = exact and not unknown
+            if exact:
+                if identifier in used:
+                    n = 1
+                    while f"{ identifier }-{ n }" in used:
+                        n += 1
+                    identifier = f"{ identifier }-{ n }"
+                used.add(identifier)
+                low = high = _width(identifier)
+            else:
+                # Duplicate identifiers get a number:
+                low = _width(identifier)
+                high = low + unknown * _MAX_EMOJI_NAME + len(str(block.number)) + 1
+
+            content = block.content
+            if any(_is_emoji(inline) for inline in content):
+                # Spaces wrapped to soft breaks are not removed:
+                tag = f"h{ block.level }"
+                breaks = _wrapped_spaces(
+                    content, f'<{ tag } id="{ "x" * low }">', f"</{ tag }>"
+                )
+                if low != high and breaks != _wrapped_spaces(
+                    content, f'<{ tag } id="{ "x" * high }">', f"</{ tag }>"
+                ):
+                    raise Unsupported("heading identifier")
+                content = _remove_emoji(_with_soft_breaks(content, breaks))
+            if not content:
+                raise Unsupported("empty heading")
+            level = block.level
+            if isinstance(content[0], Str) and content[0].text == "Summary":
+                level += 1
+            yield block._replace(level=level, content=content)
+        elif isinstance(block, Para):
+            content = block.content
+            text = _visible_text(content)
+            footer = "Created with" in text or "Take Notes from Podcasts" in text
+            if block.wraps and (footer or any(_is_emoji(i) for i in content)):
+                breaks = _wrapped_spaces(content, "<p>", "</p>")
+                if footer and None in breaks:
+                    raise Unsupported("line wrapped in a link or bold text")
+                content = _with_soft_breaks(content, breaks)
+                text = _visible_text(content)
+            if _is_removed(text):
+                continue
+            content = _remove_emoji(content)
+            if not content:
+                raise Unsupported("empty paragraph")
+            yield block._replace(content=content)
+        else:
+            yield block
+
+
+def _org_inlines(inlines: List[Inline], line_start: bool = False) -> str:
+    """Render the inlines in Org, with spaces and soft breaks as single spaces."""
+    out: List[str] = []
+    space = False
+    for i, inline in enumerate(inlines):
+        if isinstance(inline, (Space, SoftBreak)):
+            following = inlines[i + 1] if i + 1 < len(inlines) else None
+            if isinstance(following, Str) and _ORG_MARKER_RE.match(following.text):
+                # Kept as a string by the Org writer, not to start a list item:
+                if not out or out[-1] == "\n":
+                    raise Unsupported(following.text)
+                out.append("  " if space else " ")
+                space = False
+            else:
+                space = True
+            continue
+        if isinstance(inline, Str):
+            if inline is NEWLINE:
+                out.append("\n")
+                line_start = True
+                space = False
+                continue
+            if line_start and inline.text[0] in "*#|":
+                # The Org writer escapes these with a zero-width space.
+                raise Unsupported(inline.text)
+            text = inline.text.translate(_ORG_ESCAPES)
+        elif isinstance(inline, Link):
+            if _stringify(inline.content) == inline.url:
+                text = f"[[{ inline.url }]]"
+            else:
+                text = f"[[{ inline.url }][{ _org_inlines(inline.content) }]]"
+        elif isinstance(inline, Strong):
+            text = f"*{ _org_inlines(inline.content) }*"
+        else:
+            text = f"[[{ inline.url }]]"
+        if space and out and out[-1] != "\n":
+            out.append(" ")
+        out.append(text)
+        space = False
+        line_start = False
+    return "".join(out)
+
+
+def _org_lines(blocks: Iterator) -> Iterator[str]:
+    blank = False
+    first = True
+    for block in blocks:
+        if isinstance(block, Header):
+            # Trailing spaces are dropped, but not soft breaks:
+            content = block.content
+            while content and content[-1] is SPACE:
+                content = content[:-1]
+            if not content:
+                raise Unsupported("empty heading")
+            text = "".join(
+                " " if isinstance(i, (Space, SoftBreak)) else _org_inlines([i])
+                for i in content
+            )
+            lines = ["*" * block.level + " " + text]
+            before, after = False, False
+        elif isinstance(block, (Para, Plain)):
+            text = _org_inlines(block.content, line_start=True)
+            if text.startswith("\n") or text.endswith("\n"):
+                raise Unsupported("line break at the start or end of a paragraph")
+            lines = text.split("\n")
+            before, after = False, isinstance(block, Para)
+        elif isinstance(block, (BulletList, OrderedList)):
+            lines = []
+            for n, item in enumerate(block.items, 1):
+                text = _org_inlines(item)
+                if "\n" in text:
+                    raise Unsupported("line break in a list item")
+                marker = "-" if isinstance(block, BulletList) else f"{ n }."
+                lines.append(f"{ marker } { text }")
+            before, after = False, True
+        else:
+            lines = ["#+begin_quote", *_org_lines(block.blocks), "#+end_quote"]
+            before, after = True, True
+
+        if (blank or before) and not first:
+            yield ""
+        yield from lines
+        blank = after
+        first = False
+
+
+def to_org(md: str) -> str:
+    """Convert a Snipd Markdown export to Org without pandoc.
+
+    Raise ``Unsupported`` if the Markdown is outside the subset handled here.
+    """
+    if any(c in md for c in "\t\r\0") or _DEFINITION_RE.search(md):
+        raise Unsupported("tabs, carriage returns, definitions, or tables")
+    if md.startswith("---"):
+        raise Unsupported("metadata block")
+    if not unicodedata.is_normalized("NFC", md):
+        # Pandoc normalizes the text:
+        raise Unsupported("text not in NFC")
+    lines = list(_org_lines(_filter(_split_blocks(md.split("\n")))))
+    if not lines:
+        raise Unsupported("empty document")
+    return postprocess_org("\n".join(lines) + "\n")
@@ -0,0 +1,5 @@
+-- Write the document to HTML and read it back, so that raw HTML blocks and inlines
+-- (e.g., <details> in Snipd exports) are parsed into the AST.
+function Pandoc(doc)
+  return pandoc.read(pandoc.write(doc, "html"), "html")
+end
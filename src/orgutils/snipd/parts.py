@@ -0,0 +1,115 @@
+"""Index of the parts (episodes) of a Snipd export.
+
+The export is scanned once, memory-mapped, for the top-level ``# `` headers that
+start its parts. Their byte offsets and titles are saved next to the export, in
+``<export>.parts.json``, and reused until the export's mtime or size changes. Listing
+the parts then reads only the index, and reading a part reads only its bytes.
+
+Parts are split as in ``converter.split_parts``.
+"""
+
+import json
+import mmap
+import os
+from collections import namedtuple
+from pathlib import Path
+
+# Bump when the index format changes:
+_INDEX_VERSION = 1
+
+_HEADER = b"\n# "
+
+# Part ``n`` spans the bytes [offsets[n], offsets[n + 1] - 1): the newline before the
+# next header is not part of it.
+PartIndex = namedtuple("PartIndex", ("offsets", "titles"))
+
+
+def index_path(path: str | Path) -> Path:
+    """Get the path of the saved index of an export."""
+    path = Path(path)
+    return path.with_name(path.name + ".parts.json")
+
+
+def _title(line: bytes) -> str:
+    return line.decode().removeprefix("# ").strip()
+
+
+def scan(path: str | Path) -> PartIndex:
+    """Index the parts of an export by scanning it."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            # mmap cannot map empty files:
+            return PartIndex([0, 1], [""])
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets = [0]
+            pos = mm.find(_HEADER)
+            while pos != -1:
+                offsets.append(pos + 1)
+                pos = mm.find(_HEADER, pos + len(_HEADER))
+            titles = []
+            for start in offsets:
+                end = mm.find(b"\n", start)
+                titles.append(_title(mm[start : size if end == -1 else end]))
+    return PartIndex(offsets + [size + 1], titles)
+
+
+def _load(path: Path, st: os.stat_result) -> PartIndex | None:
+    try:
+        with open(index_path(path)) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (saved.get("version"), saved.get("mtime_ns"), saved.get("size")) != (
+        _INDEX_VERSION,
+        st.st_mtime_ns,
+        st.st_size,
+    ):
+        return None
+    return PartIndex(saved["offsets"], saved["titles"])
+
+
+def _save(path: Path, st: os.stat_result, index: PartIndex) -> None:
+    saved = {
+        "version": _INDEX_VERSION,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        **index._asdict(),
+    }
+    output = index_path(path)
+    tmp = output.with_name(output.name + ".tmp")
+    try:
+        with open(tmp, "w") as f:
+            json.dump(saved, f, ensure_ascii=False)
+        os.replace(tmp, output)
+    except OSError:
+        # E.g., a read-only directory: the index is only not reused.
+        pass
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def part_index(path: str | Path) -> PartIndex:
+    """Get the index of the parts of an export, scanning it only if changed."""
+    path = Path(path)
+    st = path.stat()
+    index = _load(path, st)
+    if index is None:
+        index = scan(path)
+        _save(path, st, index)
+    return index
+
+
+def read_part(path: str | Path, index: PartIndex, n: int) -> str:
+    """Read part ``n`` of an export, with its header.
+
+    Negative numbers count from the end; raise IndexError if out of range.
+    """
+    n = range(len(index.titles))[n]
+    start = index.offsets[n]
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(index.offsets[n + 1] - 1 - start)
+    # Translate newlines as reading in text mode does:
+    part = data.decode().replace("\r\n", "\n").replace("\r", "\n")
+    return part if part.startswith("# ") else "# " + part
@@ -0,0 +1,32 @@
+"""Text processing shared by the pandoc and pandoc-free conversions."""
+
+import re
+
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001f1e0-\U0001f1ff"  # flags (iOS)
+    "\U0001f300-\U0001f5ff"  # symbols & pictographs
+    "\U0001f600-\U0001f64f"  # emoticons
+    "\U0001f680-\U0001f6ff"  # transport & map symbols
+    "\U0001f700-\U0001f77f"  # alchemical symbols
+    "\U0001f780-\U0001f7ff"  # Geometric Shapes Extended
+    "\U0001f800-\U0001f8ff"  # Supplemental Arrows-C
+    "\U0001f900-\U0001f9ff"  # Supplemental Symbols and Pictographs
+    "\U0001fa00-\U0001fa6f"  # Chess Symbols
+    "\U0001fa70-\U0001faff"  # Symbols and Pictographs Extended-A
+    "\U00002702-\U000027b0"  # Dingbats
+    "\U000024c2-\U0001f251"
+    "]+"
+)
+
+
+def strip_emoji(s: str) -> str:
+    """Remove the emoji characters from a string."""
+    return _EMOJI_RE.sub("", s)
+
+
+def postprocess_org(org: str) -> str:
+    """Unquote the block quotes and unindent the lines of Org output."""
+    org = re.sub(r"^>( ?(.*))\n", r"\2\n\n", org, flags=re.M)
+    org = re.sub(r"^ +(.+)\n", r"\1\n", org, flags=re.M)
+    return org
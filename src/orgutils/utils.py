@@ -1,6 +1,22 @@
 """Utility."""
+
+import json
 import re
+import sqlite3
+import sys
+import unicodedata
 import xml.dom.minidom
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
 from xml.etree import ElementTree as ET
 from xml.etree.ElementTree import Element
 
@@ -11,7 +27,132 @@ def dumps_xml(tree: Element, indent: int = 2) -> str:
     return dom.toprettyxml(indent=" " * 2)
 
 
+# The whitespace but line breaks, i.e., ``[^\S\n\r]``, spelled out: a set of
+# characters is faster to match than a negated class of a class.
+_SPACES = (
+    "\t\x0b\x0c\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+
+# Spaces between zenkaku (non-ASCII) characters. Matching a space first and looking
+# back only from there is faster than looking back at every character.
+_ZENKAKU_SPACES_RE = re.compile(
+    f"[{ _SPACES }](?<=[^\\x01-\\x7E][{ _SPACES }])[{ _SPACES }]*(?=[^\\x01-\\x7E])"
+)
+
+# Line breaks, with the spaces after them, e.g., the line ends of PDF text. Spaces
+# before them are left to ``_join_line``, as matching from a space is slow.
+_LINE_BREAKS_RE = re.compile(
+    f"(?:\\r\\n?|\\n)(?:[{ _SPACES }]*(?:\\r\\n?|\\n))*[{ _SPACES }]*"
+)
+
+# Separates the texts of a batch: ASCII, so spaces next to it are kept.
+_BATCH_SEPARATOR = "\x01"
+
+
 def remove_whitespaces_between_zenkaku(s: str) -> str:
     """Remove space(s) between zenkaku characters."""
-    s = re.sub(r"(?<=[^\x01-\x7E])([^\S\n\r]+)(?=[^\x01-\x7E])", "", s)
-    return s
+    return _ZENKAKU_SPACES_RE.sub("", s)
+
+
+def _join_line(m: re.Match[str]) -> str:
+    # A single line break joins lines, with a space unless one is before it; blank
+    # lines are kept.
+    s = m.group()
+    if s.count("\n") + s.count("\r") - s.count("\r\n") > 1:
+        return s
+    return "" if m.string[m.start() - 1 : m.start()].isspace() else " "
+
+
+def normalize_ja(s: str, nfkc: bool = False, join_lines: bool = False) -> str:
+    """Normalize Japanese text.
+
+    Optionally fold the width of characters (NFKC) and join the lines broken within a
+    paragraph, then remove the spaces between zenkaku characters.
+    """
+    if nfkc and not unicodedata.is_normalized("NFKC", s):
+        s = unicodedata.normalize("NFKC", s)
+    if join_lines:
+        s = _LINE_BREAKS_RE.sub(_join_line, s)
+    return remove_whitespaces_between_zenkaku(s)
+
+
+def normalize_ja_batch(
+    texts: Sequence[str], nfkc: bool = False, join_lines: bool = False
+) -> List[str]:
+    """Normalize Japanese texts as ``normalize_ja`` does, all at once.
+
+    The texts are joined and normalized in a single scan of each step.
+    """
+    if not texts:
+        return []
+    joined = _BATCH_SEPARATOR.join(texts)
+    if joined.count(_BATCH_SEPARATOR) != len(texts) - 1:
+        # A text contains the separator:
+        return [normalize_ja(s, nfkc, join_lines) for s in texts]
+    return normalize_ja(joined, nfkc, join_lines).split(_BATCH_SEPARATOR)
+
+
+def text_normalizer(
+    lang: str, nfkc: bool = False, join_lines: bool = False
+) -> Callable[[Sequence[str]], List[str]]:
+    """Get the batch normalizer of the exporters for texts in a language."""
+    if lang == "ja":
+        return lambda texts: normalize_ja_batch(texts, nfkc, join_lines)
+    return list
+
+
+_ROMAN_RE = re.compile(r"^m{0,4}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+_ROMAN_VALUES = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+
+
+def _roman_to_int(s: str) -> int | None:
+    if not s or not _ROMAN_RE.match(s):
+        return None
+    values = [_ROMAN_VALUES[c] for c in s]
+    return sum(-v if v < w else v for v, w in zip(values, values[1:] + [0]))
+
+
+def page_sort_key(page: str | None) -> tuple:
+    """Make a sort key for a page: None, roman numerals, numbers, then the rest.
+
+    Only lowercase roman numerals are front matter pages: uppercase ones, e.g., "C"
+    or "L", are more likely appendix pages.
+    """
+    if page is None:
+        return (0, 0, "")
+    if page.isdigit():
+        return (2, int(page), "")
+    if (n := _roman_to_int(page)) is not None:
+        return (1, n, "")
+    return (3, 0, page)
+
+
+ROW_FORMATS = ("tsv", "ndjson")
+
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def write_rows(
+    rows: Iterable[Mapping[str, Any] | sqlite3.Row],
+    columns: Sequence[Tuple[str, str]],
+    output_format: str = "tsv",
+    fp: Optional[TextIO] = None,
+) -> None:
+    """Write rows one at a time as TSV (with header) or NDJSON.
+
+    The rows are mappings or database rows, and the ``columns`` (key, header) pairs.
+    TSV escapes backslashes, tabs, and newlines in values. Write to stdout unless
+    ``fp`` is given.
+    """
+    fp = fp or sys.stdout
+    keys = [key for key, _ in columns]
+    if output_format == "ndjson":
+        for row in rows:
+            fp.write(json.dumps({k: row[k] for k in keys}, ensure_ascii=False) + "\n")
+    elif output_format == "tsv":
+        fp.write("\t".join(header for _, header in columns) + "\n")
+        for row in rows:
+            values = ("" if row[k] is None else str(row[k]) for k in keys)
+            fp.write("\t".join(v.translate(_TSV_ESCAPES) for v in values) + "\n")
+    else:
+        raise ValueError(f"Unknown row format: { output_format }")
@@ -2,36 +2,114 @@
 
 from argparse import ArgumentParser
 
+from ..utils import ROW_FORMATS
+from .db import CONNECT_MODES
 from .docs import list_docs
-from .exporters import export_to_org
+from .exporters import extract
 from .items import list_items
+from .search import search_items
 
 
-def cli():  # noqa
+def _add_listing_arguments(p: ArgumentParser) -> None:
+    p.add_argument("--limit", "-n", type=int, help="Maximum number of rows")
+    p.add_argument("--offset", type=int, default=0, help="Number of rows to skip")
+    p.add_argument(
+        "--format",
+        "-f",
+        dest="output_format",
+        choices=ROW_FORMATS,
+        default="tsv",
+        help="Output format (default: tsv)",
+    )
+
+
+def cli() -> int | None:  # noqa
     p = ArgumentParser(description=__doc__)
+    p.add_argument(
+        "--db-mode",
+        choices=CONNECT_MODES,
+        default="snapshot",
+        help="How to open the Zotero database (default: snapshot)",
+    )
     subparsers = p.add_subparsers(help="subcommands")
 
     p_extract = subparsers.add_parser("extract", help="extract stuff")
-    p_extract.add_argument("id", help="item ID")
+    p_extract.add_argument("id", nargs="?", help="item ID")
     p_extract.add_argument(
         "--lang", "-l", choices=("en", "ja"), default="en", help="Language"
     )
-    p_extract.set_defaults(func=export_to_org)
+    p_extract.add_argument(
+        "--nfkc",
+        action="store_true",
+        help="Fold the width of characters (NFKC) in Japanese text (with --lang ja)",
+    )
+    p_extract.add_argument(
+        "--all",
+        dest="all_docs",
+        action="store_true",
+        help="Export all annotated docs to the output directory",
+    )
+    p_extract.add_argument(
+        "--collection",
+        "-c",
+        help="Export annotated docs in the collection (name or key)",
+    )
+    p_extract.add_argument(
+        "--output-dir",
+        "-o",
+        help="Output directory for --all/--collection (default: current directory)",
+    )
+    p_extract.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Only regenerate docs whose annotations changed since the last export",
+    )
+    p_extract.add_argument(
+        "--jobs", "-j", type=int, help="Number of worker processes for PDF outlines"
+    )
+    p_extract.add_argument(
+        "--merge",
+        "-m",
+        action="store_true",
+        help="Merge new annotations into existing Org files in the output directory, "
+        "keeping everything else in them",
+    )
+    p_extract.set_defaults(func=extract, parser=p_extract)
 
     p_docs = subparsers.add_parser("docs", help="docs")
-    p_docs_list = p_docs.add_subparsers(help="docs subcommands")
-    p_docs_list = p_docs_list.add_parser("list", help="list docs")
+    p_docs_sub = p_docs.add_subparsers(help="docs subcommands")
+    p_docs_list = p_docs_sub.add_parser("list", help="list docs")
+    _add_listing_arguments(p_docs_list)
     p_docs_list.set_defaults(func=list_docs)
 
     p_items = subparsers.add_parser("items", help="items")
-    p_items_list = p_items.add_subparsers(help="items subcommands")
-    p_items_list = p_items_list.add_parser("list", help="list items")
+    p_items_sub = p_items.add_subparsers(help="items subcommands")
+    p_items_list = p_items_sub.add_parser("list", help="list items")
+    _add_listing_arguments(p_items_list)
     p_items_list.set_defaults(func=list_items)
 
+    p_items_search = p_items_sub.add_parser(
+        "search", help="search titles, creators, and annotations"
+    )
+    p_items_search.add_argument("query", help="search terms (all must match)")
+    p_items_search.add_argument(
+        "--rebuild", action="store_true", help="Rebuild the search index from scratch"
+    )
+    _add_listing_arguments(p_items_search)
+    p_items_search.set_defaults(func=search_items)
+
     args = p.parse_args()
-    args = vars(args)
-    func = args.pop("func")
-    func(**args)
+    if args.func is extract and not (args.id or args.all_docs or args.collection):
+        args.parser.error("give an ID, --all, or --collection")
+    if args.func is extract and args.merge and not (args.all_docs or args.collection):
+        args.parser.error("--merge requires --all or --collection")
+
+    kwargs = vars(args)
+    kwargs.pop("parser", None)
+    func = kwargs.pop("func")
+    func(**kwargs)
+    return None
 
 
 if __name__ == "__main__":
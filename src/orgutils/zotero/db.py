@@ -2,12 +2,19 @@
 
 import contextlib
 import functools
+import hashlib
+import itertools
 import json
+import os
 import shutil
 import sqlite3
 import tempfile
 from pathlib import Path
-from typing import Generator, List, Optional
+from typing import Generator, Iterator, List, Optional, Tuple
+
+from ..cache import cache_dir
+
+CONNECT_MODES = ("snapshot", "immutable", "memory")
 
 
 @functools.cache
@@ -17,81 +24,276 @@ def _find_zotero_data_dir(path: Optional[str | Path] = None) -> Path:
     for path in paths:
         path = Path(path).expanduser()
         if (path / "zotero.sqlite").exists():
-            return path
+            return path.resolve()
     raise ValueError("Zotedo data directory not found")
 
 
+def library_id(zotero_data_dir: Optional[str | Path] = None) -> str:
+    """Get a short ID of the Zotero library, for naming cache files."""
+    db_src = _find_zotero_data_dir(zotero_data_dir) / "zotero.sqlite"
+    return hashlib.sha1(str(db_src).encode()).hexdigest()[:16]
+
+
+def snapshot(zotero_data_dir: Optional[str | Path] = None) -> Path:
+    """Get a cached copy of the Zotero database.
+
+    Zotero locks the database too aggressively, so we work with a copy. The copy is
+    keyed by the mtime and size of ``zotero.sqlite`` and reused across calls and runs
+    until Zotero writes to the database again.
+    """
+    db_src = _find_zotero_data_dir(zotero_data_dir) / "zotero.sqlite"
+    st = db_src.stat()
+    prefix = library_id(zotero_data_dir)
+    dbf = cache_dir("zotero") / f"{prefix}-{st.st_mtime_ns}-{st.st_size}.sqlite"
+    if dbf.exists():
+        return dbf
+
+    for stale in dbf.parent.glob(f"{prefix}-*.sqlite"):
+        stale.unlink(missing_ok=True)
+
+    # Copy next to the final location and move it in place, so that a concurrent
+    # reader never sees a partial copy.
+    with tempfile.NamedTemporaryFile(dir=dbf.parent, suffix=".tmp", delete=False) as tf:
+        tmp = tf.name
+    try:
+        shutil.copyfile(db_src, tmp)
+        os.replace(tmp, dbf)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+
+    return dbf
+
+
+def _readonly_uri(path: Path, immutable: bool = False) -> str:
+    return path.as_uri() + ("?mode=ro&immutable=1" if immutable else "?mode=ro")
+
+
 @contextlib.contextmanager
 def connect(
     zotero_data_dir: Optional[str | Path] = None,
+    mode: str = "snapshot",
 ) -> Generator[sqlite3.Connection, None, None]:
-    """Get SQLite connection."""
-    zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
+    """Get SQLite connection.
 
-    db_src = zotero_data_dir / "zotero.sqlite"
+    The ``mode`` is one of:
 
-    # Zotero locks the database too aggressively; make a (temporary)
-    # copy and work with the copy.
-    with tempfile.NamedTemporaryFile("w") as tf:
-        dbf = tf.name
-        shutil.copy(db_src, dbf)
+    - ``snapshot``: open a cached copy of the database read-only (see ``snapshot``).
+    - ``immutable``: open the live database through SQLite's immutable URI mode,
+      bypassing Zotero's lock. Do not use this while Zotero is writing to it.
+    - ``memory``: load the live database into memory with the backup API, reading
+      it exactly once.
+    """
+    zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
+    db_src = zotero_data_dir / "zotero.sqlite"
 
-        conn = sqlite3.connect(dbf)
-        conn.row_factory = sqlite3.Row
+    if mode == "snapshot":
+        conn = sqlite3.connect(_readonly_uri(snapshot(zotero_data_dir)), uri=True)
+    elif mode == "immutable":
+        conn = sqlite3.connect(_readonly_uri(db_src, immutable=True), uri=True)
+    elif mode == "memory":
+        conn = sqlite3.connect(":memory:")
+        src = sqlite3.connect(_readonly_uri(db_src, immutable=True), uri=True)
         try:
-            yield conn
+            src.backup(conn)
         finally:
-            conn.close()
+            src.close()
+    else:
+        raise ValueError(f"Unknown connection mode: {mode}")
+
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextlib.contextmanager
+def _connection(
+    conn: Optional[sqlite3.Connection],
+    zotero_data_dir: Optional[str | Path] = None,
+) -> Generator[sqlite3.Connection, None, None]:
+    """Reuse the given connection, or open a new one for the duration."""
+    if conn is not None:
+        yield conn
+        return
+    with connect(zotero_data_dir) as conn:
+        yield conn
+
+
+def _paginated(sql: str) -> str:
+    """Wrap the query to take LIMIT and OFFSET parameters (-1 for no limit)."""
+    return f"SELECT * FROM (\n{ sql.rstrip().rstrip(';') }\n) LIMIT ? OFFSET ?"
 
 
 SQL_LIST_ITEMS: str = """-- sql
 SELECT
+    items.itemID AS id,
     items.key,
-    itemDataValues.value
+    itemDataValues.value AS title
 FROM items
-    LEFT JOIN itemData ON itemData.itemID = items.itemID
-    LEFT JOIN itemDataValues ON itemDataValues.valueID = itemData.valueID
-    LEFT JOIN fieldsCombined ON fieldsCombined.fieldID = itemData.fieldID
+    JOIN itemData ON itemData.itemID = items.itemID
+    JOIN itemDataValues ON itemDataValues.valueID = itemData.valueID
+    JOIN fieldsCombined ON fieldsCombined.fieldID = itemData.fieldID
 WHERE
-    itemDataValues.value LIKE '%Evolution%'
-    AND fieldsCombined.fieldName = 'title'
+    fieldsCombined.fieldName = 'title'
+ORDER BY items.itemID
 """
 
 
-def get_item_list(zotero_data_dir: Optional[str | Path] = None) -> list:
-    zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
-
-    with connect(zotero_data_dir) as conn:
+def iter_items(
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> Iterator[sqlite3.Row]:
+    """Iterate over titled items, reading rows from the cursor as they come."""
+    with _connection(conn, zotero_data_dir) as conn:
         cur = conn.cursor()
-        cur.execute(SQL_LIST_ITEMS)
-        rows = cur.fetchall()
+        cur.execute(
+            _paginated(SQL_LIST_ITEMS), (-1 if limit is None else limit, offset)
+        )
+        yield from cur
 
-    return rows
+
+def get_item_list(
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> list:
+    return list(iter_items(zotero_data_dir, conn))
 
 
 SQL_LIST_DOCS: str = """-- sql
 SELECT
     anno.parentItemID AS id,
     COUNT(*) AS annotationCount,
+    MAX(annoItems.dateModified) AS dateModified,
+    parents.key,
     SUBSTR(attach.path, 9) AS filename
 FROM itemAnnotations anno
+    LEFT JOIN items annoItems ON annoItems.itemID = anno.itemID
     LEFT JOIN items parents ON parents.itemID = anno.parentItemID
     LEFT JOIN itemAttachments attach ON attach.itemID = parents.itemID
-GROUP BY id;
+GROUP BY id
+ORDER BY id;
 """
 
+SQL_LIST_DOCS_FOR_IDS: str = """-- sql
+SELECT
+    anno.parentItemID AS id,
+    COUNT(*) AS annotationCount,
+    MAX(annoItems.dateModified) AS dateModified,
+    parents.key,
+    SUBSTR(attach.path, 9) AS filename
+FROM itemAnnotations anno
+    LEFT JOIN items annoItems ON annoItems.itemID = anno.itemID
+    LEFT JOIN items parents ON parents.itemID = anno.parentItemID
+    LEFT JOIN itemAttachments attach ON attach.itemID = parents.itemID
+WHERE anno.parentItemID IN (SELECT value FROM json_each(?))
+GROUP BY id
+ORDER BY id;
+"""
 
-def get_doc_list(zotero_data_dir: Optional[str | Path] = None) -> List:
-    zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
+# Docs whose attachment, or the attachment's parent item, is in the collection:
+SQL_LIST_DOCS_IN_COLLECTION: str = """-- sql
+WITH collection AS (
+    SELECT collectionItems.itemID
+    FROM collectionItems
+        JOIN collections ON collections.collectionID = collectionItems.collectionID
+    WHERE collections.collectionName = :collection OR collections.key = :collection
+)
+SELECT
+    anno.parentItemID AS id,
+    COUNT(*) AS annotationCount,
+    MAX(annoItems.dateModified) AS dateModified,
+    parents.key,
+    SUBSTR(attach.path, 9) AS filename
+FROM itemAnnotations anno
+    LEFT JOIN items annoItems ON annoItems.itemID = anno.itemID
+    LEFT JOIN items parents ON parents.itemID = anno.parentItemID
+    LEFT JOIN itemAttachments attach ON attach.itemID = parents.itemID
+WHERE
+    attach.parentItemID IN (SELECT itemID FROM collection)
+    OR anno.parentItemID IN (SELECT itemID FROM collection)
+GROUP BY id
+ORDER BY id;
+"""
 
-    with connect(zotero_data_dir) as conn:
+
+# IDs of the items which are docs of the collection if annotated:
+SQL_LIST_COLLECTION_DOC_IDS: str = """-- sql
+WITH collection AS (
+    SELECT collectionItems.itemID
+    FROM collectionItems
+        JOIN collections ON collections.collectionID = collectionItems.collectionID
+    WHERE collections.collectionName = :collection OR collections.key = :collection
+)
+SELECT itemID AS id FROM collection
+UNION
+SELECT itemID AS id FROM itemAttachments
+WHERE parentItemID IN (SELECT itemID FROM collection)
+"""
+
+SQL_GET_ANNOTATION_COUNTS: str = """-- sql
+SELECT COUNT(*) AS annotationCount, MAX(itemID) AS maxID FROM itemAnnotations
+"""
+
+# Annotations modified at or after a time, or added after an item ID:
+SQL_LIST_ANNOTATIONS_SINCE: str = """-- sql
+SELECT anno.itemID, anno.parentItemID AS id, items.dateModified
+FROM itemAnnotations anno
+    JOIN items ON items.itemID = anno.itemID
+WHERE items.dateModified >= ? OR anno.itemID > ?
+"""
+
+SQL_COUNT_ANNOTATIONS_FOR_IDS: str = """-- sql
+SELECT parentItemID AS id, COUNT(*) AS annotationCount
+FROM itemAnnotations
+WHERE parentItemID IN (SELECT value FROM json_each(?))
+GROUP BY parentItemID
+"""
+
+
+def get_doc_list(
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    collection: Optional[str] = None,
+) -> List:
+    """Get docs with annotations, ordered by ID.
+
+    If ``collection`` (name or key) is given, limit to the docs in it.
+    """
+    with _connection(conn, zotero_data_dir) as conn:
         cur = conn.cursor()
-        cur.execute(SQL_LIST_DOCS)
+        if collection is None:
+            cur.execute(SQL_LIST_DOCS)
+        else:
+            cur.execute(SQL_LIST_DOCS_IN_COLLECTION, {"collection": collection})
         rows = cur.fetchall()
 
     return rows
 
 
+def iter_docs(
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> Iterator[sqlite3.Row]:
+    """Iterate over docs with annotations, reading rows from the cursor as they come."""
+    with _connection(conn, zotero_data_dir) as conn:
+        cur = conn.cursor()
+        cur.execute(_paginated(SQL_LIST_DOCS), (-1 if limit is None else limit, offset))
+        yield from cur
+
+
+def storage_path(
+    key: str, filename: str, zotero_data_dir: Optional[str | Path] = None
+) -> Path:
+    """Get the path to an attachment file in the Zotero storage."""
+    zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
+    return zotero_data_dir / "storage" / str(key) / str(filename)
+
+
 SQL_GET_FILENAME_FOR_ID: str = """-- sql
 SELECT
     anno.parentItemID AS itemID,
@@ -105,10 +307,14 @@ GROUP BY anno.parentItemID;
 """
 
 
-def get_filename_for_id(id: str, zotero_data_dir: Optional[str | Path] = None) -> Path:
+def get_filename_for_id(
+    id: str,
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
+) -> Path:
     zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
 
-    with connect(zotero_data_dir) as conn:
+    with _connection(conn, zotero_data_dir) as conn:
         cur = conn.cursor()
         cur.execute(SQL_GET_FILENAME_FOR_ID, (id,))
         row = cur.fetchone()
@@ -116,7 +322,7 @@ def get_filename_for_id(id: str, zotero_data_dir: Optional[str | Path] = None) -
     if not row:
         raise ValueError("Item for ID does not exist")
 
-    return zotero_data_dir / "storage" / str(row[1]) / str(row[2])
+    return storage_path(row[1], row[2], zotero_data_dir)
 
 
 SQL_GET_ANNOTATIONS_FOR_ID = """-- sql
@@ -131,11 +337,11 @@ WHERE parentItemID = ?
 
 
 def get_annotations_for_id(
-    id: str, zotero_data_dir: Optional[str | Path] = None
+    id: str,
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> List[dict]:
-    zotero_data_dir = _find_zotero_data_dir(zotero_data_dir)
-
-    with connect(zotero_data_dir) as conn:
+    with _connection(conn, zotero_data_dir) as conn:
         cur = conn.cursor()
         cur.execute(SQL_GET_ANNOTATIONS_FOR_ID, (id,))
         rows = cur.fetchall()
@@ -146,3 +352,104 @@ def get_annotations_for_id(
         return row_as_dict
 
     return [_transform(row) for row in rows]
+
+
+SQL_LIST_ANNOTATIONS = """-- sql
+SELECT
+    parentItemID AS id,
+    CAST(pageLabel AS INTEGER) AS page,
+    position,
+    text,
+    comment
+FROM itemAnnotations
+ORDER BY parentItemID
+"""
+
+SQL_LIST_ANNOTATIONS_FOR_IDS = """-- sql
+SELECT
+    parentItemID AS id,
+    CAST(pageLabel AS INTEGER) AS page,
+    position,
+    text,
+    comment
+FROM itemAnnotations
+WHERE parentItemID IN (SELECT value FROM json_each(?))
+ORDER BY parentItemID
+"""
+
+
+def iter_annotations_by_id(
+    zotero_data_dir: Optional[str | Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
+    ids: Optional[List[int]] = None,
+) -> Iterator[Tuple[int, List[dict]]]:
+    """Iterate over annotations with one query, grouped by parent ID in order.
+
+    If ``ids`` is given, only the annotations for those parent IDs are read.
+    """
+
+    def _transform(row: sqlite3.Row) -> dict:
+        row_as_dict = dict(row)
+        del row_as_dict["id"]
+        row_as_dict["position"] = json.loads(row_as_dict["position"])
+        return row_as_dict
+
+    with _connection(conn, zotero_data_dir) as conn:
+        cur = conn.cursor()
+        if ids is None:
+            cur.execute(SQL_LIST_ANNOTATIONS)
+        else:
+            cur.execute(SQL_LIST_ANNOTATIONS_FOR_IDS, (json.dumps(ids),))
+        for id, rows in itertools.groupby(cur, key=lambda row: row["id"]):
+            yield id, [_transform(row) for row in rows]
+
+
+SQL_LIST_ITEM_VERSIONS = """-- sql
+SELECT itemID AS id, dateModified FROM items
+"""
+
+SQL_LIST_ITEM_VERSIONS_SINCE = """-- sql
+SELECT itemID AS id, dateModified FROM items WHERE dateModified >= ? OR itemID > ?
+"""
+
+SQL_GET_ITEM_STATS = """-- sql
+SELECT MAX(dateModified) AS dateModified, MAX(itemID) AS maxID, COUNT(*) AS count
+FROM items
+"""
+
+SQL_GET_ITEM_TEXTS_FOR_IDS = """-- sql
+SELECT
+    items.itemID AS id,
+    items.key,
+    (
+        SELECT itemDataValues.value
+        FROM itemData
+            JOIN itemDataValues ON itemDataValues.valueID = itemData.valueID
+            JOIN fieldsCombined ON fieldsCombined.fieldID = itemData.fieldID
+        WHERE itemData.itemID = items.itemID AND fieldsCombined.fieldName = 'title'
+    ) AS title,
+    (
+        SELECT GROUP_CONCAT(name, '; ')
+        FROM (
+            SELECT TRIM(COALESCE(firstName, '') || ' ' || COALESCE(lastName, '')) AS name
+            FROM itemCreators
+                JOIN creators ON creators.creatorID = itemCreators.creatorID
+            WHERE itemCreators.itemID = items.itemID
+            ORDER BY itemCreators.orderIndex
+        )
+    ) AS creators
+FROM items
+WHERE items.itemID IN (SELECT value FROM json_each(?))
+"""
+
+SQL_GET_ANNOTATION_TEXTS_FOR_IDS = """-- sql
+SELECT
+    anno.itemID AS id,
+    anno.parentItemID,
+    items.key,
+    anno.text,
+    anno.comment
+FROM itemAnnotations anno
+    JOIN items ON items.itemID = anno.itemID
+WHERE anno.itemID IN (SELECT value FROM json_each(?))
+"""
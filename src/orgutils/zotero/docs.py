@@ -1,8 +1,21 @@
+from typing import Optional
+
+from ..utils import write_rows
 from . import db
 
+DOC_COLUMNS = (
+    ("id", "ID"),
+    ("annotationCount", "Annotation Count"),
+    ("filename", "File"),
+)
+
 
-def list_docs() -> None:
-    rows = db.get_doc_list()
-    print("\t".join(["ID", "Annotation Count", "File"]))
-    for row in rows:
-        print(f"{ row['id'] }\t{ row['annotationCount'] }\t\"{ row['filename'] }\"")
+def list_docs(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    output_format: str = "tsv",
+    db_mode: str = "snapshot",
+) -> None:
+    with db.connect(mode=db_mode) as conn:
+        rows = db.iter_docs(conn=conn, limit=limit, offset=offset)
+        write_rows(rows, DOC_COLUMNS, output_format)
@@ -1,71 +1,101 @@
 """Zotero exporters."""
-import subprocess
+
+import json
+import os
+import sqlite3
+import sys
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
-from xml.etree import ElementTree as ET
-from xml.etree.ElementTree import Element
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from pdfminer.pdfdocument import PDFDocument, PDFNoOutlines
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import PDFObjRef, resolve1
+from pdfminer.psparser import PSLiteral
 
+from ..cache import DiskCache, file_key
+from ..org import merge as org_merge
 from ..org import structs
-from ..utils import remove_whitespaces_between_zenkaku
+from ..utils import text_normalizer
 from . import db
 
+Item = namedtuple("Item", ("loc", "object"))
 
-def list_items() -> None:
-    rows = db.get_item_list()
-    print("\t".join(["ID", "Annotation Count", "File"]))
-    for row in rows:
-        print(f"{ row['id'] }\t{ row['annotationCount'] }\t\"{ row['filename'] }\"")
 
+def _resolve_dest(doc: PDFDocument, dest: Any) -> Any:
+    if isinstance(dest, (str, bytes)):
+        dest = resolve1(doc.get_dest(dest))
+    elif isinstance(dest, PSLiteral):
+        dest = resolve1(doc.get_dest(dest.name))
+    if isinstance(dest, dict):
+        dest = dest["D"]
+    if isinstance(dest, PDFObjRef):
+        dest = dest.resolve()
+    return dest
 
-Item = namedtuple("Item", ("loc", "object"))
 
+def _read_outline(filename: str | Path) -> List[Tuple[int, float, float, str, int]]:
+    """Read (page, x, y, title, level) of outline entries from PDF."""
+    entries: List[Tuple[int, float, float, str, int]] = []
+    with open(filename, "rb") as f:
+        doc = PDFDocument(PDFParser(f))
+        try:
+            outlines = list(doc.get_outlines())
+        except PDFNoOutlines:
+            return entries
 
-def _element_find(elmt: Element, path: str) -> Element:
-    e = elmt.find(path)
-    if not e:
-        raise RuntimeError(f"Element not found at {path}")
-    return e
+        pages = {
+            page.pageid: pageno
+            for pageno, page in enumerate(PDFPage.create_pages(doc), 1)
+        }
 
+        for level, title, dest, action, _ in outlines:
+            if not dest and isinstance(action, dict) and action.get("D"):
+                if repr(action.get("S")) == "/'GoTo'":
+                    dest = action["D"]
+            if not dest:
+                continue
+            dest = _resolve_dest(doc, dest)
+            if not isinstance(dest, list) or not dest:
+                continue
+            page = pages.get(getattr(dest[0], "objid", None))
+            if page is None:
+                continue
 
-def _element_findall(elmt: Element, path: str) -> List[Element]:
-    e = elmt.findall(path)
-    if not e:
-        raise RuntimeError(f"Element items not found at {path}")
-    return e
+            # For /XYZ, the destination is [page /XYZ left top zoom]:
+            numbers = [float(v) for v in dest[2:] if isinstance(v, (int, float))]
+            x, y = (numbers + [0.0, 0.0])[:2]
+            entries.append((page, x, y, title, level))
 
+    return entries
 
-def _element_text(elmt: Element) -> str:
-    if elmt.text is None:
-        raise RuntimeError("Element.text attribute returns None")
-    return elmt.text
+
+# Bump when the outline extraction changes, to invalidate cached outlines:
+_OUTLINE_CACHE_VERSION = 1
 
 
 def _get_outline(filename: str | Path) -> List[Item] | None:
-    """Get document outline (table of contents)."""
-    outline_xml = subprocess.check_output(["dumppdf.py", "-T", filename])
+    """Get document outline (table of contents).
 
-    try:
-        root = ET.fromstring(outline_xml)
-    except ET.ParseError:
-        return None
+    The outline of each PDF is cached, keyed by its path, mtime, and size.
+    """
+    cache = DiskCache("outlines", ".json")
+    key = file_key(filename, _OUTLINE_CACHE_VERSION)
+
+    cached = cache.get(key)
+    if cached is None:
+        entries = _read_outline(filename)
+        cache.put(key, json.dumps(entries).encode())
+    else:
+        entries = json.loads(cached)
 
-    if not root:
+    if not entries:
         return None
 
     items = []
-    for elmt in root.findall(".//outline[@title]"):
-        page = int(_element_text(_element_find(elmt, "pageno")))
-        numbers = _element_findall(elmt, ".//number")
-        x = float(_element_text(numbers[0]))
-        y = float(_element_text(numbers[1]))
-        title = elmt.get("title")
-        level = int(elmt.get("level", -1))
-        if title is None:
-            raise RuntimeError("'title' not found")
-        if level < 0:
-            raise RuntimeError("'level' not found")
-
+    for page, x, y, title, level in entries:
         obj = structs.Heading(
             title,
             level + 1,
@@ -76,18 +106,28 @@ def _get_outline(filename: str | Path) -> List[Item] | None:
     return items
 
 
-def export_to_org(id: str, lang: str) -> None:
-    filename = db.get_filename_for_id(id)
-    # preprocess = preprocess_ja if lang == "ja" else lambda s: s
+def _to_org_objects(
+    outline_items: List[Item] | None,
+    annotations: Iterable[dict],
+    lang: str = "en",
+    nfkc: bool = False,
+) -> List[structs.OrgObject]:
+    """Make Org objects of an outline and annotations, sorted by position.
 
+    The annotated texts, taken from PDFs, are normalized for ``lang`` all at once,
+    joining their lines.
+    """
     items: List[Item] = []
 
-    outline_items = _get_outline(filename)
     if outline_items:
         items.extend(outline_items)
 
+    annotations = list(annotations)
+    normalize = text_normalizer(lang, nfkc=nfkc, join_lines=True)
+    texts = normalize([row["text"] or "" for row in annotations])
+
     # Get annotations.
-    for row in db.get_annotations_for_id(id):
+    for row, text in zip(annotations, texts):
         page = row["page"]
         rects = row["position"].get("rects")
         if rects:
@@ -95,16 +135,11 @@ def export_to_org(id: str, lang: str) -> None:
             x, y = float(first[0]), float(first[-1])
         else:
             raise RuntimeError('"rects" not found')
-        text = row["text"]
         comment = row["comment"]
 
         objs: List[structs.OrgObject] = []
         if text:
-            objs.append(
-                structs.QuoteBlock(
-                    remove_whitespaces_between_zenkaku(text) + f" (p. { page })"
-                )
-            )
+            objs.append(structs.QuoteBlock(text + f" (p. { page })"))
         if comment:
             objs.append(structs.Paragraph(comment + f" (p. { page })"))
         if objs:
@@ -114,4 +149,283 @@ def export_to_org(id: str, lang: str) -> None:
         items, key=lambda item: item.loc
     )
 
-    print(structs.dumps((item.object for item in items)))
+    return [item.object for item in items]
+
+
+def export_to_org(
+    id: str, lang: str, db_mode: str = "snapshot", nfkc: bool = False
+) -> None:
+    with db.connect(mode=db_mode) as conn:
+        filename = db.get_filename_for_id(id, conn=conn)
+        annotations = db.get_annotations_for_id(id, conn=conn)
+
+    outline_items = _get_outline_if_exists(filename)
+    structs.dump(_to_org_objects(outline_items, annotations, lang, nfkc))
+
+
+def _get_outline_if_exists(filename: Path | None) -> List[Item] | None:
+    if filename is None or not filename.exists():
+        return None
+    return _get_outline(filename)
+
+
+def _output_filename(id: int, filename: str | None) -> str:
+    return f"{ id }-{ Path(filename).stem }.org" if filename else f"{ id }.org"
+
+
+# Annotation state of the last export, kept in the output directory: per doc in
+# "docs", and for the library in "library" (see ``_changed_docs``):
+STATE_FILENAME = ".org-from-zotero.json"
+
+
+def _load_state(output_dir: Path) -> Dict[str, Any]:
+    try:
+        with open(output_dir / STATE_FILENAME) as f:
+            state: Dict[str, Any] = json.load(f)
+            return state
+    except FileNotFoundError:
+        return {"docs": {}}
+
+
+def _save_state(output_dir: Path, state: Dict[str, Any]) -> None:
+    path = output_dir / STATE_FILENAME
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _doc_state(doc: Mapping[str, Any] | sqlite3.Row) -> dict:
+    return {
+        "dateModified": doc["dateModified"],
+        "annotationCount": doc["annotationCount"],
+        "output": _output_filename(doc["id"], doc["filename"]),
+    }
+
+
+def _library_state(
+    counts: sqlite3.Row, since: Optional[str], collection: Optional[str]
+) -> dict:
+    return {**dict(counts), "dateModified": since, "collection": collection}
+
+
+def _annotation_counts(conn: sqlite3.Connection, ids: Iterable[str]) -> Dict[str, int]:
+    """Count the annotations of the docs, omitting those without any."""
+    rows = conn.execute(
+        db.SQL_COUNT_ANNOTATIONS_FOR_IDS, (json.dumps([int(id) for id in ids]),)
+    )
+    return {str(row["id"]): row["annotationCount"] for row in rows}
+
+
+def _changed_docs(
+    conn: sqlite3.Connection,
+    state: Dict[str, Any],
+    counts: sqlite3.Row,
+    output_dir: Path,
+) -> Tuple[List[sqlite3.Row], List[str], Optional[str]]:
+    """Get the docs that may have changed since the last export.
+
+    The library state of the last export has the latest ``dateModified`` of the
+    annotations of the exported docs, and the number and largest item ID of all
+    annotations. Only the annotations modified or added since are read. If the
+    number of annotations shows that some were deleted, the annotations of the
+    exported docs are counted, to find the docs that lost some.
+
+    Return the docs, the IDs of the exported docs without annotations left, and the
+    new latest ``dateModified``.
+    """
+    library = state["library"]
+    exported = state["docs"]
+    since = library["dateModified"]
+    ids = set()
+    added = 0
+    for row in conn.execute(db.SQL_LIST_ANNOTATIONS_SINCE, (since, library["maxID"])):
+        ids.add(row["id"])
+        added += row["itemID"] > library["maxID"]
+        since = max(since, row["dateModified"])
+
+    gone = []
+    if counts["annotationCount"] != library["annotationCount"] + added:
+        annotated = _annotation_counts(conn, exported)
+        for id, doc in exported.items():
+            if id not in annotated:
+                gone.append(id)
+            elif annotated[id] != doc["annotationCount"]:
+                ids.add(int(id))
+
+    # Docs whose output went missing:
+    ids.update(
+        int(id)
+        for id, doc in exported.items()
+        if id not in gone and not (output_dir / doc["output"]).exists()
+    )
+    if library["collection"] is not None:
+        members = {
+            row["id"]
+            for row in conn.execute(
+                db.SQL_LIST_COLLECTION_DOC_IDS, {"collection": library["collection"]}
+            )
+        }
+        # Docs added to the collection may have annotations, too:
+        ids = (ids | {id for id in members if str(id) not in exported}) & members
+    docs = conn.execute(db.SQL_LIST_DOCS_FOR_IDS, (json.dumps(sorted(ids)),))
+    return docs.fetchall(), gone, since
+
+
+def export_docs_to_org(
+    output_dir: str | Path,
+    lang: str,
+    collection: Optional[str] = None,
+    incremental: bool = False,
+    jobs: Optional[int] = None,
+    db_mode: str = "snapshot",
+    merge: bool = False,
+    nfkc: bool = False,
+) -> None:
+    """Export all annotated docs (in a collection) to Org files in a directory.
+
+    All annotations are read with a single query, and PDF outlines are built in a
+    pool of ``jobs`` worker processes.
+
+    The annotation state of each exported doc, and of the library, is saved in the
+    output directory. If ``incremental``, only the docs whose annotations changed
+    since (or whose output went missing after) the last export are regenerated, and
+    only the annotations modified since are read (see ``_changed_docs``). If
+    ``merge``, new annotations are merged into existing Org files instead of
+    overwriting them.
+
+    The outputs of exported docs left without annotations are removed, or kept and
+    reported if ``merge``.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state = _load_state(output_dir)
+    exported: Dict[str, dict] = state["docs"]
+    library = state.get("library")
+
+    failures = []
+    count = 0
+    with db.connect(mode=db_mode) as conn:
+        counts = conn.execute(db.SQL_GET_ANNOTATION_COUNTS).fetchone()
+        if (
+            incremental
+            and library is not None
+            and library["collection"] == collection
+            and library["dateModified"] is not None
+        ):
+            docs, gone, since = _changed_docs(conn, state, counts, output_dir)
+        else:
+            docs = db.get_doc_list(conn=conn, collection=collection)
+            ids = {str(doc["id"]) for doc in docs}
+            others = [id for id in exported if id not in ids]
+            annotated = _annotation_counts(conn, others)
+            gone = [id for id in others if id not in annotated]
+            since = max((doc["dateModified"] for doc in docs), default=None)
+
+        for id in gone:
+            path = output_dir / exported.pop(id)["output"]
+            if merge:
+                print(f"{ id }: no annotations left in { path }", file=sys.stderr)
+            else:
+                print(
+                    f"{ id }: no annotations left, removing { path }", file=sys.stderr
+                )
+                path.unlink(missing_ok=True)
+        if incremental:
+            docs = [
+                doc
+                for doc in docs
+                if exported.get(str(doc["id"])) != _doc_state(doc)
+                or not (output_dir / _doc_state(doc)["output"]).exists()
+            ]
+            if not docs:
+                state["library"] = _library_state(counts, since, collection)
+                _save_state(output_dir, state)
+                print(f"{ output_dir } is up to date", file=sys.stderr)
+                return
+
+        filenames = [
+            db.storage_path(doc["key"], doc["filename"]) if doc["filename"] else None
+            for doc in docs
+        ]
+        # Both docs and annotation groups are ordered by ID; only those of the docs
+        # to export are read if they are not all:
+        annotation_groups = db.iter_annotations_by_id(
+            conn=conn,
+            ids=[doc["id"] for doc in docs] if incremental or collection else None,
+        )
+        group_id, annotations = next(annotation_groups, (None, []))
+
+        with ProcessPoolExecutor(jobs) as executor:
+            futures = [executor.submit(_get_outline_if_exists, f) for f in filenames]
+            for doc, future in zip(docs, futures):
+                while group_id is not None and group_id < doc["id"]:
+                    group_id, annotations = next(annotation_groups, (None, []))
+                if group_id != doc["id"]:
+                    continue
+
+                try:
+                    outline_items = future.result()
+                except Exception as e:
+                    # The annotations are still worth exporting without an outline:
+                    print(f"{ doc['id'] }: no outline: { e }", file=sys.stderr)
+                    outline_items = None
+
+                path = output_dir / _output_filename(doc["id"], doc["filename"])
+                tmp = path.with_name(path.name + ".tmp")
+                try:
+                    objs = _to_org_objects(outline_items, annotations, lang, nfkc)
+                    if merge and path.exists():
+                        org_merge.merge_file(path, structs.dumps(objs) + "\n")
+                    else:
+                        with open(tmp, "w") as f:
+                            structs.dump(objs, f)
+                        os.replace(tmp, path)
+                except Exception as e:
+                    failures.append((doc["id"], e))
+                    continue
+                finally:
+                    tmp.unlink(missing_ok=True)
+                exported[str(doc["id"])] = _doc_state(doc)
+                count += 1
+
+    # Failed docs are retried by reading the annotations since the last export:
+    if not failures:
+        state["library"] = _library_state(counts, since, collection)
+    _save_state(output_dir, state)
+
+    for id, error in failures:
+        print(f"{ id }: { type(error).__name__ }: { error }", file=sys.stderr)
+    print(
+        f"Exported { count } docs to { output_dir } ({ len(failures) } failed)",
+        file=sys.stderr,
+    )
+
+
+def extract(
+    id: Optional[str],
+    lang: str,
+    all_docs: bool = False,
+    collection: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    incremental: bool = False,
+    jobs: Optional[int] = None,
+    db_mode: str = "snapshot",
+    merge: bool = False,
+    nfkc: bool = False,
+) -> None:
+    if all_docs or collection:
+        export_docs_to_org(
+            output_dir or ".",
+            lang,
+            collection,
+            incremental,
+            jobs,
+            db_mode,
+            merge,
+            nfkc,
+        )
+    elif id is None:
+        raise ValueError("Give an ID, all_docs, or collection")
+    else:
+        export_to_org(id, lang, db_mode, nfkc)
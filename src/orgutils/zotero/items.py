@@ -1,9 +1,17 @@
+from typing import Optional
+
+from ..utils import write_rows
 from . import db
 
+ITEM_COLUMNS = (("id", "ID"), ("key", "Key"), ("title", "Title"))
+
 
-def list_items() -> None:
-    rows = db.get_item_list()
-    # print("\t".join(["ID", "Annotation Count", "File"]))
-    for row in rows:
-        # print(f"{ row['id'] }\t{ row['annotationCount'] }\t\"{ row['filename'] }\"")
-        print(f"{ row['key'] }\t{ row['value'] }\t\"{ row['key'] }\"")
+def list_items(
+    limit: Optional[int] = None,
+    offset: int = 0,
+    output_format: str = "tsv",
+    db_mode: str = "snapshot",
+) -> None:
+    with db.connect(mode=db_mode) as conn:
+        rows = db.iter_items(conn=conn, limit=limit, offset=offset)
+        write_rows(rows, ITEM_COLUMNS, output_format)
@@ -0,0 +1,222 @@
+"""Full-text search over Zotero items and annotations.
+
+The search runs on a sidecar SQLite FTS5 index, which is built from the database
+snapshot and updated incrementally: only the items whose ``dateModified`` changed
+since the last update are reindexed.
+
+The index keeps the latest ``dateModified``, the largest item ID, and the number of
+items as of the last update, so that an unchanged library is found unchanged with a
+single aggregate query. Otherwise, only the items modified or added since are read,
+and the IDs of all items are compared only if some were deleted. As
+``dateModified`` has a resolution of a second, an item modified within the second
+of the last update, without any other change, is reindexed only after the next one.
+"""
+
+import contextlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
+
+from ..cache import cache_dir
+from ..utils import write_rows
+from . import db
+
+SQL_CREATE_INDEX = """-- sql
+CREATE TABLE IF NOT EXISTS indexed (
+    itemID INTEGER PRIMARY KEY,
+    dateModified TEXT
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(
+    title,
+    creators,
+    text,
+    comment,
+    kind UNINDEXED,
+    docID UNINDEXED,
+    key UNINDEXED
+);
+"""
+
+SQL_SEARCH = """-- sql
+SELECT
+    rowid AS id,
+    kind,
+    docID,
+    key,
+    COALESCE(title, '') AS title,
+    snippet(fts, -1, '[', ']', '...', 12) AS snippet
+FROM fts
+WHERE fts MATCH ?
+ORDER BY bm25(fts)
+LIMIT ? OFFSET ?
+"""
+
+SEARCH_COLUMNS = (
+    ("id", "ID"),
+    ("kind", "Kind"),
+    ("docID", "Doc ID"),
+    ("key", "Key"),
+    ("title", "Title"),
+    ("snippet", "Snippet"),
+)
+
+# Number of item IDs per query when reading changed items:
+_BATCH_SIZE = 5000
+
+
+@contextlib.contextmanager
+def open_index(
+    zotero_data_dir: Optional[str | Path] = None,
+) -> Generator[sqlite3.Connection, None, None]:
+    """Open the search index of the Zotero library."""
+    path = cache_dir("zotero", "search") / f"{ db.library_id(zotero_data_dir) }.sqlite"
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.executescript(SQL_CREATE_INDEX)
+        yield conn
+    finally:
+        conn.close()
+
+
+def _batches(ids: List[int]) -> Iterator[str]:
+    for i in range(0, len(ids), _BATCH_SIZE):
+        yield json.dumps(ids[i : i + _BATCH_SIZE])
+
+
+def _changed_items(
+    index: sqlite3.Connection,
+    conn: sqlite3.Connection,
+    state: Dict[str, Any],
+    count: int,
+) -> Tuple[Dict[int, str], List[int]]:
+    """Get the (ID, dateModified) of changed items, and the IDs of deleted items.
+
+    ``state`` is that of the last update, and ``count`` the current number of items.
+    """
+    if state.get("dateModified") is None:
+        current = {
+            row["id"]: row["dateModified"]
+            for row in conn.execute(db.SQL_LIST_ITEM_VERSIONS)
+        }
+        indexed = {
+            row[0]: row[1]
+            for row in index.execute("SELECT itemID, dateModified FROM indexed")
+        }
+        changed = {id: dm for id, dm in current.items() if indexed.get(id) != dm}
+        return changed, [id for id in indexed if id not in current]
+
+    # Items modified within the second of the last update are read again, and
+    # items added by a sync may have an earlier dateModified:
+    modified = {
+        row["id"]: row["dateModified"]
+        for row in conn.execute(
+            db.SQL_LIST_ITEM_VERSIONS_SINCE, (state["dateModified"], state["maxID"])
+        )
+    }
+    indexed = {
+        row[0]: row[1]
+        for ids in _batches(list(modified))
+        for row in index.execute(
+            "SELECT itemID, dateModified FROM indexed "
+            "WHERE itemID IN (SELECT value FROM json_each(?))",
+            (ids,),
+        )
+    }
+    changed = {id: dm for id, dm in modified.items() if indexed.get(id) != dm}
+
+    # Without deletions, the items are those indexed and those added:
+    (n_indexed,) = index.execute("SELECT COUNT(*) FROM indexed").fetchone()
+    if n_indexed + len(modified) - len(indexed) == count:
+        return changed, []
+    current_ids = {row[0] for row in conn.execute("SELECT itemID FROM items")}
+    deleted = [
+        row[0]
+        for row in index.execute("SELECT itemID FROM indexed")
+        if row[0] not in current_ids
+    ]
+    return changed, deleted
+
+
+def update_index(
+    index: sqlite3.Connection, conn: sqlite3.Connection, rebuild: bool = False
+) -> int:
+    """Reindex the items added, changed, or deleted since the last update.
+
+    Return the number of reindexed items.
+    """
+    with index:
+        if rebuild:
+            index.execute("DELETE FROM indexed")
+            index.execute("DELETE FROM fts")
+            index.execute("DELETE FROM state")
+
+        stats = dict(conn.execute(db.SQL_GET_ITEM_STATS).fetchone())
+        state = dict(index.execute("SELECT key, value FROM state").fetchall())
+        if state == stats:
+            return 0
+        changed, deleted = _changed_items(index, conn, state, stats["count"])
+
+        for ids in _batches(list(changed) + deleted):
+            index.execute(
+                "DELETE FROM fts WHERE rowid IN (SELECT value FROM json_each(?))",
+                (ids,),
+            )
+            index.execute(
+                "DELETE FROM indexed WHERE itemID IN (SELECT value FROM json_each(?))",
+                (ids,),
+            )
+
+        for ids in _batches(list(changed)):
+            index.executemany(
+                "INSERT INTO fts (rowid, title, creators, kind, key) "
+                "VALUES (:id, :title, :creators, 'item', :key)",
+                (
+                    dict(row)
+                    for row in conn.execute(db.SQL_GET_ITEM_TEXTS_FOR_IDS, (ids,))
+                    if row["title"] or row["creators"]
+                ),
+            )
+            index.executemany(
+                "INSERT INTO fts (rowid, text, comment, kind, docID, key) "
+                "VALUES (:id, :text, :comment, 'annotation', :parentItemID, :key)",
+                (
+                    dict(row)
+                    for row in conn.execute(db.SQL_GET_ANNOTATION_TEXTS_FOR_IDS, (ids,))
+                    if row["text"] or row["comment"]
+                ),
+            )
+        index.executemany("INSERT INTO indexed VALUES (?, ?)", changed.items())
+        index.executemany("INSERT OR REPLACE INTO state VALUES (?, ?)", stats.items())
+
+    return len(changed) + len(deleted)
+
+
+def _fts_query(query: str) -> str:
+    """Quote each term, so that the query matches items containing all terms."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def search_items(
+    query: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    output_format: str = "tsv",
+    rebuild: bool = False,
+    db_mode: str = "snapshot",
+) -> None:
+    """Search item titles, creators, and annotation text and comments."""
+    if not query.split():
+        raise ValueError("Empty search query")
+
+    with db.connect(mode=db_mode) as conn, open_index() as index:
+        update_index(index, conn, rebuild=rebuild)
+        rows = index.execute(
+            SQL_SEARCH, (_fts_query(query), -1 if limit is None else limit, offset)
+        )
+        write_rows(rows, SEARCH_COLUMNS, output_format)
@@ -0,0 +1 @@
+"""Builders of test inputs, shared by the tests and the benchmarks."""
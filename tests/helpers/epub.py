@@ -0,0 +1,173 @@
+"""Builder for EPUB files."""
+
+import re
+import zipfile
+
+CONTAINER = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+OPF = """<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="id">test-book</dc:identifier>
+    <dc:title>Test Book</dc:title>
+    <dc:language>en</dc:language>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+    <item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>
+    <item id="cover" href="images/cover.png" media-type="image/png"/>
+{manifest}
+  </manifest>
+  <spine toc="ncx">
+{spine}
+  </spine>
+</package>
+"""
+
+XHTML = """<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><title>{title}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+NAV = """<nav epub:type="toc" id="toc">
+{toc}
+</nav>
+<nav epub:type="page-list" id="page-list"><ol>
+{pages}
+</ol></nav>
+"""
+
+NCX = """<?xml version="1.0" encoding="UTF-8"?>
+<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">
+<head/>
+<docTitle><text>Test Book</text></docTitle>
+<navMap>
+{toc}
+</navMap>
+<pageList>
+{pages}
+</pageList>
+</ncx>
+"""
+
+
+def pagebreak(page):
+    return (
+        f'<span id="p{page}" aria-label=" page {page}. " epub:type="pagebreak" '
+        'role="doc-pagebreak"/>'
+    )
+
+
+# Chapters as (name, body) pairs, in spine order:
+CHAPTERS = (
+    (
+        "ch1",
+        f"""{pagebreak("i")}
+<h1 id="c1">Preface</h1>
+<p>Text.</p>
+{pagebreak(1)}
+<h1 id="c2">Part <em>One</em></h1>
+<h2 id="c3">{pagebreak(2)}Chapter 1</h2>
+<p>Text.</p>
+<h3 id="c4">Section 1.1</h3>
+""",
+    ),
+    (
+        "ch2",
+        f"""<h2 id="c5">Chapter 2</h2>
+<p>Text.</p>
+{pagebreak(3)}
+<p>Text.</p>
+<h3 id="c6">Section 2.1</h3>
+<h3 id="c7">  </h3>
+{pagebreak(10)}
+""",
+    ),
+)
+
+
+def _nav_toc(headings, li, ol):
+    """Render (level, title, href) headings as nested list items."""
+    toc = []
+    level = 0
+    for new_level, title, href in headings:
+        if new_level > level:
+            toc.append(ol[0] * (new_level - level))
+        else:
+            toc.append((li[1] + ol[1]) * (level - new_level) + li[1])
+        level = new_level
+        toc.append(li[0].format(title=title, href=href))
+    toc.append((li[1] + ol[1]) * level)
+    return "\n".join(toc)
+
+
+def make_epub(path, chapters=CHAPTERS, nav="nav", manifest_order=None):
+    """Write an EPUB 3 of XHTML chapters.
+
+    The table of contents and page list are in the navigation document if ``nav`` is
+    "nav", in the NCX file if "ncx", and nowhere if None. The manifest lists the
+    chapters in spine order unless ``manifest_order`` is given.
+    """
+    manifest = "\n".join(
+        f'    <item id="{name}" href="text/{name}.xhtml" '
+        'media-type="application/xhtml+xml"/>'
+        for name in (manifest_order or [name for name, _ in chapters])
+    )
+    spine = "\n".join(f'    <itemref idref="{name}"/>' for name, _ in chapters)
+
+    headings = []
+    pages = []
+    for name, body in chapters:
+        for m in re.finditer(r'<h([1-3]) id="([^"]+)">(.*?)</h[1-3]>', body):
+            title = re.sub(r"<[^>]+>", "", m[3])
+            headings.append((int(m[1]), title, f"text/{name}.xhtml#{m[2]}"))
+        for m in re.finditer(r'id="p([^"]+)"', body):
+            pages.append((m[1], f"text/{name}.xhtml#p{m[1]}"))
+
+    nav_toc = nav_pages = ncx_toc = ncx_pages = ""
+    if nav == "nav":
+        nav_toc = _nav_toc(
+            headings, ('<li><a href="{href}">{title}</a>', "</li>"), ("<ol>", "</ol>")
+        )
+        nav_pages = "\n".join(
+            f'<li><a href="{href}">{label}</a></li>' for label, href in pages
+        )
+    elif nav == "ncx":
+        ncx_toc = _nav_toc(
+            headings,
+            (
+                "<navPoint><navLabel><text>{title}</text></navLabel>"
+                '<content src="{href}"/>',
+                "</navPoint>",
+            ),
+            ("", ""),
+        )
+        ncx_pages = "\n".join(
+            f'<pageTarget type="normal"><navLabel><text>{label}</text></navLabel>'
+            f'<content src="{href}"/></pageTarget>'
+            for label, href in pages
+        )
+
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("mimetype", "application/epub+zip", zipfile.ZIP_STORED)
+        zf.writestr("META-INF/container.xml", CONTAINER)
+        zf.writestr("OEBPS/content.opf", OPF.format(manifest=manifest, spine=spine))
+        zf.writestr(
+            "OEBPS/nav.xhtml",
+            XHTML.format(title="Nav", body=NAV.format(toc=nav_toc, pages=nav_pages)),
+        )
+        zf.writestr("OEBPS/toc.ncx", NCX.format(toc=ncx_toc, pages=ncx_pages))
+        zf.writestr("OEBPS/images/cover.png", b"\x89PNG\r\n\x1a\n")
+        for name, body in chapters:
+            zf.writestr(f"OEBPS/text/{name}.xhtml", XHTML.format(title=name, body=body))
+    return path
@@ -0,0 +1,190 @@
+"""Builder for a fake Zotero data directory."""
+
+import json
+import sqlite3
+
+# A subset of the Zotero schema, enough for the queries in orgutils.zotero.db.
+SCHEMA = """
+CREATE TABLE items (
+    itemID INTEGER PRIMARY KEY,
+    itemTypeID INT NOT NULL,
+    dateAdded TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    dateModified TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    key TEXT NOT NULL,
+    version INT NOT NULL DEFAULT 0
+);
+CREATE TABLE itemAttachments (
+    itemID INTEGER PRIMARY KEY,
+    parentItemID INT,
+    contentType TEXT,
+    path TEXT
+);
+CREATE TABLE itemAnnotations (
+    itemID INTEGER PRIMARY KEY,
+    parentItemID INT NOT NULL,
+    type INTEGER NOT NULL,
+    text TEXT,
+    comment TEXT,
+    pageLabel TEXT,
+    sortIndex TEXT NOT NULL,
+    position TEXT NOT NULL
+);
+CREATE INDEX itemAnnotations_parentItemID ON itemAnnotations(parentItemID);
+CREATE TABLE fieldsCombined (fieldID INT NOT NULL, fieldName TEXT NOT NULL);
+CREATE TABLE itemData (itemID INT, fieldID INT, valueID INT);
+CREATE TABLE itemDataValues (valueID INTEGER PRIMARY KEY, value UNIQUE);
+CREATE TABLE creators (
+    creatorID INTEGER PRIMARY KEY, firstName TEXT, lastName TEXT
+);
+CREATE TABLE itemCreators (
+    itemID INT NOT NULL, creatorID INT NOT NULL, orderIndex INT NOT NULL DEFAULT 0
+);
+CREATE TABLE collections (
+    collectionID INTEGER PRIMARY KEY, collectionName TEXT NOT NULL, key TEXT
+);
+CREATE TABLE collectionItems (
+    collectionID INT NOT NULL, itemID INT NOT NULL, orderIndex INT NOT NULL DEFAULT 0
+);
+INSERT INTO fieldsCombined VALUES (1, 'title');
+"""
+
+
+def make_pdf(outline, n_pages=3):
+    """Make PDF bytes with an outline of (title, page index, y, children) entries."""
+    objs = {}
+    page_ids = list(range(3, 3 + n_pages))
+    objs[2] = "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{i} 0 R" for i in page_ids),
+        n_pages,
+    )
+    for i in page_ids:
+        objs[i] = "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>"
+    next_id = [3 + n_pages]
+
+    def alloc():
+        next_id[0] += 1
+        return next_id[0] - 1
+
+    def build(entries, parent):
+        ids = [alloc() for _ in entries]
+        for k, (title, page, y, children) in enumerate(entries):
+            d = {
+                "Title": f"({title})",
+                "Parent": f"{parent} 0 R",
+                "Dest": f"[{page_ids[page]} 0 R /XYZ 72 {y} 0]",
+            }
+            if k > 0:
+                d["Prev"] = f"{ids[k - 1]} 0 R"
+            if k < len(ids) - 1:
+                d["Next"] = f"{ids[k + 1]} 0 R"
+            if children:
+                child_ids = build(children, ids[k])
+                d["First"] = f"{child_ids[0]} 0 R"
+                d["Last"] = f"{child_ids[-1]} 0 R"
+                d["Count"] = str(len(child_ids))
+            objs[ids[k]] = "<< " + " ".join(f"/{a} {b}" for a, b in d.items()) + " >>"
+        return ids
+
+    root = alloc()
+    top = build(outline, root)
+    objs[root] = f"<< /Type /Outlines /First {top[0]} 0 R /Last {top[-1]} 0 R >>"
+    objs[1] = f"<< /Type /Catalog /Pages 2 0 R /Outlines {root} 0 R >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = {}
+    for i in sorted(objs):
+        offsets[i] = len(out)
+        out += f"{i} 0 obj\n{objs[i]}\nendobj\n".encode()
+    xref = len(out)
+    size = max(objs) + 1
+    out += f"xref\n0 {size}\n0000000000 65535 f \n".encode()
+    for i in range(1, size):
+        out += f"{offsets[i]:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {size} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    )
+    return out
+
+
+class ZoteroLibrary:
+    """Builder for a fake Zotero data directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path / "zotero.sqlite")
+        self.conn.executescript(SCHEMA)
+        self._next_id = 1
+
+    def _new_item(self, key=None, item_type=1):
+        item_id = self._next_id
+        self._next_id += 1
+        self.conn.execute(
+            "INSERT INTO items (itemID, itemTypeID, key) VALUES (?, ?, ?)",
+            (item_id, item_type, key or f"KEY{item_id:05d}"),
+        )
+        return item_id
+
+    def add_doc(self, title, creators=(), filename="doc.pdf", collection=None):
+        """Add a regular item with a PDF attachment; return the attachment ID."""
+        parent_id = self._new_item()
+        cur = self.conn.execute(
+            "INSERT INTO itemDataValues (value) VALUES (?)", (title,)
+        )
+        self.conn.execute(
+            "INSERT INTO itemData VALUES (?, 1, ?)", (parent_id, cur.lastrowid)
+        )
+        for i, (first, last) in enumerate(creators):
+            cur = self.conn.execute(
+                "INSERT INTO creators (firstName, lastName) VALUES (?, ?)",
+                (first, last),
+            )
+            self.conn.execute(
+                "INSERT INTO itemCreators VALUES (?, ?, ?)",
+                (parent_id, cur.lastrowid, i),
+            )
+        if collection:
+            row = self.conn.execute(
+                "SELECT collectionID FROM collections WHERE collectionName = ?",
+                (collection,),
+            ).fetchone()
+            if row:
+                collection_id = row[0]
+            else:
+                collection_id = self.conn.execute(
+                    "INSERT INTO collections (collectionName) VALUES (?)",
+                    (collection,),
+                ).lastrowid
+            self.conn.execute(
+                "INSERT INTO collectionItems VALUES (?, ?, 0)",
+                (collection_id, parent_id),
+            )
+
+        attach_id = self._new_item(item_type=2)
+        self.conn.execute(
+            "INSERT INTO itemAttachments VALUES (?, ?, 'application/pdf', ?)",
+            (attach_id, parent_id, f"storage:{filename}"),
+        )
+        return attach_id
+
+    def add_annotation(self, attach_id, page, text=None, comment=None, y=700.0):
+        item_id = self._new_item(item_type=3)
+        position = {"pageIndex": page - 1, "rects": [[72.0, y - 10, 300.0, y]]}
+        self.conn.execute(
+            "INSERT INTO itemAnnotations VALUES (?, ?, 1, ?, ?, ?, '', ?)",
+            (item_id, attach_id, text, comment, str(page), json.dumps(position)),
+        )
+        return item_id
+
+    def add_pdf(self, attach_id, filename, outline):
+        path = self.path / "storage" / self.storage_key(attach_id) / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(make_pdf(outline))
+        return path
+
+    def storage_key(self, attach_id):
+        return self.conn.execute(
+            "SELECT key FROM items WHERE itemID = ?", (attach_id,)
+        ).fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
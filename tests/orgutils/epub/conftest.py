@@ -0,0 +1,15 @@
+import pytest
+
+from tests.helpers.epub import make_epub
+
+
+@pytest.fixture
+def cache_home(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
+
+
+@pytest.fixture
+def epub_path(tmp_path):
+    return make_epub(tmp_path / "book.epub")
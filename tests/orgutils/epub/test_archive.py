@@ -0,0 +1,28 @@
+from orgutils.epub.archive import EpubArchive
+from tests.helpers.epub import make_epub
+
+
+class TestEpubArchive:
+    def test_spine(self, tmp_path):
+        path = make_epub(tmp_path / "book.epub", manifest_order=("ch2", "ch1"))
+        with EpubArchive(str(path)) as archive:
+            assert archive.package_path == "OEBPS/content.opf"
+            assert archive.manifest["cover"].name == "OEBPS/images/cover.png"
+            assert archive.manifest["nav"].properties == "nav"
+            assert archive.spine_documents() == [
+                "OEBPS/text/ch1.xhtml",
+                "OEBPS/text/ch2.xhtml",
+            ]
+
+    def test_reads_only_requested_entries(self, epub_path, mocker):
+        with EpubArchive(str(epub_path)) as archive:
+            spy = mocker.spy(archive.zip, "read")
+            archive.read("OEBPS/text/ch1.xhtml")
+        assert [call.args[0] for call in spy.call_args_list] == ["OEBPS/text/ch1.xhtml"]
+
+    def test_resolve(self):
+        assert EpubArchive.resolve("content.opf", "a%20b.xhtml#x") == "a b.xhtml"
+        assert (
+            EpubArchive.resolve("OEBPS/nav/nav.xhtml", "../text/ch1.xhtml#p1")
+            == "OEBPS/text/ch1.xhtml"
+        )
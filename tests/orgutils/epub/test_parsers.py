@@ -0,0 +1,152 @@
+import zipfile
+
+import pytest
+
+from orgutils.epub import parsers
+from tests.helpers.epub import make_epub
+
+EXPECTED = {
+    "i": [("h1", "Preface")],
+    "1": [("h1", "Part One")],
+    "2": [("h2", "Chapter 1"), ("h3", "Section 1.1"), ("h2", "Chapter 2")],
+    "3": [("h3", "Section 2.1"), ("h3", "")],
+    "10": [],
+}
+
+# The heading "Chapter 1" starts before the pagebreak nested in it:
+EXPECTED_NAV = {
+    "i": [("h1", "Preface")],
+    "1": [("h1", "Part One"), ("h2", "Chapter 1")],
+    "2": [("h3", "Section 1.1"), ("h2", "Chapter 2")],
+    "3": [("h3", "Section 2.1"), ("h3", "")],
+    "10": [],
+}
+
+
+class TestParseEbookStructure:
+    @pytest.mark.parametrize("jobs", (1, 2))
+    def test_structure(self, epub_path, jobs):
+        structure = parsers.parse_ebook_structure(
+            str(epub_path), jobs=jobs, use_nav=False
+        )
+        assert dict(structure) == EXPECTED
+        assert list(structure) == list(EXPECTED)
+
+    def test_serial_in_worker_process(self, epub_path, mocker):
+        mocker.patch.object(parsers.multiprocessing, "parent_process")
+        mocker.patch.object(parsers.os, "cpu_count", return_value=4)
+        pool = mocker.patch.object(parsers, "ProcessPoolExecutor")
+        structure = parsers.parse_ebook_structure(str(epub_path), use_nav=False)
+        assert dict(structure) == EXPECTED
+        pool.assert_not_called()
+
+    def test_spine_order(self, tmp_path):
+        path = make_epub(tmp_path / "book.epub", manifest_order=("ch2", "ch1"))
+        structure = parsers.parse_ebook_structure(str(path), use_nav=False)
+        assert list(structure) == list(EXPECTED)
+
+    def test_heading_with_pagebreaks(self, tmp_path):
+        path = make_epub(
+            tmp_path / "book.epub",
+            (
+                (
+                    "ch1",
+                    '<span id="p1" epub:type="pagebreak"/><h1 id="c1">A'
+                    '<span id="p2" epub:type="pagebreak"/>B'
+                    '<span id="p3" epub:type="pagebreak"/></h1><h2 id="c2">C</h2>',
+                ),
+            ),
+        )
+        structure = parsers.parse_ebook_structure(str(path), use_nav=False)
+        assert dict(structure) == {"1": [], "2": [("h1", "AB")], "3": [("h2", "C")]}
+
+    @pytest.mark.parametrize("use_nav", (True, False))
+    def test_heading_before_first_page(self, tmp_path, use_nav):
+        path = make_epub(
+            tmp_path / "book.epub",
+            (("ch1", '<h1 id="c1">Title</h1>\n<span id="p1" epub:type="pagebreak"/>'),),
+        )
+        structure = parsers.parse_ebook_structure(str(path), use_nav=use_nav)
+        assert dict(structure) == {None: [("h1", "Title")], "1": []}
+
+
+class TestNavigation:
+    @pytest.mark.parametrize("nav", ("nav", "ncx"))
+    def test_structure(self, tmp_path, mocker, nav):
+        path = make_epub(tmp_path / "book.epub", nav=nav)
+        spy = mocker.spy(parsers, "_scan_document")
+        structure = parsers.parse_ebook_structure(str(path))
+        assert dict(structure) == EXPECTED_NAV
+        assert list(structure) == list(EXPECTED_NAV)
+        assert spy.call_count == 0
+
+    def test_ncx_entries_without_src(self, tmp_path):
+        path = make_epub(tmp_path / "book.epub", nav="ncx")
+        with zipfile.ZipFile(path) as zf:
+            entries = {name: zf.read(name) for name in zf.namelist()}
+        empty = "<navLabel><text>X</text></navLabel><content/>"
+        entries["OEBPS/toc.ncx"] = (
+            entries["OEBPS/toc.ncx"]
+            .decode()
+            .replace("<navMap>", f"<navMap><navPoint>{ empty }</navPoint>")
+            .replace("<pageList>", f"<pageList><pageTarget>{ empty }</pageTarget>")
+            .encode()
+        )
+        with zipfile.ZipFile(path, "w") as zf:
+            for name, data in entries.items():
+                zf.writestr(name, data)
+
+        assert dict(parsers.parse_ebook_structure(str(path))) == EXPECTED_NAV
+
+    def test_fallback_without_navigation(self, tmp_path):
+        path = make_epub(tmp_path / "book.epub", nav=None)
+        assert parsers.parse_ebook_structure(str(path)) == EXPECTED
+
+    def test_reads_only_documents_with_headings_and_pages(self, tmp_path, mocker):
+        chapters = (
+            ("ch1", '<h1 id="c1">One</h1>'),
+            ("ch2", '<span id="p1" epub:type="pagebreak"/><h1 id="c2">Two</h1>'),
+            ("ch3", '<span id="p2" epub:type="pagebreak"/>'),
+        )
+        path = make_epub(tmp_path / "book.epub", chapters)
+        spy = mocker.spy(parsers.EpubArchive, "read")
+        structure = parsers.parse_ebook_structure(str(path))
+        assert dict(structure) == {None: [("h1", "One")], "1": [("h1", "Two")], "2": []}
+        read = [call.args[1] for call in spy.call_args_list]
+        assert read == ["OEBPS/nav.xhtml", "OEBPS/text/ch2.xhtml"]
+
+
+class TestGetEbookStructure:
+    def test_cached(self, epub_path, cache_home, mocker):
+        spy = mocker.spy(parsers, "parse_ebook_structure")
+        assert parsers.get_ebook_structure(str(epub_path)) == EXPECTED_NAV
+        structure = parsers.get_ebook_structure(str(epub_path))
+        assert structure == EXPECTED_NAV
+        assert list(structure) == list(EXPECTED_NAV)
+        assert spy.call_count == 1
+
+        # Cached separately for each mode:
+        assert parsers.get_ebook_structure(str(epub_path), use_nav=False) == EXPECTED
+        assert spy.call_count == 2
+
+        # Keyed by content, not by path:
+        copy = epub_path.with_name("copy.epub")
+        copy.write_bytes(epub_path.read_bytes())
+        parsers.get_ebook_structure(str(copy))
+        assert spy.call_count == 2
+
+        parsers.get_ebook_structure(str(epub_path), use_cache=False)
+        assert spy.call_count == 3
+
+    def test_none_page(self, tmp_path, cache_home):
+        path = make_epub(tmp_path / "book.epub", (("ch1", '<h1 id="c1">Title</h1>'),))
+        parsers.get_ebook_structure(str(path))
+        assert parsers.get_ebook_structure(str(path)) == {None: [("h1", "Title")]}
+
+
+def test_id_offsets():
+    content = b'<p data-id="a"/><p xml:id="b"/>\n<h1 id="b"/><span\tid=\'a\'/>'
+    assert parsers._id_offsets(content, ["b", "a"]) == {
+        "b": content.index(b' id="b"') + 1,
+        "a": content.index(b"\tid='a'") + 1,
+    }
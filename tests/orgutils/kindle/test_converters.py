@@ -0,0 +1,251 @@
+import json
+import shutil
+from importlib import resources as module_resources
+
+import pytest
+from lxml import etree
+
+from orgutils import utils
+from orgutils.kindle import converters
+from tests.helpers.epub import make_epub
+
+from . import data
+
+
+def _data_path(name):
+    return module_resources.files(data) / name
+
+
+class TestExportToOrg:
+    def test(self, capsys):
+        converters.export_to_org(str(_data_path("bookcision.json")), "en")
+
+        expected = _data_path("bookcision.org").read_text()
+        assert capsys.readouterr().out == expected
+
+    @pytest.fixture
+    def make_dump(self, tmp_path):
+        def _make_dump(*notes):
+            highlights = [
+                {"text": text, "location": {"value": loc}, "note": note}
+                for loc, text, note in notes
+            ]
+            path = tmp_path / "dump.json"
+            path.write_text(
+                json.dumps(
+                    {
+                        "title": "T",
+                        "authors": "A",
+                        "asin": "X",
+                        "highlights": highlights,
+                    }
+                )
+            )
+            return str(path)
+
+        return _make_dump
+
+    def test_heading_without_text_at_ends(self, make_dump, capsys):
+        dump = make_dump(
+            (10, "", "h1"),
+            (11, "Chapter One", None),
+            (50, "Long highlight text", None),
+            (90, "Final Words", None),
+            (92, "", "h2"),
+        )
+        converters.export_to_org(dump, "en")
+        org = capsys.readouterr().out
+        assert "\n** Chapter One\n" in org
+        assert "\n*** --MISSING--\n" in org
+
+        converters.export_to_org(dump, "en", heading_window=2)
+        assert "\n*** Final Words\n" in capsys.readouterr().out
+
+    def test_heading_prefers_shorter_text(self, make_dump, capsys):
+        dump = make_dump(
+            (19, "A rather long highlight", None),
+            (20, "", "h1"),
+            (21, "Short", None),
+        )
+        converters.export_to_org(dump, "en")
+        assert "\n** Short\n" in capsys.readouterr().out
+
+    def test_vocab_note_with_text(self, make_dump, capsys):
+        dump = make_dump((5, "the highlighted sentence", "vocab serendipity"))
+        converters.export_to_org(dump, "en")
+        assert "\n** serendipity\n" in capsys.readouterr().out
+
+    def test_ja(self, make_dump, capsys):
+        dump = make_dump(
+            (1, "", "h1 第 一章"),
+            (2, "日本 語の 文章", "語彙 単 語"),
+            (3, "ＰＤＦ の 文章", "メモ の まま"),
+        )
+        converters.export_to_org(dump, "ja", nfkc=True)
+        org = capsys.readouterr().out
+        assert "\n** 第一章\n" in org
+        assert "\n** 単語\n" in org
+        assert "\nPDF の文章 (loc. 3)\n" in org
+        # Notes to quotes are kept as written:
+        assert "\nメモ の まま\n" in org
+
+
+class TestConvertHtmlToOrg:
+    def test(self, capsys):
+        converters.convert_html_to_org(str(_data_path("notebook.html")), "en")
+
+        expected = _data_path("notebook.org").read_text()
+        assert capsys.readouterr().out == expected
+
+    def test_unclosed_note_text(self, capsys):
+        path = _data_path("notebook-unclosed.html")
+        converters.convert_html_to_org(str(path), "en")
+
+        org = capsys.readouterr().out
+        assert "\nFirst highlight (Page 12 · Location 100)\n" in org
+        assert "\n*** Second bold highlight\n" in org
+        assert "\n** The Second Chapter\n" in org
+        assert "just a comment" not in org
+
+    def test_merge_with_epub_headings(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+        epub = make_epub(tmp_path / "book.epub")
+        highlights = [
+            ("Page 5 · Location 50", "On five"),
+            ("Page 2 · Location 21", "On two, later"),
+            ("Location 1", "Before any page"),
+            ("Page 2 · Location 20", "On two"),
+            ("Page ii · Location 5", "In the preface"),
+        ]
+        dump = tmp_path / "notebook.html"
+        dump.write_text(
+            '<html><body><div class="bookTitle">T</div>'
+            + "".join(
+                f'<div class="noteHeading">Highlight(yellow) - {loc}</div>'
+                f'<div class="noteText">{text}</div>'
+                for loc, text in highlights
+            )
+            + "</body></html>"
+        )
+        converters.convert_html_to_org(str(dump), "en", epub=str(epub))
+
+        lines = [
+            line
+            for line in capsys.readouterr().out.splitlines()
+            if line.startswith("*") or line.endswith(")")
+        ]
+        assert lines == [
+            "* T",
+            "Before any page (Location 1)",
+            "** Preface",
+            "In the preface (Page ii · Location 5)",
+            "** Part One",
+            "*** Chapter 1",
+            "**** Section 1.1",
+            "*** Chapter 2",
+            "On two (Page 2 · Location 20)",
+            "On two, later (Page 2 · Location 21)",
+            "**** Section 2.1",
+            "**** ",
+            "On five (Page 5 · Location 50)",
+        ]
+
+
+class TestPageIndex:
+    def test_sort_keys(self):
+        pages = ["10", "ix", None, "2", "A-1", "iv", "xiv", "C", "L"]
+        assert sorted(pages, key=utils.page_sort_key) == [
+            None,
+            "iv",
+            "ix",
+            "xiv",
+            "2",
+            "10",
+            "A-1",
+            "C",
+            "L",
+        ]
+
+    def test_key(self):
+        index = converters._PageIndex(["i", "1", "2", "10"])
+        pages = ["11", "2", "ii", "1", "10", "5", "i", None]
+        assert sorted(pages, key=index.key) == [
+            None,
+            "i",
+            "ii",
+            "1",
+            "2",
+            "5",
+            "10",
+            "11",
+        ]
+
+
+class TestIterNotebookDivs:
+    def test_small_chunks(self):
+        with _data_path("notebook-unclosed.html").open() as f:
+            divs = list(converters._iter_notebook_divs(f, chunk_size=7))
+
+        assert divs[:4] == [
+            ("bookTitle", "The Great Book"),
+            ("authors", "Doe, Jane"),
+            ("citation", "Doe, J. (2020). The Great Book."),
+            ("sectionHeading", "Chapter 1"),
+        ]
+        assert divs[4] == (
+            "noteHeading",
+            "Highlight(yellow) - Page 12 · Location 100",
+        )
+        assert divs[-1] == ("noteText", "Back on twelve")
+
+    def test_unclosed_divs_are_not_buffered(self):
+        target = converters._NotebookTarget()
+        parser = etree.HTMLParser(target=target)
+        html = _data_path("notebook-unclosed.html").read_text()
+
+        emitted = 0
+        for i in range(0, len(html), 50):
+            parser.feed(html[i : i + 50])
+            # A div comes out as soon as the next starts:
+            assert len(target.divs) <= 2
+            emitted += len(target.divs)
+            target.divs.clear()
+        parser.close()
+
+        assert emitted == 21
+        assert not target.divs
+
+
+class TestBatchConvert:
+    def test(self, tmp_path):
+        exports = tmp_path / "exports"
+        exports.mkdir()
+        for name in ("bookcision.json", "notebook.html"):
+            shutil.copy(_data_path(name), exports / name)
+        shutil.copy(_data_path("notebook.html"), exports / "bookcision.html")
+        (exports / "broken.json").write_text("{")
+
+        failures = converters.batch_convert([str(exports)], tmp_path / "out", "en")
+
+        assert [path.name for path, _ in failures] == ["broken.json"]
+        assert isinstance(failures[0][1], ValueError)
+        outputs = sorted(p.name for p in (tmp_path / "out").iterdir())
+        assert outputs == ["bookcision-html.org", "bookcision-json.org", "notebook.org"]
+        assert (tmp_path / "out" / "notebook.org").read_text() == (
+            _data_path("notebook.org").read_text()
+        )
+        assert (tmp_path / "out" / "bookcision-json.org").read_text() == (
+            _data_path("bookcision.org").read_text()
+        )
+
+    def test_same_name_in_different_directories(self, tmp_path):
+        for d in ("a", "b"):
+            (tmp_path / d).mkdir()
+            shutil.copy(_data_path("bookcision.json"), tmp_path / d / "book.json")
+        shutil.copy(_data_path("notebook.html"), tmp_path / "b" / "book.html")
+
+        paths = [str(tmp_path / "a"), str(tmp_path / "b")]
+        assert not converters.batch_convert(paths, tmp_path / "out", "en")
+
+        outputs = sorted(p.name for p in (tmp_path / "out").iterdir())
+        assert outputs == ["book-html.org", "book-json-0.org", "book-json-2.org"]
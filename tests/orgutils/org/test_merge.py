@@ -0,0 +1,116 @@
+from orgutils.org import merge
+
+KINDLE = """\
+* Book
+:PROPERTIES:
+:AUTHOR: Author
+:END:
+
+** Chapter 1
+:PROPERTIES:
+:KINDLE_LOC: 10
+:END:
+
+#+BEGIN_QUOTE
+First (Page 1 · Location 12)
+#+END_QUOTE
+
+#+BEGIN_QUOTE
+Third (Page 3 · Location 30)
+#+END_QUOTE
+
+** Chapter 2
+:PROPERTIES:
+:KINDLE_LOC: 40
+:END:
+
+#+BEGIN_QUOTE
+Fourth (Page 5 · Location 45)
+#+END_QUOTE
+"""
+
+
+def test_idempotent():
+    assert merge.merge(KINDLE, KINDLE) == (KINDLE, 0)
+
+
+def test_insert_in_order():
+    existing = KINDLE.replace(
+        "#+BEGIN_QUOTE\nThird (Page 3 · Location 30)\n#+END_QUOTE\n\n", ""
+    )
+    existing = existing.replace(
+        "First (Page 1 · Location 12)\n#+END_QUOTE\n",
+        "First (Page 1 · Location 12)\n#+END_QUOTE\nMy note\n",
+    )
+
+    merged, count = merge.merge(existing, KINDLE)
+    assert count == 1
+    assert merged == KINDLE.replace(
+        "#+END_QUOTE\n\n#+BEGIN_QUOTE\nThird",
+        "#+END_QUOTE\nMy note\n\n#+BEGIN_QUOTE\nThird",
+    )
+
+
+def test_insert_heading():
+    start = KINDLE.index("** Chapter 2")
+    existing = KINDLE[:start] + KINDLE[KINDLE.index("#+BEGIN_QUOTE\nFourth") :]
+
+    merged, count = merge.merge(existing, KINDLE)
+    assert count == 1
+    assert merged == KINDLE
+
+
+def test_append_section():
+    other = "* Other\n\nNote (p. 2)\n"
+    merged, count = merge.merge(KINDLE, other)
+    assert count == 1
+    assert merged == KINDLE + "\n" + other
+
+
+def test_page_keys():
+    existing = "* Doc\n\nA (p. 1)\n\nC (p. 10)\n"
+    new = "* Doc\n\nA (p. 1)\n\nB (p. 2)\n\nC (p. 10)\n"
+    assert merge.merge(existing, new) == (new, 1)
+
+
+def test_page_headings_with_locations():
+    # Headings from an EPUB have a page only, highlights a page and a location:
+    new = """\
+* Book
+
+** One
+:PROPERTIES:
+:PAGE: 1
+:END:
+
+#+BEGIN_QUOTE
+First (Page 1 · Location 12)
+#+END_QUOTE
+
+** Two
+:PROPERTIES:
+:PAGE: 3
+:END:
+
+#+BEGIN_QUOTE
+Third (Page 3 · Location 30)
+#+END_QUOTE
+
+#+BEGIN_QUOTE
+Later (Location 31)
+#+END_QUOTE
+"""
+    start = new.index("** Two")
+    existing = new[:start] + new[new.index("#+BEGIN_QUOTE\nThird") :]
+    assert merge.merge(existing, new) == (new, 1)
+
+    start = new.index("#+BEGIN_QUOTE\nLater")
+    assert merge.merge(new[:start].rstrip() + "\n", new) == (new, 1)
+
+
+def test_merge_file(tmp_path):
+    path = tmp_path / "book.org"
+    assert merge.merge_file(path, KINDLE) == 5
+    path.write_text(KINDLE + "\nHand-written\n")
+    assert merge.merge_file(path, KINDLE) == 0
+    assert path.read_text() == KINDLE + "\nHand-written\n"
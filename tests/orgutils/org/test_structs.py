@@ -0,0 +1,66 @@
+import io
+
+import pytest
+
+from orgutils.org import structs
+
+CASES = (
+    [],
+    [structs.Heading("Title", 1, {"author": "A"})],
+    [structs.QuoteBlock("Quote")],
+    [
+        structs.Heading("Title", 1, {}),
+        structs.QuoteBlock("Quote 1"),
+        structs.Paragraph("Note"),
+        structs.Heading("Section", 2),
+        structs.Group([structs.Heading("Sub", 3), structs.Paragraph("Text")]),
+        structs.QuoteBlock("Quote 2"),
+    ],
+)
+
+
+@pytest.mark.parametrize("objs", CASES)
+def test_dump_matches_dumps(objs):
+    expected = io.StringIO()
+    print(structs.dumps(objs), file=expected)
+
+    fp = io.StringIO()
+    structs.dump(iter(objs), fp)
+    assert fp.getvalue() == expected.getvalue()
+
+
+def test_padding():
+    objs = [
+        structs.Heading("Title", 1, {"author": "A"}),
+        structs.QuoteBlock("Quote"),
+        structs.Paragraph("Note"),
+        structs.Heading("Section", 2),
+    ]
+    assert list(structs.iter_lines(objs)) == [
+        "* Title",
+        ":PROPERTIES:",
+        ":AUTHOR: A",
+        ":END:",
+        "",
+        "#+BEGIN_QUOTE",
+        "Quote",
+        "#+END_QUOTE",
+        "",
+        "Note",
+        "",
+        "** Section",
+    ]
+
+
+def test_nodes_are_compact():
+    a = structs.Heading("A", 1, {})
+    b = structs.Heading("B", 2)
+    assert a.properties is b.properties is structs.EMPTY_PROPERTIES
+    assert not hasattr(a, "__dict__")
+    with pytest.raises(AttributeError):
+        a.title = "C"
+
+    props = {"".join(["kindle", "_loc"]): 1}
+    c = structs.Heading("C", 1, props)
+    assert c.properties == props
+    assert next(iter(c.properties)) is "kindle_loc"  # noqa: F632
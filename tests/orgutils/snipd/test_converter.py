@@ -1,5 +1,7 @@
+import io
 from importlib import resources as module_resources
 
+import panflute
 import pytest
 
 from orgutils.snipd import converter
@@ -32,3 +34,98 @@ class TestToHtml:
         org = converter.convert(snipd_dump, "org")
 
         assert "* John Doe - A Podcast Episode 2024-08" in org
+
+    def test_runs_pandoc_twice(self, snipd_dump_2410, mocker):
+        converter.convert(snipd_dump_2410, "org", fast=False)
+        run = mocker.spy(converter.subprocess, "run")
+        converter.convert(snipd_dump_2410, "org", fast=False)
+        assert run.call_count == 2
+
+    def test_html(self, snipd_dump_2410):
+        html = converter.convert(snipd_dump_2410, "html")
+        assert "<h2>Show notes</h2>" not in html
+        assert "<p>Show notes</p>" in html
+        assert "Click to expand" not in html
+        assert "<h4>Transcript</h4>" in html
+
+
+class TestFusedFilter:
+    @pytest.mark.parametrize("name", ("dump-2024-08.md", "dump-2024-10.md"))
+    def test_same_as_separate_filters(self, name):
+        md = (module_resources.files(data) / name).read_text()
+        outputs = []
+        for run in (
+            lambda doc: panflute.run_filters(converter.FILTERS, doc=doc),
+            lambda doc: panflute.run_filter(converter.snipd_filter, doc=doc),
+        ):
+            buf = io.StringIO()
+            panflute.dump(run(converter._md_to_ast(md)), buf)
+            outputs.append(buf.getvalue())
+        assert outputs[0] == outputs[1]
+
+
+class TestConvertAll:
+    @pytest.fixture
+    def export(self, snipd_dump_2408, snipd_dump_2410):
+        return "\n".join((snipd_dump_2408, snipd_dump_2410, snipd_dump_2410))
+
+    def test_output_filenames(self):
+        parts = ["# A/B: c?", "# Title", "# title", "# ...", "# D"]
+        assert converter._output_filenames(parts, ".org") == [
+            "A_B_ c_.org",
+            "Title-1.org",
+            "title-2.org",
+            "part.org",
+            "D.org",
+        ]
+
+    @pytest.mark.parametrize("jobs", (1, 2))
+    def test(self, export, snipd_dump_2408, tmp_path, jobs):
+        out = tmp_path / "out"
+        failures = converter.convert_all(export, out, jobs=jobs)
+
+        assert failures == []
+        assert sorted(p.name for p in out.iterdir()) == [
+            "John Doe - A Podcast Episode 2024-08.org",
+            "John Doe - A Podcast Episode 2024-10-1.org",
+            "John Doe - A Podcast Episode 2024-10-2.org",
+        ]
+        org = (out / "John Doe - A Podcast Episode 2024-08.org").read_text()
+        assert org == converter.convert(snipd_dump_2408, "org")
+
+    def test_failures(self, export, tmp_path, mocker):
+        convert = converter.convert
+
+        def fail_2024_10(md, output_format):
+            if "2024-10" in converter.part_title(md):
+                raise ValueError("broken")
+            return convert(md, output_format)
+
+        mocker.patch.object(converter, "convert", fail_2024_10)
+        out = tmp_path / "out"
+        failures = converter.convert_all(export, out, "html", jobs=1)
+
+        assert [(title, str(e)) for title, e in failures] == [
+            ("John Doe - A Podcast Episode 2024-10", "broken"),
+            ("John Doe - A Podcast Episode 2024-10", "broken"),
+        ]
+        assert [p.name for p in out.iterdir()] == [
+            "John Doe - A Podcast Episode 2024-08.html"
+        ]
+
+    def test_cached(self, export, tmp_path, mocker, capsys):
+        out = tmp_path / "out"
+        convert = mocker.spy(converter, "convert")
+        converter.convert_all(export, out, jobs=1)
+        assert convert.call_count == 3
+        assert "Cache: 0 hits, 3 misses" in capsys.readouterr().err
+
+        edited = export.replace("snip summary 1.", "snip summary one.")
+        converter.convert_all(edited, out, jobs=1)
+        assert convert.call_count == 4
+        assert "Cache: 2 hits, 1 misses" in capsys.readouterr().err
+        org = (out / "John Doe - A Podcast Episode 2024-08.org").read_text()
+        assert "snip summary one." in org
+
+        converter.convert_all(export, out, "html", jobs=1, use_cache=False)
+        assert convert.call_count == 7
@@ -0,0 +1,96 @@
+from importlib import resources as module_resources
+
+import pytest
+
+from orgutils.snipd import converter, fastpath
+
+from . import data
+
+EPISODE = """\
+# John Doe - An Episode
+
+## Snip
+
+### [03:03] {emoji} {title}
+
+[🎧 Play snip - 1min (02:25 - 03:06)](https://share.snipd.com/snip/abcd-1000)
+
+- {text}
+
+#### 📚 Transcript
+<details>
+<summary>Click to expand</summary>
+<blockquote><b>John Doe</b><br/><br/>{text}</blockquote>
+</details>
+
+---
+
+Created with [Snipd](https://www.snipd.com) | {footer} Take Notes from Podcasts
+"""
+
+
+def test_validated_pandoc_version(mocker):
+    md = (module_resources.files(data) / "dump-2024-10.md").read_text()
+    to_org = mocker.spy(fastpath, "to_org")
+    version = mocker.patch.object(converter, "pandoc_version")
+    version.return_value = (*fastpath.PANDOC_VERSION, 1)
+    converter.convert(md, "org")
+    assert to_org.call_count == 1
+
+    major, minor = fastpath.PANDOC_VERSION
+    version.return_value = (major, minor + 1)
+    converter.convert(md, "org")
+    assert to_org.call_count == 1
+
+
+def test_conversion_key_has_fastpath_version(monkeypatch):
+    key = converter.conversion_key("# Title\n", "org")
+    monkeypatch.setattr(fastpath, "VERSION", fastpath.VERSION + 1)
+    assert converter.conversion_key("# Title\n", "org") != key
+
+
+@pytest.mark.parametrize("name", ("dump-2024-08.md", "dump-2024-10.md"))
+def test_same_as_pandoc(name):
+    md = (module_resources.files(data) / name).read_text()
+    assert fastpath.to_org(md) == converter.convert(md, "org", fast=False)
+
+
+@pytest.mark.parametrize(
+    "emoji, title, footer",
+    (
+        ("💡", "Insight", "Highlight &"),
+        # Soft breaks after the emoji, and in the footer:
+        ("📖", "A much longer snip title " * 2 + "x", "Highlight &"),
+        ("🧠", "A much longer snip title " * 2 + "xyz", "Highlight & a b c d e f"),
+        ("✨", "- a list marker", "1. Highlight &"),
+        ("🚀", " ".join(["Less - obvious 10)"] * 3), "Highlight & " * 3),
+    ),
+)
+def test_line_wrapping(emoji, title, footer):
+    md = EPISODE.format(emoji=emoji, title=title, text="Hey – man…", footer=footer)
+    assert fastpath.to_org(md) == converter.convert(md, "org", fast=False)
+
+
+@pytest.mark.parametrize(
+    "md",
+    (
+        "# Title\n\n| a | b |\n|---|---|\n| c | d |\n",
+        "# Title\n\nSome `code`.\n",
+        "# Title\n\n- a\n\n- b\n",
+        "# Title\n\n> quote\n",
+        "# Title\n\n3. c\n4. d\n",
+    ),
+)
+def test_unsupported(md, mocker):
+    with pytest.raises(fastpath.Unsupported):
+        fastpath.to_org(md)
+    run = mocker.spy(converter.subprocess, "run")
+    assert converter.convert(md, "org") == converter.convert(md, "org", fast=False)
+    assert run.call_count == 4
+
+
+def test_no_pandoc(mocker):
+    md = (module_resources.files(data) / "dump-2024-10.md").read_text()
+    run = mocker.spy(converter.subprocess, "run")
+    assert "* John Doe - A Podcast Episode 2024-10" in converter.convert(md, "org")
+    run.assert_not_called()
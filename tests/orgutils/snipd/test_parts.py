@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from orgutils.snipd import converter, parts
+
+EXPORTS = (
+    "# One\nText\n\n## Snip\n# Two\r\n\r\nMore\n# Three 💡\n",
+    "Preamble\n# A\n#B\n # C\n# \n# D",
+    "\n# A",
+    "",
+)
+
+
+@pytest.mark.parametrize("md", EXPORTS)
+def test_same_as_split_parts(md, tmp_path):
+    path = tmp_path / "export.md"
+    path.write_bytes(md.encode())
+    with open(path) as f:
+        expected = converter.split_parts(f.read())
+
+    index = parts.part_index(path)
+    assert index.titles == [converter.part_title(part) for part in expected]
+    assert [parts.read_part(path, index, n) for n in range(len(expected))] == expected
+    assert parts.read_part(path, index, -1) == expected[-1]
+    with pytest.raises(IndexError):
+        parts.read_part(path, index, len(expected))
+
+
+def test_saved(tmp_path, mocker):
+    path = tmp_path / "export.md"
+    path.write_text(EXPORTS[0])
+    index = parts.part_index(path)
+    assert parts.index_path(path).exists()
+
+    scan = mocker.spy(parts, "scan")
+    assert parts.part_index(path) == index
+    scan.assert_not_called()
+
+    path.write_text(EXPORTS[1])
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert parts.part_index(path).titles == ["Preamble", "A", "", "D"]
+    scan.assert_called_once()
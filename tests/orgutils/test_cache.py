@@ -0,0 +1,56 @@
+import os
+
+from orgutils.cache import DiskCache, file_digest, file_key
+
+
+def test_file_keys(tmp_path):
+    a = tmp_path / "a"
+    b = tmp_path / "b"
+    a.write_bytes(b"content")
+    b.write_bytes(b"content")
+    assert file_key(a) != file_key(b)
+    assert file_key(a) != file_key(a, 2)
+    assert file_digest(a) == file_digest(b)
+
+
+class TestDiskCache:
+    def test_get_put(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        cache = DiskCache("test", ".bin")
+        assert cache.get("key") is None
+        cache.put("key", b"value")
+        assert cache.get("key") == b"value"
+        assert (tmp_path / "orgutils" / "test" / "key.bin").exists()
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        cache = DiskCache("test", max_size=25)
+        for i, key in enumerate(("a", "b")):
+            cache.put(key, b"x" * 10)
+            os.utime(cache.path / key, ns=(i, i))
+        assert cache.get("a") == b"x" * 10
+
+        cache.put("c", b"x" * 10)
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_scans_only_when_estimated_full(self, tmp_path, monkeypatch, mocker):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        cache = DiskCache("test", max_size=25)
+        evict = mocker.spy(cache, "evict")
+        for key in ("a", "b"):
+            cache.put(key, b"x" * 10)
+        assert evict.call_count == 1
+
+        cache.put("c", b"x" * 10)
+        assert evict.call_count == 2
+        assert sorted(p.name for p in cache.path.iterdir()) == ["b", "c"]
+
+    def test_evict_skips_values_being_written(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        cache = DiskCache("test")
+        (cache.path / "other.tmp").write_bytes(b"x" * 10)
+        cache.evict(0)
+        assert (cache.path / "other.tmp").exists()
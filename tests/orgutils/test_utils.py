@@ -0,0 +1,52 @@
+import re
+
+import pytest
+
+from orgutils import utils
+
+
+@pytest.mark.parametrize(
+    "s",
+    [
+        "日本 語の　文章",
+        "漢字 PDF 漢字 2024 かな",
+        "全角\t 　空白 です",
+        "改行\nは 残る",
+        " 先頭と末尾 ",
+    ],
+)
+def test_remove_whitespaces_between_zenkaku(s):
+    expected = re.sub(r"(?<=[^\x01-\x7E])([^\S\n\r]+)(?=[^\x01-\x7E])", "", s)
+    assert utils.remove_whitespaces_between_zenkaku(s) == expected
+
+
+@pytest.mark.parametrize(
+    "s, kwargs, expected",
+    [
+        ("日本 語 text 漢字", {}, "日本語 text 漢字"),
+        ("ＡＢＣ　１２３ ｶﾀｶﾅ 漢字", {"nfkc": True}, "ABC 123 カタカナ漢字"),
+        ("日本\n語 \r\nand\nmore", {"join_lines": True}, "日本語 and more"),
+        ("段落 一\n\n段落 二", {"join_lines": True}, "段落一\n\n段落二"),
+    ],
+)
+def test_normalize_ja(s, kwargs, expected):
+    assert utils.normalize_ja(s, **kwargs) == expected
+
+
+def test_normalize_ja_batch():
+    texts = ["あ い ", " う え", "", "x\ny"]
+    assert utils.normalize_ja_batch(texts, join_lines=True) == [
+        "あい ",
+        " うえ",
+        "",
+        "x y",
+    ]
+    # Falls back to one text at a time if a text contains the separator:
+    assert utils.normalize_ja_batch(["あ い\x01", "う え"]) == ["あい\x01", "うえ"]
+    assert utils.normalize_ja_batch([]) == []
+
+
+def test_text_normalizer():
+    texts = ["あ い"]
+    assert utils.text_normalizer("en")(texts) == texts
+    assert utils.text_normalizer("ja")(texts) == ["あい"]
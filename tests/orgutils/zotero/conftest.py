@@ -0,0 +1,25 @@
+import pytest
+
+from orgutils.zotero import db
+from tests.helpers.zotero import ZoteroLibrary
+
+
+@pytest.fixture
+def cache_home(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
+
+
+@pytest.fixture
+def zotero_library(tmp_path, monkeypatch, cache_home):
+    """Fake Zotero library at the default location, ``~/Zotero``."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    db._find_zotero_data_dir.cache_clear()
+
+    data_dir = tmp_path / "Zotero"
+    data_dir.mkdir()
+    library = ZoteroLibrary(data_dir)
+    yield library
+    library.conn.close()
+    db._find_zotero_data_dir.cache_clear()
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from orgutils.zotero import db
+
+
+@pytest.fixture
+def library(zotero_library):
+    attach_id = zotero_library.add_doc("On the Origin of Species")
+    zotero_library.add_annotation(attach_id, 3, text="Natural selection")
+    zotero_library.add_annotation(attach_id, 5, comment="Check this")
+    zotero_library.commit()
+    return zotero_library, attach_id
+
+
+class TestSnapshot:
+    def test_reused_until_source_changes(self, library):
+        lib, _ = library
+        path = db.snapshot(lib.path)
+        assert path.exists()
+        assert db.snapshot(lib.path) == path
+
+        lib.add_doc("The Descent of Man")
+        lib.commit()
+        st = (lib.path / "zotero.sqlite").stat()
+        os.utime(lib.path / "zotero.sqlite", ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+        new_path = db.snapshot(lib.path)
+        assert new_path != path
+        assert not path.exists()
+
+    def test_snapshot_is_read_only(self, library):
+        lib, _ = library
+        with db.connect(lib.path) as conn:
+            with pytest.raises(db.sqlite3.OperationalError):
+                conn.execute("DELETE FROM items")
+
+
+class TestConnect:
+    @pytest.mark.parametrize("mode", db.CONNECT_MODES)
+    def test_modes(self, library, mode):
+        lib, attach_id = library
+        with db.connect(lib.path, mode=mode) as conn:
+            annotations = db.get_annotations_for_id(attach_id, conn=conn)
+            filename = db.get_filename_for_id(attach_id, lib.path, conn=conn)
+
+        assert [a["page"] for a in annotations] == [3, 5]
+        assert filename == (
+            lib.path / "storage" / lib.storage_key(attach_id) / "doc.pdf"
+        )
+
+    def test_unknown_mode(self, library):
+        lib, _ = library
+        with pytest.raises(ValueError):
+            with db.connect(lib.path, mode="bogus"):
+                pass
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from orgutils.zotero import docs, items
+
+
+@pytest.fixture
+def library(zotero_library):
+    lib = zotero_library
+    for i in range(5):
+        attach_id = lib.add_doc(f"Title\t{ i }", filename=f"doc{ i }.pdf")
+        for page in range(i + 1):
+            lib.add_annotation(attach_id, page + 1, text="Text")
+    lib.commit()
+    return lib
+
+
+class TestListDocs:
+    def test_tsv(self, library, capsys):
+        docs.list_docs()
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == "ID\tAnnotation Count\tFile"
+        assert [line.split("\t")[1:] for line in lines[1:]] == [
+            [str(i + 1), f"doc{ i }.pdf"] for i in range(5)
+        ]
+
+    def test_ndjson_paginated(self, library, capsys):
+        docs.list_docs(limit=2, offset=1, output_format="ndjson")
+
+        rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [row["filename"] for row in rows] == ["doc1.pdf", "doc2.pdf"]
+        assert [row["annotationCount"] for row in rows] == [2, 3]
+
+
+class TestListItems:
+    def test_tsv_escapes(self, library, capsys):
+        items.list_items(limit=1)
+
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0] == "ID\tKey\tTitle"
+        assert lines[1].split("\t")[2] == "Title\\t0"
+        assert len(lines) == 2
@@ -0,0 +1,185 @@
+import pytest
+
+from orgutils.zotero import exporters
+
+
+@pytest.fixture
+def library(zotero_library):
+    lib = zotero_library
+    docs = {
+        "origin": lib.add_doc("Origin", filename="origin.pdf", collection="Biology"),
+        "descent": lib.add_doc("Descent", filename="descent.pdf"),
+        "voyage": lib.add_doc("Voyage", filename="voyage.pdf", collection="Biology"),
+    }
+    lib.add_annotation(docs["origin"], 12, text="Natural selection", y=500)
+    lib.add_annotation(docs["origin"], 3, text="Variation", comment="Key idea")
+    lib.add_annotation(docs["descent"], 7, comment="Sexual selection")
+    lib.add_annotation(docs["voyage"], 1, text="Galapagos")
+    lib.commit()
+    return lib, docs
+
+
+OUTLINE = [
+    ("Chapter 1", 0, 700, [("Section 1.1", 1, 500, [])]),
+    ("Chapter 2", 2, 650, []),
+]
+
+
+class TestGetOutline:
+    def test(self, library):
+        lib, docs = library
+        path = lib.add_pdf(docs["origin"], "origin.pdf", OUTLINE)
+
+        items = exporters._get_outline(path)
+
+        assert [(item.loc, item.object.title, item.object.level) for item in items] == [
+            ((1, -700.0, 72.0), "Chapter 1", 2),
+            ((2, -500.0, 72.0), "Section 1.1", 3),
+            ((3, -650.0, 72.0), "Chapter 2", 2),
+        ]
+
+    def test_cached(self, library, mocker):
+        lib, docs = library
+        path = lib.add_pdf(docs["origin"], "origin.pdf", OUTLINE)
+        read_outline = mocker.spy(exporters, "_read_outline")
+
+        assert exporters._get_outline(path) == exporters._get_outline(path)
+        assert read_outline.call_count == 1
+
+
+class TestExportToOrg:
+    def test(self, library, capsys):
+        lib, docs = library
+        exporters.export_to_org(docs["origin"], "en")
+
+        org = capsys.readouterr().out
+        assert org.startswith("* Highlights & notes\n")
+        assert org.index("Variation (p. 3)") < org.index("Natural selection (p. 12)")
+        assert "Key idea (p. 3)" in org
+
+    def test_with_outline(self, library, capsys):
+        lib, docs = library
+        lib.add_pdf(docs["origin"], "origin.pdf", OUTLINE)
+        exporters.export_to_org(docs["origin"], "en")
+
+        org = capsys.readouterr().out
+        assert org.index("** Chapter 1") < org.index("*** Section 1.1")
+        assert org.index("*** Section 1.1") < org.index("Variation (p. 3)")
+        assert org.index("Variation (p. 3)") < org.index("** Chapter 2")
+
+    @pytest.mark.parametrize(
+        "lang, expected",
+        [("en", "日本 語の\n文章 (p. 2)"), ("ja", "日本語の文章 (p. 2)")],
+    )
+    def test_lang(self, library, capsys, lang, expected):
+        lib, docs = library
+        lib.add_annotation(docs["origin"], 2, text="日本 語の\n文章")
+        lib.commit()
+        exporters.export_to_org(docs["origin"], lang)
+
+        assert f"\n{ expected }\n" in capsys.readouterr().out
+
+
+class TestExportDocsToOrg:
+    def test_all(self, library, tmp_path):
+        lib, docs = library
+        exporters.export_docs_to_org(tmp_path / "out", "en", jobs=1)
+
+        outputs = sorted(p.name for p in (tmp_path / "out").glob("*.org"))
+        assert outputs == [
+            f"{ docs['origin'] }-origin.org",
+            f"{ docs['descent'] }-descent.org",
+            f"{ docs['voyage'] }-voyage.org",
+        ]
+        org = (tmp_path / "out" / f"{ docs['descent'] }-descent.org").read_text()
+        assert "Sexual selection (p. 7)" in org
+
+    def test_collection(self, library, tmp_path, mocker):
+        lib, docs = library
+        iter_annotations = mocker.spy(exporters.db, "iter_annotations_by_id")
+        exporters.export_docs_to_org(tmp_path / "out", "en", collection="Biology")
+
+        assert iter_annotations.call_args.kwargs["ids"] == [
+            docs["origin"],
+            docs["voyage"],
+        ]
+
+        outputs = sorted(p.name for p in (tmp_path / "out").glob("*.org"))
+        assert outputs == [
+            f"{ docs['origin'] }-origin.org",
+            f"{ docs['voyage'] }-voyage.org",
+        ]
+
+    def test_incremental(self, library, tmp_path):
+        lib, docs = library
+        out = tmp_path / "out"
+        exporters.export_docs_to_org(out, "en", jobs=1)
+        for path in out.glob("*.org"):
+            path.write_text("untouched")
+
+        annotation_id = lib.add_annotation(docs["descent"], 9, text="Pangenesis")
+        lib.conn.execute(
+            "UPDATE items SET dateModified = '2099-01-01 00:00:00' WHERE itemID = ?",
+            (annotation_id,),
+        )
+        lib.commit()
+        exporters.export_docs_to_org(out, "en", incremental=True, jobs=1)
+
+        assert (out / f"{ docs['origin'] }-origin.org").read_text() == "untouched"
+        org = (out / f"{ docs['descent'] }-descent.org").read_text()
+        assert "Sexual selection (p. 7)" in org
+        assert "Pangenesis (p. 9)" in org
+
+    def test_incremental_unchanged(self, library, tmp_path, mocker):
+        lib, docs = library
+        out = tmp_path / "out"
+        exporters.export_docs_to_org(out, "en", jobs=1)
+        get_doc_list = mocker.spy(exporters.db, "get_doc_list")
+        exporters.export_docs_to_org(out, "en", incremental=True, jobs=1)
+        assert get_doc_list.call_count == 0
+
+    def test_incremental_deleted(self, library, tmp_path):
+        lib, docs = library
+        out = tmp_path / "out"
+        exporters.export_docs_to_org(out, "en", incremental=True, jobs=1)
+
+        for text in ("Variation", "Galapagos"):
+            lib.conn.execute("DELETE FROM itemAnnotations WHERE text = ?", (text,))
+        lib.commit()
+        exporters.export_docs_to_org(out, "en", incremental=True, jobs=1)
+
+        org = (out / f"{ docs['origin'] }-origin.org").read_text()
+        assert "Natural selection" in org
+        assert "Variation" not in org
+        assert not (out / f"{ docs['voyage'] }-voyage.org").exists()
+
+    def test_incremental_collection(self, library, tmp_path):
+        lib, docs = library
+        out = tmp_path / "out"
+        exporters.export_docs_to_org(out, "en", collection="Biology", jobs=1)
+
+        (collection_id,) = lib.conn.execute("SELECT collectionID FROM collections")
+        lib.conn.execute(
+            "INSERT INTO collectionItems VALUES (?, ?, 0)",
+            (collection_id[0], docs["descent"]),
+        )
+        lib.commit()
+        exporters.export_docs_to_org(
+            out, "en", collection="Biology", incremental=True, jobs=1
+        )
+        assert (out / f"{ docs['descent'] }-descent.org").exists()
+
+    def test_merge(self, library, tmp_path):
+        lib, docs = library
+        out = tmp_path / "out"
+        exporters.export_docs_to_org(out, "en", jobs=1)
+        path = out / f"{ docs['descent'] }-descent.org"
+        path.write_text(path.read_text() + "\nMy note\n")
+
+        lib.add_annotation(docs["descent"], 9, text="Pangenesis")
+        lib.commit()
+        exporters.export_docs_to_org(out, "en", jobs=1, merge=True)
+
+        org = path.read_text()
+        assert org.index("Sexual selection (p. 7)") < org.index("My note")
+        assert org.index("My note") < org.index("Pangenesis (p. 9)")
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from orgutils.zotero import db, search
+
+
+@pytest.fixture
+def library(zotero_library):
+    lib = zotero_library
+    origin = lib.add_doc("On the Origin of Species", creators=[("Charles", "Darwin")])
+    lib.add_annotation(origin, 3, text="natural selection acts", comment="key idea")
+    descent = lib.add_doc("The Descent of Man", creators=[("Charles", "Darwin")])
+    lib.add_annotation(descent, 7, text="sexual selection")
+    lib.commit()
+    return lib, origin, descent
+
+
+def _search(capsys, query):
+    search.search_items(query, output_format="ndjson")
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+class TestSearchItems:
+    def test(self, library, capsys):
+        lib, origin, descent = library
+
+        rows = _search(capsys, "selection")
+        assert sorted(row["docID"] for row in rows) == [origin, descent]
+        assert all(row["kind"] == "annotation" for row in rows)
+
+        rows = _search(capsys, "darwin species")
+        assert [row["title"] for row in rows] == ["On the Origin of Species"]
+
+        assert [row["docID"] for row in _search(capsys, "key idea")] == [origin]
+
+    def test_incremental_update(self, library, capsys):
+        lib, origin, descent = library
+        with db.connect() as conn, search.open_index() as index:
+            assert search.update_index(index, conn) > 0
+            assert search.update_index(index, conn) == 0
+
+        lib.add_annotation(descent, 9, text="pangenesis")
+        (deleted,) = lib.conn.execute(
+            "SELECT itemID FROM itemAnnotations WHERE text = 'sexual selection'"
+        ).fetchone()
+        lib.conn.execute("DELETE FROM itemAnnotations WHERE itemID = ?", (deleted,))
+        lib.conn.execute("DELETE FROM items WHERE itemID = ?", (deleted,))
+        lib.commit()
+
+        assert [row["docID"] for row in _search(capsys, "pangenesis")] == [descent]
+        assert [row["docID"] for row in _search(capsys, "selection")] == [origin]
+
+    def test_unchanged_library(self, library):
+        lib, origin, descent = library
+        with db.connect() as conn, search.open_index() as index:
+            search.update_index(index, conn)
+            statements = []
+            conn.set_trace_callback(statements.append)
+            assert search.update_index(index, conn) == 0
+            assert statements == [db.SQL_GET_ITEM_STATS]
+
+    def test_modified_item(self, library, capsys):
+        lib, origin, descent = library
+        _search(capsys, "selection")
+        lib.conn.execute(
+            "UPDATE itemAnnotations SET text = 'pangenesis' "
+            "WHERE text = 'sexual selection'"
+        )
+        lib.conn.execute(
+            "UPDATE items SET dateModified = '2100-01-01 00:00:00' WHERE itemID IN "
+            "(SELECT itemID FROM itemAnnotations WHERE text = 'pangenesis')"
+        )
+        lib.commit()
+
+        assert [row["docID"] for row in _search(capsys, "pangenesis")] == [descent]
+        assert [row["docID"] for row in _search(capsys, "selection")] == [origin]